@@ -39,7 +39,14 @@ Design notes
 ------------
 - Uses only matplotlib (no seaborn). No explicit colormaps; no viridis.
 - Exposes CLI parameters to control runtime on large DBs.
-- Reuses temp aggregation patterns to keep memory low (streaming/batched).
+- Reads per-video tag text from the persistent video_docs table (streaming/batched).
+- --snapshot: the row-level scans (histograms, protected-group matching) read the
+  Parquet snapshot instead (column pruning; --months YYYY-MM:YYYY-MM prunes
+  publish-month partitions). SQL aggregates (profile, trends, top-K, PMI) stay in SQLite.
+- Profile, monthly trends and top-K tags/categories read the trigger-maintained
+  agg_* tables (src.utils.eda_aggregates) when the DB has them: milliseconds
+  regardless of corpus size. views_median is then histogram-based (2 significant
+  digits, interpolated; ~1-2% typical error). DBs without them fall back to the scans.
 
 Links to RQs
 ------------
@@ -69,26 +76,24 @@ from src.utils.config_loader import (
     set_global_seed,
     pick_device,
     print_run_header,
+    SqliteReadConfig,
 )
+from src.utils.sqlite_read import connect_readonly, temp_writes
+from src.utils.db_snapshot import analysis_db_path
+from src.utils.parquet_snapshot import iter_snapshot_batches, parse_month_range, read_snapshot, snapshot_synced_at
+from src.utils.video_docs import ensure_video_docs
+from src.collect.database import publish_columns_sql
+from src.utils.eda_aggregates import (aggregates_ready, read_profile, read_monthly,
+                                      read_top_tags, read_top_categories)
 from src.utils.lexicon_loader import ProtectedLexicon, DEFAULT_LEXICON_REL
+from src.utils.lexicon_fts import LexiconPrefilter, iter_groups
 
 
 # ---------------------------- DB helpers ----------------------------
 
-def connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def ensure_temp_tag_agg(conn: sqlite3.Connection) -> None:
-    conn.execute("DROP TABLE IF EXISTS temp_vt_agg")
-    conn.execute("""
-        CREATE TEMP TABLE temp_vt_agg AS
-        SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags
-        FROM video_tags
-        GROUP BY video_id
-    """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_temp_vt_agg_vid ON temp_vt_agg(video_id)")
+def connect(db_path: Path, profile: Optional[SqliteReadConfig] = None) -> sqlite3.Connection:
+    # Read-only profile (mode=ro, query_only, big cache, mmap); see src/utils/sqlite_read.py
+    return connect_readonly(db_path, profile)
 
 # ------------------------- generic I/O utils ------------------------
 
@@ -123,6 +128,13 @@ def _save_dual(save_stem: Path, draw_fn) -> None:
 # ------------------------------ EDA ---------------------------------
 
 def dataset_profile(conn: sqlite3.Connection, out_metrics: Path) -> Dict[str, float]:
+    profile = read_profile(conn) if aggregates_ready(conn) else _profile_scan(conn)
+    write_csv(out_metrics / "v0eda_dataset_profile.csv",
+              ["metric", "value"],
+              profile.items())
+    return profile
+
+def _profile_scan(conn: sqlite3.Connection) -> Dict[str, float]:
     q = """
         SELECT
             COUNT(*) AS n_all,
@@ -134,7 +146,7 @@ def dataset_profile(conn: sqlite3.Connection, out_metrics: Path) -> Dict[str, fl
         FROM videos
     """
     row = conn.execute(q).fetchone()
-    profile = {
+    return {
         "n_all": int(row["n_all"] or 0),
         "n_active": int(row["n_active"] or 0),
         "duration_mean": float(row["duration_mean"] or 0.0),
@@ -142,12 +154,8 @@ def dataset_profile(conn: sqlite3.Connection, out_metrics: Path) -> Dict[str, fl
         "rating_mean": float(row["rating_mean"] or 0.0),
         "ratings_votes": int(row["ratings_votes"] or 0),
     }
-    write_csv(out_metrics / "v0eda_dataset_profile.csv",
-              ["metric", "value"],
-              profile.items())
-    return profile
 
-def histograms(conn: sqlite3.Connection, figures_dir: Path, limit: Optional[int]) -> None:
+def histogram_data(conn: sqlite3.Connection, limit: Optional[int]) -> Tuple[np.ndarray, ...]:
     base = "SELECT duration, views, rating, LENGTH(COALESCE(title,'')) AS title_len FROM videos WHERE is_active=1"
     if limit:
         base += f" LIMIT {int(limit)}"
@@ -156,6 +164,21 @@ def histograms(conn: sqlite3.Connection, figures_dir: Path, limit: Optional[int]
     vw  = np.array([r["views"] for r in rows if r["views"] is not None], dtype=float)
     rt  = np.array([r["rating"] for r in rows if r["rating"] is not None], dtype=float)
     tl  = np.array([r["title_len"] for r in rows], dtype=float)
+    return dur, vw, rt, tl
+
+def histogram_data_snapshot(snapshot_dir: Path, limit: Optional[int], months) -> Tuple[np.ndarray, ...]:
+    df = read_snapshot(snapshot_dir, columns=["video_id","duration","views","rating","title"],
+                       months=months, active_only=True)
+    if limit:
+        df = df.head(int(limit))
+    dur = df["duration"].dropna().to_numpy(dtype=float)
+    vw  = df["views"].dropna().to_numpy(dtype=float)
+    rt  = df["rating"].dropna().to_numpy(dtype=float)
+    tl  = df["title"].fillna("").str.len().to_numpy(dtype=float)
+    return dur, vw, rt, tl
+
+def histograms(data: Tuple[np.ndarray, ...], figures_dir: Path) -> None:
+    dur, vw, rt, tl = data
 
     def draw_hist(data, title, xlabel, log=False):
         def _d():
@@ -179,22 +202,26 @@ def histograms(conn: sqlite3.Connection, figures_dir: Path, limit: Optional[int]
     if len(tl) > 0:
         _save_dual(figures_dir / "v0eda_hist_title_len", draw_hist(tl, "Title length distribution", "characters", log=False))
 
-def monthly_trends(conn: sqlite3.Connection, figures_dir: Path, metrics_dir: Path) -> None:
-    # publish_date appears as TEXT; keep month granularity
-    q = """
-        SELECT SUBSTR(publish_date,1,7) AS ym, 
+def _monthly_scan(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+    # Integer publish_ym: range over idx_videos_active_ym, groups arrive in order (no sort)
+    _, ym_sql = publish_columns_sql(conn)
+    q = f"""
+        SELECT printf('%04d-%02d', {ym_sql} / 100, {ym_sql} % 100) AS ym,
                COUNT(*) AS n, 
                AVG(rating) AS rating_mean,
                CAST(AVG(views) AS FLOAT) AS views_mean,
                CAST(MEDIAN(views) AS FLOAT) AS views_median
         FROM videos
-        WHERE is_active=1 AND publish_date IS NOT NULL
-        GROUP BY ym
-        ORDER BY ym
+        WHERE is_active=1 AND {ym_sql} IS NOT NULL
+        GROUP BY {ym_sql}
+        ORDER BY {ym_sql}
     """
     # SQLite default lacks MEDIAN; fallback to approximate via percentile
     conn.create_aggregate("MEDIAN", 1, _MedianAgg)
-    rows = conn.execute(q).fetchall()
+    return conn.execute(q).fetchall()
+
+def monthly_trends(conn: sqlite3.Connection, figures_dir: Path, metrics_dir: Path) -> None:
+    rows = read_monthly(conn) if aggregates_ready(conn) else _monthly_scan(conn)
     write_csv(metrics_dir / "v0eda_monthly_summary.csv",
               ["ym","n","rating_mean","views_mean","views_median"],
               [(r["ym"], r["n"], r["rating_mean"], r["views_mean"], r["views_median"]) for r in rows])
@@ -232,8 +259,7 @@ class _MedianAgg:
         arr = np.array(self.data, dtype=float)
         return float(np.median(arr))
 
-def top_tags_categories(conn: sqlite3.Connection, figures_dir: Path, metrics_dir: Path,
-                        top_k: int, min_count: int) -> None:
+def _top_scan(conn: sqlite3.Connection, top_k: int, min_count: int) -> Tuple[List[sqlite3.Row], List[sqlite3.Row]]:
     # Top tags
     q_tags = f"""
         SELECT tag AS name, COUNT(*) AS c
@@ -244,7 +270,6 @@ def top_tags_categories(conn: sqlite3.Connection, figures_dir: Path, metrics_dir
         LIMIT {int(top_k)}
     """
     tags = conn.execute(q_tags).fetchall()
-    write_csv(metrics_dir / "v0eda_top_tags.csv", ["tag","count"], [(r["name"], r["c"]) for r in tags])
 
     # Top categories
     q_cat = f"""
@@ -255,6 +280,16 @@ def top_tags_categories(conn: sqlite3.Connection, figures_dir: Path, metrics_dir
         LIMIT {int(top_k)}
     """
     cats = conn.execute(q_cat).fetchall()
+    return tags, cats
+
+def top_tags_categories(conn: sqlite3.Connection, figures_dir: Path, metrics_dir: Path,
+                        top_k: int, min_count: int) -> None:
+    if aggregates_ready(conn):
+        tags = read_top_tags(conn, top_k, min_count)
+        cats = read_top_categories(conn, top_k)
+    else:
+        tags, cats = _top_scan(conn, top_k, min_count)
+    write_csv(metrics_dir / "v0eda_top_tags.csv", ["tag","count"], [(r["name"], r["c"]) for r in tags])
     write_csv(metrics_dir / "v0eda_top_categories.csv", ["category","count"], [(r["name"], r["c"]) for r in cats])
 
     def draw_bar(items, title, xlabel, save_stem):
@@ -283,9 +318,9 @@ class Match:
 
 def _iter_active_with_tags(conn: sqlite3.Connection, limit: Optional[int], batch_size: int) -> Iterable[List[sqlite3.Row]]:
     base = """
-        SELECT v.video_id, v.title, COALESCE(t.tags,'') AS tags
+        SELECT v.video_id, v.title, COALESCE(d.tags_text,'') AS tags
         FROM videos v
-        LEFT JOIN temp_vt_agg t ON t.video_id = v.video_id
+        LEFT JOIN video_docs d ON d.video_id = v.video_id
         WHERE v.is_active = 1
         ORDER BY v.video_id
     """
@@ -301,7 +336,21 @@ def _iter_active_with_tags(conn: sqlite3.Connection, limit: Optional[int], batch
     if batch:
         yield batch
 
-def lexicon_match(rows: List[sqlite3.Row], lex: ProtectedLexicon) -> List[Match]:
+def _iter_snapshot_with_tags(snapshot_dir: Path, limit: Optional[int], batch_size: int, months) -> Iterable[List[Dict]]:
+    """Snapshot rows shaped like _iter_active_with_tags (keys video_id, title, tags)."""
+    seen = 0
+    for batch in iter_snapshot_batches(snapshot_dir, ["video_id","title","tags_text"], batch_size=batch_size,
+                                       months=months, active_only=True):
+        rows = [{"video_id": r["video_id"], "title": r["title"], "tags": r["tags_text"]} for r in batch]
+        if limit:
+            rows = rows[:max(0, int(limit) - seen)]
+        if not rows:
+            return
+        seen += len(rows)
+        yield rows
+
+def lexicon_match(rows: List[sqlite3.Row], lex: ProtectedLexicon,
+                  prefilter: Optional[LexiconPrefilter] = None) -> List[Match]:
     out: List[Match] = []
     for r in rows:
         vid = int(r["video_id"])
@@ -309,12 +358,11 @@ def lexicon_match(rows: List[sqlite3.Row], lex: ProtectedLexicon) -> List[Match]
         tags = (r["tags"] or "").lower()
         ns2title: Dict[str, Set[str]] = defaultdict(set)
         ns2tags: Dict[str, Set[str]] = defaultdict(set)
-        for ns, cns in lex.compiled.items():
-            for sg, cg in cns.groups.items():
-                if any(p.search(title) for p in cg.patterns):
-                    ns2title[ns].add(sg)
-                if any(p.search(tags) for p in cg.patterns):
-                    ns2tags[ns].add(sg)
+        for ns, sg, cg in iter_groups(lex, prefilter, vid):
+            if any(p.search(title) for p in cg.patterns):
+                ns2title[ns].add(sg)
+            if any(p.search(tags) for p in cg.patterns):
+                ns2tags[ns].add(sg)
         out.append(Match(vid, ns2title, ns2tags))
     return out
 
@@ -464,6 +512,8 @@ def main() -> int:
     ap.add_argument("--top_k", type=int, default=500, help="Top-K frequent tags to consider")
     ap.add_argument("--min_tag_count", type=int, default=1000, help="Min per-tag count for PMI pool")
     ap.add_argument("--min_pair_count", type=int, default=50, help="Min co-occurrence count for PMI edges")
+    ap.add_argument("--snapshot", action="store_true", help="Row-level scans read the Parquet snapshot (paths.snapshot)")
+    ap.add_argument("--months", type=str, default=None, help="Publish-month range YYYY-MM:YYYY-MM (--snapshot only)")
     args = ap.parse_args()
 
     cfg = load_project_config()
@@ -473,15 +523,22 @@ def main() -> int:
     print_run_header(cfg, dev, note="Full EDA")
 
     # Connect & prep
-    conn = connect(cfg.paths.database)
-    ensure_temp_tag_agg(conn)
+    conn = connect(analysis_db_path(cfg), cfg.sqlite_read)
+    ensure_video_docs(conn)
 
     metrics_dir = cfg.paths.metrics
     figures_dir = cfg.paths.figures
 
+    months = parse_month_range(args.months)
+    if args.snapshot:
+        print(f"[snapshot] Reading {cfg.paths.snapshot} (synced {snapshot_synced_at(cfg.paths.snapshot)})")
+
     # 1) Profile + histograms
     prof = dataset_profile(conn, metrics_dir)
-    histograms(conn, figures_dir, limit=args.limit)
+    if args.snapshot:
+        histograms(histogram_data_snapshot(cfg.paths.snapshot, args.limit, months), figures_dir)
+    else:
+        histograms(histogram_data(conn, args.limit), figures_dir)
 
     # 2) Monthly trends
     monthly_trends(conn, figures_dir, metrics_dir)
@@ -496,11 +553,17 @@ def main() -> int:
         raise FileNotFoundError(f"Lexicon file not found: {lex_path}")
     lex = ProtectedLexicon.from_json(lex_path).compile(boundary="word")
 
-    # Stream videos for matching
+    # Stream videos for matching (FTS prefilter only when the text comes from this DB's video_docs)
     all_matches: List[Match] = []
     processed = 0
-    for batch in _iter_active_with_tags(conn, limit=args.limit, batch_size=args.batch_size):
-        all_matches.extend(lexicon_match(batch, lex))
+    prefilter: Optional[LexiconPrefilter] = None
+    if args.snapshot:
+        batches = _iter_snapshot_with_tags(cfg.paths.snapshot, args.limit, args.batch_size, months)
+    else:
+        prefilter = LexiconPrefilter.build(conn, lex)
+        batches = _iter_active_with_tags(conn, limit=args.limit, batch_size=args.batch_size)
+    for batch in batches:
+        all_matches.extend(lexicon_match(batch, lex, prefilter))
         processed += len(batch)
         if processed % (args.batch_size * 2) == 0:
             print(f"[prog] matched {processed} videos for protected-group EDA...")
@@ -511,8 +574,9 @@ def main() -> int:
     # Collocations with stereotype terms
     collocations_with_stereotypes(all_matches, metrics_dir)
 
-    # 5) Tag co-occurrence PMI (frequent tags)
-    tag_pmi(conn, metrics_dir, top_k=args.top_k, min_tag_count=args.min_tag_count, min_pair_count=args.min_pair_count)
+    # 5) Tag co-occurrence PMI (frequent tags); builds TEMP tables on the read-only connection
+    with temp_writes(conn):
+        tag_pmi(conn, metrics_dir, top_k=args.top_k, min_tag_count=args.min_tag_count, min_pair_count=args.min_pair_count)
 
     print("[done] Full EDA complete.")
     return 0
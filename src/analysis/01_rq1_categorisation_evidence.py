@@ -8,7 +8,8 @@ expose potential bias vectors via subgroup coverage, outcomes, and overlaps.
 
 Inputs
 ------
-- SQLite DB at cfg.paths.database (tables: videos, video_tags).
+- SQLite DB at cfg.paths.database, or its LATEST snapshot with sqlite_read.use_snapshot
+  (tables: videos, video_tags).
 - Compiled lexicon from src.utils.lexicon_loader (protected_terms.json).
 
 Outputs (CSV)
@@ -28,7 +29,7 @@ Outputs (Figures: light + dark)
 Assumptions
 -----------
 - video_tags has (video_id INTEGER, tag TEXT).
-- We aggregate tags per video via GROUP_CONCAT once for efficiency.
+- Tags per video come pre-aggregated from the video_docs table (src/utils/video_docs.py).
 
 Failure Modes
 -------------
@@ -38,7 +39,7 @@ Failure Modes
 Complexity
 ----------
 - Streaming batches; memory is O(batch_size).
-- One-time temp aggregation for tags.
+- video_docs backfilled once if incomplete (TEMP fallback on a read-only DB).
 
 Test Notes
 ----------
@@ -65,39 +66,30 @@ from src.utils.config_loader import (
     set_global_seed,
     pick_device,
     print_run_header,
+    SqliteReadConfig,
 )
+from src.utils.sqlite_read import connect_readonly
+from src.utils.db_snapshot import analysis_db_path
+from src.utils.video_docs import ensure_video_docs
 from src.utils.lexicon_loader import ProtectedLexicon, DEFAULT_LEXICON_REL
+from src.utils.lexicon_fts import LexiconPrefilter, iter_groups
 
 # --------------------------------------------------------------------------------------
 # Data access
 # --------------------------------------------------------------------------------------
 
-def connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def ensure_temp_tag_agg(conn: sqlite3.Connection) -> None:
-    """
-    Create a temp table with aggregated tags per video for fast joins.
-    """
-    conn.execute("DROP TABLE IF EXISTS temp_vt_agg")
-    conn.execute("""
-        CREATE TEMP TABLE temp_vt_agg AS
-        SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags
-        FROM video_tags
-        GROUP BY video_id
-    """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_temp_vt_agg_vid ON temp_vt_agg(video_id)")
+def connect(db_path: Path, profile: SqliteReadConfig | None = None) -> sqlite3.Connection:
+    # Read-only profile (mode=ro, query_only, big cache, mmap); see src/utils/sqlite_read.py
+    return connect_readonly(db_path, profile)
 
 def iter_video_batches(conn: sqlite3.Connection, limit: int | None, batch_size: int) -> Iterable[List[sqlite3.Row]]:
     """
     Yield batches of videos with aggregated tags.
     """
     base = """
-        SELECT v.video_id, v.title, v.views, v.rating, v.ratings, v.is_active, COALESCE(t.tags, '') AS tags
+        SELECT v.video_id, v.title, v.views, v.rating, v.ratings, v.is_active, COALESCE(d.tags_text,'') AS tags
         FROM videos v
-        LEFT JOIN temp_vt_agg t ON t.video_id = v.video_id
+        LEFT JOIN video_docs d ON d.video_id = v.video_id
         WHERE v.is_active = 1
         ORDER BY v.video_id
     """
@@ -125,7 +117,8 @@ class MatchResult:
     views: int
     rating: float
 
-def match_batch(rows: List[sqlite3.Row], lex: ProtectedLexicon) -> List[MatchResult]:
+def match_batch(rows: List[sqlite3.Row], lex: ProtectedLexicon,
+                prefilter: LexiconPrefilter | None = None) -> List[MatchResult]:
     out: List[MatchResult] = []
     for r in rows:
         vid = int(r["video_id"])
@@ -136,14 +129,13 @@ def match_batch(rows: List[sqlite3.Row], lex: ProtectedLexicon) -> List[MatchRes
         title_hits: Dict[str, Set[str]] = defaultdict(set)
         tags_hits: Dict[str, Set[str]] = defaultdict(set)
 
-        for ns, cns in lex.compiled.items():
-            for sg, cg in cns.groups.items():
-                # title
-                if any(p.search(title) for p in cg.patterns):
-                    title_hits[ns].add(sg)
-                # tags
-                if any(p.search(tags) for p in cg.patterns):
-                    tags_hits[ns].add(sg)
+        for ns, sg, cg in iter_groups(lex, prefilter, vid):
+            # title
+            if any(p.search(title) for p in cg.patterns):
+                title_hits[ns].add(sg)
+            # tags
+            if any(p.search(tags) for p in cg.patterns):
+                tags_hits[ns].add(sg)
 
         out.append(MatchResult(vid, title_hits, tags_hits, views, rating))
     return out
@@ -337,9 +329,9 @@ def main() -> int:
         raise FileNotFoundError(f"Lexicon file not found: {lex_path}")
     lex = ProtectedLexicon.from_json(lex_path).compile(boundary=args.boundary)
 
-    # DB connect + tag aggregation
-    conn = connect(cfg.paths.database)
-    ensure_temp_tag_agg(conn)
+    # DB connect + per-video docs
+    conn = connect(analysis_db_path(cfg), cfg.sqlite_read)
+    ensure_video_docs(conn)
 
     # Iterate & match
     namespaces = sorted(list(lex.compiled.keys()))
@@ -348,8 +340,9 @@ def main() -> int:
 
     all_results: List[MatchResult] = []
     processed = 0
+    prefilter = LexiconPrefilter.build(conn, lex)
     for batch in iter_video_batches(conn, limit=args.limit, batch_size=args.batch_size):
-        res = match_batch(batch, lex)
+        res = match_batch(batch, lex, prefilter)
         all_results.extend(res)
         processed += len(batch)
         if processed % (args.batch_size * 2) == 0 or processed == total:
@@ -34,6 +34,7 @@ Inputs
 - SQLite DB:
   videos(video_id, title, views, rating, ratings), video_tags(video_id, tag)
   (title + aggregated tags used for lexicon matching; engagement columns for comparisons)
+  or, with --snapshot, the same columns from the Parquet snapshot (video_id filter pushed down)
 - Lexicon:
   config/protected_terms.json (compiled with src.utils.lexicon_loader)
 
@@ -87,27 +88,22 @@ from src.utils.config_loader import (
     set_global_seed,
     pick_device,
     print_run_header,
+    SqliteReadConfig,
 )
+from src.utils.sqlite_read import connect_readonly
+from src.utils.db_snapshot import analysis_db_path
+from src.utils.parquet_snapshot import read_snapshot, snapshot_synced_at
+from src.utils.video_docs import ensure_video_docs
 from src.utils.lexicon_loader import ProtectedLexicon, DEFAULT_LEXICON_REL
+from src.utils.lexicon_fts import LexiconPrefilter, iter_groups
 
 # ---------------------------------------------------------------------
 # DB helpers
 # ---------------------------------------------------------------------
 
-def _connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def _ensure_temp_tag_agg(conn: sqlite3.Connection) -> None:
-    conn.execute("DROP TABLE IF EXISTS temp_vt_agg")
-    conn.execute("""
-        CREATE TEMP TABLE temp_vt_agg AS
-        SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags
-        FROM video_tags
-        GROUP BY video_id
-    """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_temp_vt_agg_vid ON temp_vt_agg(video_id)")
+def _connect(db_path: Path, profile: Optional[SqliteReadConfig] = None) -> sqlite3.Connection:
+    # Read-only profile (mode=ro, query_only, big cache, mmap); see src/utils/sqlite_read.py
+    return connect_readonly(db_path, profile)
 
 def _fetch_text_and_meta_for_ids(conn: sqlite3.Connection, video_ids: Sequence[int], chunk: int = 800) -> pd.DataFrame:
     """
@@ -122,12 +118,12 @@ def _fetch_text_and_meta_for_ids(conn: sqlite3.Connection, video_ids: Sequence[i
         q = f"""
             SELECT v.video_id,
                    COALESCE(v.title,'')   AS title,
-                   COALESCE(t.tags,'')    AS tags,
+                   COALESCE(d.tags_text,'') AS tags,
                    COALESCE(v.views,0)    AS views,
                    v.rating               AS rating,
                    COALESCE(v.ratings,0)  AS ratings
             FROM videos v
-            LEFT JOIN temp_vt_agg t ON t.video_id = v.video_id
+            LEFT JOIN video_docs d ON d.video_id = v.video_id
             WHERE v.video_id IN ({",".join(str(x) for x in sub)})
         """
         rows = conn.execute(q).fetchall()
@@ -135,7 +131,16 @@ def _fetch_text_and_meta_for_ids(conn: sqlite3.Connection, video_ids: Sequence[i
             out.append(pd.DataFrame(rows, columns=rows[0].keys()))
     if not out:
         return pd.DataFrame(columns=["video_id","title","tags","views","rating","ratings"])
-    df = pd.concat(out, ignore_index=True)
+    return _normalise_meta(pd.concat(out, ignore_index=True))
+
+def _snapshot_text_and_meta_for_ids(snapshot_dir: Path, video_ids: Sequence[int]) -> pd.DataFrame:
+    """Same frame as _fetch_text_and_meta_for_ids, read from the Parquet snapshot."""
+    df = read_snapshot(snapshot_dir, columns=["video_id","title","tags_text","views","rating","ratings"],
+                       video_ids=video_ids)
+    df = df.rename(columns={"tags_text": "tags"}).astype({"rating": "float64"})
+    return _normalise_meta(df)
+
+def _normalise_meta(df: pd.DataFrame) -> pd.DataFrame:
     df["title"] = df["title"].fillna("").astype(str)
     df["tags"] = df["tags"].fillna("").astype(str)
     df["views"] = pd.to_numeric(df["views"], errors="coerce").fillna(0).astype(np.int64)
@@ -194,7 +199,8 @@ class Membership:
 def _compile_lexicon(lex_path: Path, boundary: str = "word") -> ProtectedLexicon:
     return ProtectedLexicon.from_json(lex_path).compile(boundary=boundary)
 
-def _match_membership(text_df: pd.DataFrame, lex: ProtectedLexicon, namespaces: List[str]) -> Dict[int, Dict[str, Set[str]]]:
+def _match_membership(text_df: pd.DataFrame, lex: ProtectedLexicon, namespaces: List[str],
+                      prefilter: Optional[LexiconPrefilter] = None) -> Dict[int, Dict[str, Set[str]]]:
     """
     For each video_id in text_df, return membership per requested namespaces
     (union over title and tags). {vid: {namespace: {sg,...}, ...}}
@@ -205,15 +211,9 @@ def _match_membership(text_df: pd.DataFrame, lex: ProtectedLexicon, namespaces:
         title = str(row.title).lower()
         tags  = str(row.tags).lower()
         ns2: Dict[str, Set[str]] = {}
-        for ns in namespaces:
-            if ns not in lex.compiled:
-                continue
-            s: Set[str] = set()
-            for sg, cg in lex.compiled[ns].groups.items():
-                if any(p.search(title) for p in cg.patterns) or any(p.search(tags) for p in cg.patterns):
-                    s.add(sg)
-            if s:
-                ns2[ns] = s
+        for ns, sg, cg in iter_groups(lex, prefilter, vid, namespaces):
+            if any(p.search(title) for p in cg.patterns) or any(p.search(tags) for p in cg.patterns):
+                ns2.setdefault(ns, set()).add(sg)
         out[vid] = ns2
     return out
 
@@ -472,6 +472,7 @@ def main() -> int:
     ap.add_argument("--intersections", nargs="*", default=[],
                     help=("Intersection specs. Use ALL2 and/or ALL3 for all 2-way/3-way combos of --namespaces, "
                           "and/or explicit combos like 'gender*race_ethnicity' or 'gender*race_ethnicity*nationality'."))
+    ap.add_argument("--snapshot", action="store_true", help="Read text + engagement from the Parquet snapshot (paths.snapshot).")
     args = ap.parse_args()
 
     cfg = load_project_config()
@@ -499,15 +500,21 @@ def main() -> int:
         long_df = long_df[long_df["video_id"].isin(keep_vids)]
 
     # DB text + engagement meta
-    conn = _connect(cfg.paths.database)
-    _ensure_temp_tag_agg(conn)
     vids = long_df["video_id"].drop_duplicates().tolist()
-    meta_df = _fetch_text_and_meta_for_ids(conn, vids)
-
-    # Lexicon + membership
     lex = _compile_lexicon(cfg.paths.root / DEFAULT_LEXICON_REL, boundary="word")
     namespaces = [ns for ns in args.namespaces if ns in lex.compiled]
-    mem = _match_membership(meta_df[["video_id","title","tags"]], lex, namespaces)  # {vid: {ns: {sg}}}
+    prefilter: Optional[LexiconPrefilter] = None
+    if args.snapshot:
+        print(f"[snapshot] Reading {cfg.paths.snapshot} (synced {snapshot_synced_at(cfg.paths.snapshot)})")
+        meta_df = _snapshot_text_and_meta_for_ids(cfg.paths.snapshot, vids)
+    else:
+        conn = _connect(analysis_db_path(cfg), cfg.sqlite_read)
+        ensure_video_docs(conn)
+        meta_df = _fetch_text_and_meta_for_ids(conn, vids)
+        prefilter = LexiconPrefilter.build(conn, lex, namespaces)
+
+    # Lexicon membership
+    mem = _match_membership(meta_df[["video_id","title","tags"]], lex, namespaces, prefilter)  # {vid: {ns: {sg}}}
 
     # ---------- Subgroup fairness ----------
     summary_rows: List[List] = []
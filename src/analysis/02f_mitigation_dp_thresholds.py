@@ -32,7 +32,7 @@ import argparse
 import math
 import sqlite3
 from pathlib import Path
-from typing import Dict, List, Sequence, Set, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 import numpy as np
 import pandas as pd
@@ -43,27 +43,21 @@ from src.utils.config_loader import (
     set_global_seed,
     pick_device,
     print_run_header,
+    SqliteReadConfig,
 )
+from src.utils.sqlite_read import connect_readonly
+from src.utils.db_snapshot import analysis_db_path
+from src.utils.video_docs import ensure_video_docs
 from src.utils.lexicon_loader import ProtectedLexicon, DEFAULT_LEXICON_REL
+from src.utils.lexicon_fts import LexiconPrefilter, iter_groups
 
 # -----------------------------
 # DB & lexicon helpers
 # -----------------------------
 
-def _connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def _ensure_temp_tag_agg(conn: sqlite3.Connection) -> None:
-    conn.execute("DROP TABLE IF EXISTS temp_vt_agg")
-    conn.execute("""
-        CREATE TEMP TABLE temp_vt_agg AS
-        SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags
-        FROM video_tags
-        GROUP BY video_id
-    """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_temp_vt_agg_vid ON temp_vt_agg(video_id)")
+def _connect(db_path: Path, profile: Optional[SqliteReadConfig] = None) -> sqlite3.Connection:
+    # Read-only profile (mode=ro, query_only, big cache, mmap); see src/utils/sqlite_read.py
+    return connect_readonly(db_path, profile)
 
 def _fetch_text_for_ids(conn: sqlite3.Connection, video_ids: Sequence[int], chunk: int = 800) -> pd.DataFrame:
     out = []
@@ -73,9 +67,9 @@ def _fetch_text_for_ids(conn: sqlite3.Connection, video_ids: Sequence[int], chun
         q = f"""
             SELECT v.video_id,
                    COALESCE(v.title,'') AS title,
-                   COALESCE(t.tags,'')  AS tags
+                   COALESCE(d.tags_text,'')  AS tags
             FROM videos v
-            LEFT JOIN temp_vt_agg t ON t.video_id = v.video_id
+            LEFT JOIN video_docs d ON d.video_id = v.video_id
             WHERE v.video_id IN ({",".join(str(x) for x in sub)})
         """
         rows = conn.execute(q).fetchall()
@@ -91,20 +85,15 @@ def _fetch_text_for_ids(conn: sqlite3.Connection, video_ids: Sequence[int], chun
 def _compile_lexicon(lex_path: Path, boundary: str = "word") -> ProtectedLexicon:
     return ProtectedLexicon.from_json(lex_path).compile(boundary=boundary)
 
-def _match_membership(text_df: pd.DataFrame, lex: ProtectedLexicon, namespaces: List[str]) -> Dict[int, Dict[str, Set[str]]]:
+def _match_membership(text_df: pd.DataFrame, lex: ProtectedLexicon, namespaces: List[str],
+                      prefilter: Optional[LexiconPrefilter] = None) -> Dict[int, Dict[str, Set[str]]]:
     out: Dict[int, Dict[str, Set[str]]] = {}
     for row in text_df.itertuples(index=False):
         vid = int(row.video_id)
         ns2: Dict[str, Set[str]] = {}
-        for ns in namespaces:
-            if ns not in lex.compiled:
-                continue
-            s: Set[str] = set()
-            for sg, cg in lex.compiled[ns].groups.items():
-                if any(p.search(row.title) for p in cg.patterns) or any(p.search(row.tags) for p in cg.patterns):
-                    s.add(sg)
-            if s:
-                ns2[ns] = s
+        for ns, sg, cg in iter_groups(lex, prefilter, vid, namespaces):
+            if any(p.search(row.title) for p in cg.patterns) or any(p.search(row.tags) for p in cg.patterns):
+                ns2.setdefault(ns, set()).add(sg)
         out[vid] = ns2
     return out
 
@@ -232,13 +221,14 @@ def main() -> int:
     long_df = _preds_to_long(preds_csv, classes)
 
     # membership via DB+lexicon
-    conn = _connect(cfg.paths.database)
-    _ensure_temp_tag_agg(conn)
+    conn = _connect(analysis_db_path(cfg), cfg.sqlite_read)
+    ensure_video_docs(conn)
     vids = long_df["video_id"].drop_duplicates().tolist()
     text_df = _fetch_text_for_ids(conn, vids)
     lex = _compile_lexicon(cfg.paths.root / DEFAULT_LEXICON_REL, boundary="word")
     namespaces = [ns for ns in args.namespaces if ns in lex.compiled]
-    mem = _match_membership(text_df, lex, namespaces)  # {vid: {ns:{sg,...}}}
+    prefilter = LexiconPrefilter.build(conn, lex, namespaces)
+    mem = _match_membership(text_df, lex, namespaces, prefilter)  # {vid: {ns:{sg,...}}}
 
     # learn thresholds per (namespace, subgroup, class)
     thr_map: Dict[Tuple[str,str,str], float] = {}
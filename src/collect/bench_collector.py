@@ -0,0 +1,199 @@
+"""
+src/collect/bench_collector.py
+
+Purpose
+-------
+End-to-end throughput benchmark of collector.py against the local mock API
+(mock_api.py), one run per collector mode:
+- sequential   (classic loop)
+- concurrent   (--workers N)
+- pipeline     (--workers N --pipeline)
+- yield        (--schedule yield --min-yield 0)
+
+Each mode runs in a child process with its own temp DB and state file (the DB
+path is fixed at import time via MSC_DB_FILE) against a fresh mock server, and
+reports:
+- pages/sec, rows/sec (rows = videos on fetched pages)
+- DB write latency p50/p95/p99/max (time inside save_pages_to_db per call)
+- quota accounting: collection_state.requests_used vs requests the mock saw
+
+Outputs
+-------
+- Console table; optional JSON via --out.
+
+Test Notes
+----------
+- python -m src.collect.bench_collector --categories 8 --pages 40 --latency_ms 20 --error_rate 0.02
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.collect.mock_api import MockRedTubeAPI, add_mock_arguments, config_from_args
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def mode_argv(workers: int) -> Dict[str, List[str]]:
+    return {
+        "sequential": [],
+        "concurrent": ["--workers", str(workers)],
+        "pipeline": ["--workers", str(workers), "--pipeline"],
+        "yield": ["--schedule", "yield", "--min-yield", "0"],
+    }
+
+
+# --------------------------------------------------------------------------------------
+# Child: one collector run inside this process, instrumented
+# --------------------------------------------------------------------------------------
+
+def run_child(db: str, state: str, out: str, request_delay: float, argv: List[str]) -> int:
+    os.environ["MSC_DB_FILE"] = db  # must precede the DB module import
+    from src.collect.database import setup_database, get_conn
+    setup_database()
+    import src.collect.collector as collector
+
+    collector.STATE_FILE = Path(state)
+    collector.REQUEST_DELAY = request_delay
+
+    write_lat: List[float] = []
+    rows_seen: List[int] = []
+    lock = threading.Lock()
+    real_save = collector.save_pages_to_db
+
+    def timed_save(conn, pages, commit=True):
+        t0 = time.perf_counter()
+        counts = real_save(conn, pages, commit=commit)
+        dt = time.perf_counter() - t0
+        with lock:
+            write_lat.append(dt)
+            rows_seen.append(sum(len(v) for v, _ in pages))
+        return counts
+
+    collector.save_pages_to_db = timed_save
+
+    t0 = time.perf_counter()
+    collector.main(argv + ["--exit-on-cap"])
+    wall = time.perf_counter() - t0
+
+    with get_conn() as conn:
+        used = conn.execute("SELECT COALESCE(SUM(requests_used), 0) FROM collection_state").fetchone()[0]
+        videos = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    lat_ms = np.array(write_lat) * 1000.0 if write_lat else np.zeros(1)
+    Path(out).write_text(json.dumps({
+        "seconds": wall,
+        "requests_used": int(used),
+        "videos_in_db": int(videos),
+        "write_calls": len(write_lat),
+        "rows_written": int(sum(rows_seen)),
+        "write_ms_p50": float(np.percentile(lat_ms, 50)),
+        "write_ms_p95": float(np.percentile(lat_ms, 95)),
+        "write_ms_p99": float(np.percentile(lat_ms, 99)),
+        "write_ms_max": float(lat_ms.max()),
+    }), encoding="utf-8")
+    return 0
+
+
+# --------------------------------------------------------------------------------------
+# Parent: mock server per mode + child process
+# --------------------------------------------------------------------------------------
+
+def run_mode(name: str, argv: List[str], args, tmpdir: Path) -> Dict:
+    api = MockRedTubeAPI(config_from_args(args))
+    url = api.start()
+    out = tmpdir / f"{name}.json"
+    env = dict(os.environ)
+    env["MSC_API_BASE_URL"] = url
+    env["PYTHONPATH"] = os.pathsep.join([str(PROJECT_ROOT)] + [p for p in [env.get("PYTHONPATH")] if p])
+    cmd = [sys.executable, "-m", "src.collect.bench_collector", "--child",
+           "--db", str(tmpdir / f"{name}.db"), "--state", str(tmpdir / f"{name}_state.json"),
+           "--child_out", str(out), "--request_delay", str(args.request_delay), "--"] + argv
+    try:
+        proc = subprocess.run(cmd, cwd=str(PROJECT_ROOT), env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    finally:
+        api.stop()
+    if proc.returncode != 0 or not out.exists():
+        print(proc.stdout[-3000:])
+        raise RuntimeError(f"{name}: collector run failed (exit {proc.returncode})")
+    if args.verbose:
+        print(proc.stdout)
+
+    res = json.loads(out.read_text(encoding="utf-8"))
+    served = api.stats["requests"]
+    res.update({
+        "mode": name,
+        "argv": " ".join(argv),
+        "served": served,
+        "mock_stats": dict(api.stats),
+        "pages_per_sec": api.stats["pages"] / res["seconds"],
+        "rows_per_sec": res["rows_written"] / res["seconds"],
+        "quota_ok": res["requests_used"] == served,
+    })
+    return res
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark collector modes against the local mock API.")
+    add_mock_arguments(ap)
+    ap.add_argument("--modes", type=str, default="sequential,concurrent,pipeline,yield",
+                    help="Comma-separated subset of: " + ", ".join(mode_argv(1)))
+    ap.add_argument("--workers", type=int, default=4, help="Workers for concurrent/pipeline modes.")
+    ap.add_argument("--request_delay", type=float, default=0.0,
+                    help="Collector starting delay (the adaptive pacer takes over from there).")
+    ap.add_argument("--min_delay", type=float, default=0.1,
+                    help="Collector --min-delay (pacer rate ceiling); lower it to stress the write path.")
+    ap.add_argument("--out", type=str, default=None, help="Optional JSON output path.")
+    ap.add_argument("--verbose", action="store_true", help="Echo collector output.")
+    # child-process plumbing
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--db", type=str, help=argparse.SUPPRESS)
+    ap.add_argument("--state", type=str, help=argparse.SUPPRESS)
+    ap.add_argument("--child_out", type=str, help=argparse.SUPPRESS)
+    ap.add_argument("collector_args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        rest = [a for a in args.collector_args if a != "--"]
+        return run_child(args.db, args.state, args.child_out, args.request_delay, rest)
+
+    modes = mode_argv(args.workers)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_collector_") as td:
+        for name in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            if name not in modes:
+                raise SystemExit(f"Unknown mode '{name}'")
+            print(f"[bench] {name}: collector {' '.join(modes[name]) or '(defaults)'}")
+            results.append(run_mode(name, modes[name] + ["--min-delay", str(args.min_delay)], args, Path(td)))
+
+    print(f"\n{'mode':<11} {'secs':>7} {'pages/s':>8} {'rows/s':>9} {'w.p50ms':>8} {'w.p95ms':>8} "
+          f"{'w.p99ms':>8} {'videos':>7} {'used':>6} {'served':>6} {'quota':>6}")
+    for r in results:
+        print(f"{r['mode']:<11} {r['seconds']:>7.2f} {r['pages_per_sec']:>8.1f} {r['rows_per_sec']:>9.0f} "
+              f"{r['write_ms_p50']:>8.2f} {r['write_ms_p95']:>8.2f} {r['write_ms_p99']:>8.2f} "
+              f"{r['videos_in_db']:>7} {r['requests_used']:>6} {r['served']:>6} "
+              f"{'ok' if r['quota_ok'] else 'MISMATCH':>6}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"[ok] Wrote {out}")
+    return 0 if all(r["quota_ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
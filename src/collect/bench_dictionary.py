@@ -0,0 +1,275 @@
+"""
+src/collect/bench_dictionary.py
+
+Purpose
+-------
+Size and query-time report for the tag/category dictionary encoding:
+- legacy:  video_tags(video_id, tag TEXT) / video_categories(video_id, category TEXT)
+           with UNIQUE + text indexes (the pre-migration schema)
+- encoded: tags / categories dictionaries + WITHOUT ROWID integer link tables,
+           produced by running migrate_dictionary_encoding() on a copy of the
+           legacy file, queried through the compatibility views
+
+Both files are VACUUMed before measuring. The same SQL (the text-column queries
+used by the analysis scripts and the collector) runs against both, results are
+cross-checked, and median wall time over --repeat runs is reported. Full-scan
+aggregates through the views pay one dictionary lookup per link row; the
+`*_ids` row shows the id-native rewrite that avoids it.
+
+Inputs
+------
+- None (synthetic). Shape: Zipf-distributed tag vocabulary of pseudo-words,
+  --tags_per_video tags and 1-3 categories (+ source category) per video.
+
+Outputs
+-------
+- Console tables (per-object bytes when SQLite has dbstat); optional JSON via --out.
+
+Test Notes
+----------
+- python -m src.collect.bench_dictionary --videos 200000 --vocab 12000
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.collect.database import SCHEMA_SQL, apply_pragmas, migrate_dictionary_encoding
+
+# Pre-migration link tables, verbatim from the old SCHEMA_SQL
+LEGACY_LINK_SQL = """
+DROP VIEW video_tags;
+DROP VIEW video_categories;
+DROP TABLE video_tag_ids;
+DROP TABLE video_category_ids;
+DROP TABLE tags;
+DROP TABLE categories;
+
+CREATE TABLE IF NOT EXISTS video_tags (
+    video_id    INTEGER NOT NULL,
+    tag         TEXT    NOT NULL,
+    FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
+    UNIQUE(video_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_video_tags_tag ON video_tags(tag);
+
+CREATE TABLE IF NOT EXISTS video_categories (
+    video_id    INTEGER NOT NULL,
+    category    TEXT    NOT NULL,
+    FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
+    UNIQUE(video_id, category)
+);
+
+CREATE INDEX IF NOT EXISTS idx_video_categories_category ON video_categories(category);
+"""
+
+SYLLABLES = ["an", "ba", "cu", "de", "el", "fi", "go", "ha", "in", "jo", "ka", "li", "mo", "na",
+             "or", "pe", "qu", "ra", "si", "ta", "ul", "vi", "wo", "xe", "ya", "zo", "sh", "th"]
+
+
+def _vocabulary(n: int, rnd: random.Random) -> List[str]:
+    words, seen = [], set()
+    while len(words) < n:
+        w = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 5)))
+        if rnd.random() < 0.35:
+            w += " " + "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4)))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words
+
+
+def build_legacy_db(path: Path, n_videos: int, vocab: int, tags_per_video: int,
+                    n_categories: int, seed: int) -> Tuple[List[str], List[str]]:
+    """Legacy-schema DB with a realistic tag/category distribution; returns (tags, categories)."""
+    rnd = random.Random(seed)
+    tags = _vocabulary(vocab, rnd)
+    cats = _vocabulary(n_categories, rnd)
+    tag_w = [1.0 / (r + 1) ** 1.1 for r in range(len(tags))]
+    cat_w = [1.0 / (r + 1) ** 0.8 for r in range(len(cats))]
+
+    conn = sqlite3.connect(str(path))
+    apply_pragmas(conn)
+    conn.executescript(SCHEMA_SQL)
+    conn.executescript(LEGACY_LINK_SQL)
+    batch = 5000
+    for start in range(0, n_videos, batch):
+        v_rows, t_rows, c_rows = [], [], []
+        for vid in range(1_000_000 + start, 1_000_000 + min(n_videos, start + batch)):
+            src = rnd.choices(cats, cat_w)[0]
+            v_rows.append((vid, f"video title {vid}", f"https://example.invalid/{vid}", rnd.randint(30, 3600),
+                           rnd.randint(0, 5_000_000), round(rnd.uniform(0, 100), 1), rnd.randint(0, 2000),
+                           f"20{rnd.randint(10, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                           src, 1, "2025-01-01T00:00:00+00:00"))
+            k = max(1, int(rnd.gauss(tags_per_video, tags_per_video / 3)))
+            t_rows += [(vid, t) for t in set(rnd.choices(tags, tag_w, k=k))]
+            c_rows += [(vid, c) for c in set(rnd.choices(cats, cat_w, k=rnd.randint(1, 3)) + [src])]
+        conn.executemany("INSERT INTO videos(video_id, title, url, duration, views, rating, ratings, publish_date, "
+                         "category_source, is_active, retrieved_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)", v_rows)
+        conn.executemany("INSERT OR IGNORE INTO video_tags(video_id, tag) VALUES (?, ?)", t_rows)
+        conn.executemany("INSERT OR IGNORE INTO video_categories(video_id, category) VALUES (?, ?)", c_rows)
+        conn.commit()
+    conn.close()
+    return tags, cats
+
+
+def object_sizes(conn: sqlite3.Connection) -> Optional[Dict[str, int]]:
+    """Bytes per table/index via the dbstat virtual table (None if not compiled in)."""
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC").fetchall()
+    except sqlite3.Error:
+        return None
+    return {r[0]: int(r[1]) for r in rows}
+
+
+def _sorted_rows(rows) -> List:
+    return sorted(tuple(r) for r in rows)
+
+
+def _tag_sets(rows) -> Dict:
+    return {r[0]: sorted(r[1].split("\x1f")) for r in rows}
+
+
+def query_suite(tags: List[str], cats: List[str]) -> List[Tuple[str, str, Callable, Callable, Callable]]:
+    """(name, description, run_legacy(conn), run_encoded(conn), normalise(rows))."""
+    probe_tags = tags[20:70]           # mid-frequency tags
+    probe_cats = cats[:10]
+
+    def tag_agg(conn):
+        return conn.execute(
+            "SELECT video_id, GROUP_CONCAT(tag, char(31)) FROM video_tags GROUP BY video_id"
+        ).fetchall()
+
+    def tag_freq(conn):
+        return conn.execute(
+            "SELECT tag, COUNT(*) FROM video_tags GROUP BY tag ORDER BY 2 DESC, 1 LIMIT 100"
+        ).fetchall()
+
+    def tag_lookup(conn):
+        return [conn.execute("SELECT COUNT(*) FROM video_tags WHERE tag = ?", (t,)).fetchone()[0]
+                for t in probe_tags]
+
+    def category_ids(conn):
+        return [len(conn.execute("SELECT video_id FROM video_categories WHERE category = ?", (c,)).fetchall())
+                for c in probe_cats]
+
+    def tag_join_views(conn):
+        return [conn.execute(
+            "SELECT COUNT(*), AVG(v.views) FROM videos v JOIN video_tags vt ON vt.video_id = v.video_id "
+            "WHERE vt.tag = ?", (t,)).fetchone()[:] for t in probe_tags[:10]]
+
+    # Id-native rewrite (encoded DB only): count on integers, decode only the top rows
+    def tag_freq_ids(conn):
+        return conn.execute("""
+            SELECT t.tag, x.n FROM (
+                SELECT tag_id, COUNT(*) AS n FROM video_tag_ids GROUP BY tag_id
+            ) x JOIN tags t ON t.tag_id = x.tag_id
+            ORDER BY 2 DESC, 1 LIMIT 100
+        """).fetchall()
+
+    return [
+        ("tag_agg", "GROUP_CONCAT tags per video (analysis temp_vt_agg)", tag_agg, tag_agg, _tag_sets),
+        ("tag_freq", "top-100 tag frequencies", tag_freq, tag_freq, _sorted_rows),
+        ("tag_freq_ids", "same, encoded side counts tag_ids first", tag_freq, tag_freq_ids, _sorted_rows),
+        ("tag_lookup", f"COUNT(*) for {len(probe_tags)} single tags", tag_lookup, tag_lookup, list),
+        ("category_ids", f"video_ids of {len(probe_cats)} categories (collector)", category_ids, category_ids, list),
+        ("tag_join", "videos JOIN video_tags for 10 tags", tag_join_views, tag_join_views, list),
+    ]
+
+
+def time_query(path: Path, fn: Callable, repeat: int):
+    times, rows = [], None
+    for _ in range(repeat):
+        conn = sqlite3.connect(str(path))
+        t0 = time.perf_counter()
+        rows = fn(conn)
+        times.append(time.perf_counter() - t0)
+        conn.close()
+    return statistics.median(times), rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Size/query-time report: legacy text link tables vs dictionary encoding.")
+    ap.add_argument("--videos", type=int, default=200_000, help="Synthetic videos.")
+    ap.add_argument("--vocab", type=int, default=12_000, help="Distinct tags (Zipf-distributed usage).")
+    ap.add_argument("--tags_per_video", type=int, default=12, help="Mean tags per video.")
+    ap.add_argument("--categories", type=int, default=90, help="Distinct categories.")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per query (median reported).")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--keep_dir", type=str, default=None, help="Write the two DBs here instead of a temp dir.")
+    ap.add_argument("--out", type=str, default=None, help="Optional JSON output path.")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench_dictionary_") as td:
+        root = Path(args.keep_dir) if args.keep_dir else Path(td)
+        root.mkdir(parents=True, exist_ok=True)
+        legacy, encoded = root / "legacy.db", root / "encoded.db"
+        for p in (legacy, encoded):
+            p.unlink(missing_ok=True)
+
+        print(f"[build] {args.videos:,} videos, vocab {args.vocab:,}, ~{args.tags_per_video} tags/video")
+        tags, cats = build_legacy_db(legacy, args.videos, args.vocab, args.tags_per_video, args.categories, args.seed)
+        shutil.copyfile(legacy, encoded)
+
+        conn = sqlite3.connect(str(encoded))
+        apply_pragmas(conn)
+        t0 = time.perf_counter()
+        migrate_dictionary_encoding(conn)
+        migrate_secs = time.perf_counter() - t0
+        conn.close()
+        print(f"[build] Migration took {migrate_secs:.2f}s")
+
+        sizes, objects = {}, {}
+        for name, path in (("legacy", legacy), ("encoded", encoded)):
+            conn = sqlite3.connect(str(path))
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("VACUUM")
+            objects[name] = object_sizes(conn)
+            conn.close()
+            sizes[name] = path.stat().st_size
+
+        print(f"\n{'file':<8} {'bytes':>14} {'MiB':>9}")
+        for name in ("legacy", "encoded"):
+            print(f"{name:<8} {sizes[name]:>14,} {sizes[name] / 2**20:>9.1f}")
+        print(f"[size] encoded/legacy = {sizes['encoded'] / sizes['legacy']:.2f} "
+              f"({(1 - sizes['encoded'] / sizes['legacy']) * 100:.0f}% smaller)")
+        for name in ("legacy", "encoded"):
+            if objects[name]:
+                print(f"[size] {name}: " + ", ".join(f"{k}={v / 2**20:.1f}MiB" for k, v in objects[name].items()
+                                                  if not k.startswith("sqlite_") or v > 2**20))
+
+        results = []
+        print(f"\n{'query':<13} {'legacy ms':>10} {'encoded ms':>11} {'speedup':>8} {'match':>6}  description")
+        for qname, desc, fn_leg, fn_enc, norm in query_suite(tags, cats):
+            t_leg, r_leg = time_query(legacy, fn_leg, args.repeat)
+            t_enc, r_enc = time_query(encoded, fn_enc, args.repeat)
+            match = norm(r_leg) == norm(r_enc)
+            results.append({"query": qname, "description": desc, "legacy_ms": t_leg * 1000,
+                            "encoded_ms": t_enc * 1000, "speedup": t_leg / t_enc if t_enc else None,
+                            "match": match})
+            print(f"{qname:<13} {t_leg * 1000:>10.1f} {t_enc * 1000:>11.1f} {t_leg / t_enc:>7.2f}x "
+                  f"{'ok' if match else 'DIFF':>6}  {desc}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps({"params": vars(args), "bytes": sizes, "objects": objects,
+                                   "migrate_secs": migrate_secs, "queries": results}, indent=2), encoding="utf-8")
+        print(f"[ok] Wrote {out}")
+    return 0 if all(r["match"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
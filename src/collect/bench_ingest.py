@@ -0,0 +1,160 @@
+"""
+src/collect/bench_ingest.py
+
+Purpose
+-------
+Micro-benchmark for the collector's DB write path on a synthetic page stream:
+- legacy:      save_videos_to_db (per-row existence probe + upsert, commit per page)
+- bulk_page:   save_pages_to_db, one page per transaction
+- bulk_batch:  save_pages_to_db, --batch_pages pages per transaction
+
+The trigger-maintained EDA aggregates (src.utils.eda_aggregates) are built on
+each fresh DB like production; --no_aggregates measures the write path without them.
+
+Each variant ingests the same stream into a fresh SQLite file (same pragmas as
+production) and reports rows/sec. New-row counts are cross-checked so the bulk
+path is verified to feed the duplicate-streak logic the exact same numbers.
+
+Inputs
+------
+- None (synthetic). Page stream shape controlled via CLI.
+
+Outputs
+-------
+- Console table; optional JSON via --out.
+
+Test Notes
+----------
+- python -m src.collect.bench_ingest --pages 500 --dup_ratio 0.5
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Dict, List, Tuple
+
+from src.collect.database import SCHEMA_SQL, PUBLISH_INDEX_SQL, apply_pragmas
+from src.utils.eda_aggregates import build_eda_aggregates
+from src.collect.collector import save_videos_to_db, save_pages_to_db
+
+PAGE_SIZE = 20
+
+
+def synthetic_pages(n_pages: int, dup_ratio: float, n_tags: int, seed: int = 75) -> List[Tuple[list, str]]:
+    """
+    Build API-shaped pages. `dup_ratio` of each page re-uses ids already emitted
+    (simulates cross-category overlap and re-crawled pages).
+    """
+    rnd = random.Random(seed)
+    cats = [f"cat_{i}" for i in range(20)]
+    tags = [f"tag_{i}" for i in range(n_tags)]
+    emitted: List[int] = []
+    next_id = 1_000_000
+    pages = []
+    for p in range(n_pages):
+        cat = cats[p % len(cats)]
+        videos = []
+        for _ in range(PAGE_SIZE):
+            if emitted and rnd.random() < dup_ratio:
+                vid = rnd.choice(emitted)
+            else:
+                vid = next_id
+                next_id += 1
+                emitted.append(vid)
+            videos.append({"video": {
+                "video_id": vid,
+                "title": f"synthetic title {vid}",
+                "url": f"https://example.invalid/{vid}",
+                "duration": f"{rnd.randint(0, 59)}:{rnd.randint(0, 59):02d}",
+                "views": rnd.randint(0, 5_000_000),
+                "rating": round(rnd.uniform(0, 100), 1),
+                "ratings": rnd.randint(0, 2000),
+                "publish_date": f"20{rnd.randint(10, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 00:00:00",
+                "tags": [{"tag_name": t} for t in rnd.sample(tags, 8)],
+                "categories": [{"category": c} for c in rnd.sample(cats, 3)],
+            }})
+        pages.append((videos, cat))
+    return pages
+
+
+def _fresh_db(tmpdir: Path, name: str, aggregates: bool = True) -> sqlite3.Connection:
+    path = tmpdir / f"{name}.db"
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn)
+    conn.executescript(SCHEMA_SQL + PUBLISH_INDEX_SQL)
+    if aggregates:
+        build_eda_aggregates(conn)
+    return conn
+
+
+def run_variant(name: str, pages: List[Tuple[list, str]], tmpdir: Path, batch_pages: int,
+                aggregates: bool = True) -> Dict:
+    conn = _fresh_db(tmpdir, name, aggregates)
+    new_counts: List[int] = []
+    t0 = time.perf_counter()
+    if name == "legacy":
+        for videos, cat in pages:
+            new_counts.append(save_videos_to_db(conn, videos, cat))
+    else:
+        step = 1 if name == "bulk_page" else batch_pages
+        for i in range(0, len(pages), step):
+            new_counts += save_pages_to_db(conn, pages[i:i + step])
+    elapsed = time.perf_counter() - t0
+    rows = sum(len(v) for v, _ in pages)
+    n_videos = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    conn.close()
+    return {
+        "variant": name,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else float("inf"),
+        "new_total": sum(new_counts),
+        "videos_in_db": n_videos,
+        "new_counts": new_counts,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark collector ingest: legacy vs bulk upsert.")
+    ap.add_argument("--pages", type=int, default=500, help="Synthetic pages to ingest (20 videos each).")
+    ap.add_argument("--dup_ratio", type=float, default=0.4, help="Share of videos per page that were seen before.")
+    ap.add_argument("--tags", type=int, default=3000, help="Distinct tag vocabulary size.")
+    ap.add_argument("--batch_pages", type=int, default=25, help="Pages per transaction for bulk_batch.")
+    ap.add_argument("--no_aggregates", action="store_true", help="Skip the EDA aggregate triggers.")
+    ap.add_argument("--out", type=str, default=None, help="Optional JSON output path.")
+    args = ap.parse_args(argv)
+
+    pages = synthetic_pages(args.pages, args.dup_ratio, args.tags)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_ingest_") as td:
+        for name in ("legacy", "bulk_page", "bulk_batch"):
+            results.append(run_variant(name, pages, Path(td), args.batch_pages, not args.no_aggregates))
+
+    base = results[0]
+    print(f"{'variant':<12} {'rows':>8} {'seconds':>9} {'rows/sec':>11} {'speedup':>8} {'new':>7}")
+    for r in results:
+        print(f"{r['variant']:<12} {r['rows']:>8} {r['seconds']:>9.3f} {r['rows_per_sec']:>11.0f} "
+              f"{r['rows_per_sec'] / base['rows_per_sec']:>7.2f}x {r['new_total']:>7}")
+        if r["new_counts"] != base["new_counts"]:
+            print(f"[warn] {r['variant']}: per-page new counts differ from legacy!")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        payload = [{k: v for k, v in r.items() if k != "new_counts"} for r in results]
+        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"[ok] Wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
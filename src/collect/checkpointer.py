@@ -0,0 +1,159 @@
+"""
+src/collect/checkpointer.py
+
+Purpose
+-------
+Background WAL checkpoint manager for long-running collection. SQLite's
+default auto-checkpoint (PASSIVE, every ~1000 pages, inside whichever writer
+commits) never shrinks the -wal file and cannot finish while analysis readers
+hold old snapshots, so multi-day crawls next to readers leave a large WAL that
+every reader has to search.
+
+- Every `interval` s: PASSIVE checkpoint (never blocks the writer or readers;
+  copies what no reader still needs). Skipped when nothing was committed and
+  the last one left no lag.
+- Idle windows (no commit by any connection for `idle_secs`, seen through
+  PRAGMA data_version): TRUNCATE checkpoint, which waits up to `busy_ms` for
+  readers and resets the -wal file to zero bytes. At most one attempt per
+  interval while it keeps failing, and none again until the next write.
+- close(): one last TRUNCATE, so a finished run leaves no WAL behind.
+
+Inputs
+------
+- db_path of the project DB; the manager opens its own connection in its thread.
+- on_checkpoint(mode, result, seconds): optional callback (metrics).
+
+Outputs
+-------
+- wal_bytes(): current -wal size; lag_frames: frames the last checkpoint could
+  not copy (pinned by readers); last_complete: monotonic time of the last
+  checkpoint that copied everything.
+
+Failure Modes
+-------------
+- A checkpoint that hits a lock or busy readers reports result "busy" /
+  "partial"; the next one catches up. OperationalError -> "error" + warning,
+  the thread keeps running.
+
+Test Notes
+----------
+- python src/collect/collector.py --checkpoint-interval 5 --checkpoint-idle 10 --metrics-dir data/metrics
+- grep wal_ data/metrics/collector.prom
+"""
+
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+DEFAULT_INTERVAL_SECS = 30.0   # PASSIVE checkpoint cadence
+DEFAULT_IDLE_SECS = 10.0       # no commits for this long = idle window (TRUNCATE)
+DEFAULT_BUSY_MS = 1000         # how long a TRUNCATE may wait for readers (writers wait too)
+
+
+class WalCheckpointer:
+    """Thread running scheduled PASSIVE and idle-window TRUNCATE checkpoints on `db_path`."""
+
+    def __init__(self, db_path: Path, interval: float = DEFAULT_INTERVAL_SECS,
+                 idle_secs: float = DEFAULT_IDLE_SECS, busy_ms: int = DEFAULT_BUSY_MS,
+                 journal_size_limit: Optional[int] = None,
+                 on_checkpoint: Optional[Callable[[str, str, float], None]] = None):
+        self.db_path = Path(db_path)
+        self.wal_path = self.db_path.with_name(self.db_path.name + "-wal")
+        self.interval = max(0.5, float(interval))
+        self.idle_secs = max(0.5, float(idle_secs))
+        self.busy_ms = max(0, int(busy_ms))
+        self.journal_size_limit = journal_size_limit
+        self.on_checkpoint = on_checkpoint
+        self.counts = {"PASSIVE": 0, "TRUNCATE": 0}
+        self.lag_frames = 0
+        self.last_complete = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- stats ----------
+
+    def wal_bytes(self) -> int:
+        try:
+            return self.wal_path.stat().st_size
+        except OSError:
+            return 0
+
+    def describe(self) -> str:
+        return (f"{self.counts['PASSIVE']} passive / {self.counts['TRUNCATE']} truncate checkpoints, "
+                f"wal {self.wal_bytes() / 1e6:.1f} MB, lag {self.lag_frames} frames")
+
+    # ---------- checkpoints ----------
+
+    def _checkpoint(self, conn: sqlite3.Connection, mode: str) -> str:
+        t0 = time.perf_counter()
+        try:
+            busy, log, done = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"[wal] {mode} checkpoint failed: {e}")
+            result = "error"
+        else:
+            if busy:
+                result = "busy"
+            elif log >= 0 and done < log:
+                result = "partial"
+            else:
+                result = "complete"
+            if not busy:
+                self.lag_frames = max(0, log - done)
+            if result == "complete":
+                self.lag_frames = 0
+                self.last_complete = time.monotonic()
+        seconds = time.perf_counter() - t0
+        self.counts[mode] += 1
+        if self.on_checkpoint is not None:
+            self.on_checkpoint(mode.lower(), result, seconds)
+        return result
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute(f"PRAGMA busy_timeout={self.busy_ms}")
+        if self.journal_size_limit is not None:
+            conn.execute(f"PRAGMA journal_size_limit={int(self.journal_size_limit)}")
+        try:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            now = time.monotonic()
+            last_write = last_passive = now
+            last_truncate_try = now - self.interval
+            pending = True               # writes since the last PASSIVE
+            dirty = True                 # writes since the last complete TRUNCATE
+            poll = min(self.interval, self.idle_secs) / 4
+            while not self._stop.wait(poll):
+                now = time.monotonic()
+                v = conn.execute("PRAGMA data_version").fetchone()[0]
+                if v != version:
+                    version, last_write, pending, dirty = v, now, True, True
+                if now - last_passive >= self.interval:
+                    if pending or self.lag_frames:
+                        self._checkpoint(conn, "PASSIVE")
+                        pending = False
+                    last_passive = now
+                if (dirty and now - last_write >= self.idle_secs
+                        and now - last_truncate_try >= self.interval):
+                    last_truncate_try = now
+                    if self._checkpoint(conn, "TRUNCATE") == "complete":
+                        dirty = False
+            if self.wal_bytes() > 0:
+                self._checkpoint(conn, "TRUNCATE")
+        finally:
+            conn.close()
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> "WalCheckpointer":
+        self._thread = threading.Thread(target=self._run, name="wal-checkpointer", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
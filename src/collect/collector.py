@@ -1,6 +1,11 @@
 import os
 import json
 import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 import sys
@@ -13,19 +18,36 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from src.utils.database import get_conn, DB_FILE  # upgraded DB utils (WAL/FKs/ctxmgr)
+from src.collect.database import (get_conn, create_connection, migrate_collection_state,
+                                  migrate_dictionary_encoding, migrate_publish_columns, intern_terms,
+                                  publish_day_expr, publish_ym_expr, DB_FILE,
+                                  set_journal_size_limit, JOURNAL_SIZE_LIMIT)  # upgraded DB utils (WAL/FKs/ctxmgr)
+from src.utils.video_docs import ensure_video_docs_table, refresh_video_docs
+from src.utils.eda_aggregates import ensure_eda_aggregates
+from src.collect.seen_index import SeenIndex, default_index_path
+from src.collect.quota_ledger import QuotaLedger, DEFAULT_BLOCK_SIZE, DEFAULT_FLUSH_SECS
+from src.collect.raw_archive import RawArchive, iter_records, list_segments, record_videos
+from src.collect.pacer import AdaptivePacer
+from src.collect.scheduler import YieldScheduler, DEFAULT_WINDOW
+from src.collect.refresh import RefreshPlanner, DEFAULT_SHARE, DEFAULT_BATCH, DEFAULT_MIN_AGE_DAYS
+from src.collect.leases import LeaseManager, DEFAULT_TTL_SECS, default_owner
+from src.collect.metrics import MetricsRegistry, MetricsExporter
+from src.collect.checkpointer import WalCheckpointer, DEFAULT_INTERVAL_SECS, DEFAULT_IDLE_SECS, DEFAULT_BUSY_MS
 
 # -----------------------------------------------------------------------------
 # Config
 # -----------------------------------------------------------------------------
-API_BASE_URL = "https://api.redtube.com/"
+API_BASE_URL = os.environ.get("MSC_API_BASE_URL", "https://api.redtube.com/")  # override for mock_api.py
 API_DAILY_LIMIT = 29999          # safety margin below the hard 30k/day
-REQUEST_DELAY = 0.35             # polite pacing between requests (seconds)
+REQUEST_DELAY = 0.35             # starting delay between requests; AdaptivePacer tunes it (seconds)
+RETRY_TOTAL = 5                  # urllib3 retries per GET; each one is a real (billed) API call
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]  # align with database.py
 DATA_DIR = PROJECT_ROOT / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
-STATE_FILE = DATA_DIR / "collector_state.json"
+STATE_FILE = DATA_DIR / "collector_state.json"  # legacy resume state; imported once into resume_state
+SEEN_INDEX_FILE = default_index_path(DB_FILE)  # global known-video_id index (see seen_index.py)
+RAW_ARCHIVE_DIR = DATA_DIR / "raw_api"         # gzip NDJSON segments of raw searchVideos pages
 
 TIMEOUT = (10, 30)  # (connect, read) seconds
 
@@ -40,15 +62,78 @@ EXISTING_CAT_DUP_LIMIT = 9999
 ORDERING = None     # e.g., 'newest'
 PERIOD   = None     # e.g., 'monthly' (only used when ORDERING is set)
 
+# Concurrent mode: number of categories crawled at once (1 = classic sequential loop)
+DEFAULT_WORKERS = 1
+
+# Quota ledger (set in main): requests are reserved from collection_state in blocks
+LEDGER: Optional[QuotaLedger] = None
+
+# Latest total `count` reported by searchVideos per category (yield scheduler input)
+CATEGORY_TOTALS: dict = {}
+
+# Adaptive pacing (set in main): one AIMD schedule shared by all fetchers
+PACER: Optional[AdaptivePacer] = None
+
+# Raw response archive (set in main with --archive); replayable with --replay
+ARCHIVE: Optional[RawArchive] = None
+
+# WAL checkpoint manager (set in main unless --checkpoint-interval 0)
+CHECKPOINTER: Optional[WalCheckpointer] = None
+
+# Pipeline mode: fetchers -> bounded queue -> single DB writer thread
+WRITER_QUEUE_PAGES = 16   # backpressure: fetchers block once this many pages are pending
+WRITER_BATCH_PAGES = 25   # max pages folded into one writer transaction
+
+# Telemetry: always collected (cheap), exported with --metrics-dir
+METRICS_DIR = DATA_DIR / "metrics"
+METRICS = MetricsRegistry(prefix="collector_")
+M_HTTP_SECONDS = METRICS.histogram("http_seconds", "API GET wall time incl. adapter retries", ("method",))
+M_HTTP_REQUESTS = METRICS.counter("http_responses_total", "Final API responses by HTTP status", ("method", "status"))
+M_HTTP_RETRIES = METRICS.counter("http_retries_total", "Extra attempts sent by the Retry adapter", ("method",))
+M_NET_ERRORS = METRICS.counter("network_errors_total", "GETs that failed without a response", ("method",))
+M_PARSE_SECONDS = METRICS.histogram("parse_seconds", "JSON decode time per response", ("method",))
+M_DB_WRITE_SECONDS = METRICS.histogram("db_write_seconds", "save_pages_to_db time per call")
+M_PAGES = METRICS.counter("pages_total", "searchVideos pages with videos", ("category",))
+M_ROWS = METRICS.counter("rows_total", "Video rows written per category (new/updated/linked)", ("category", "kind"))
+M_QUOTA_REMAINING = METRICS.gauge("quota_remaining", "Daily requests left for this quota key")
+M_QUOTA_USED = METRICS.gauge("quota_used_run", "Requests charged by this process")
+M_PACER_RATE = METRICS.gauge("pacer_rate", "Current AIMD request rate (req/s)")
+M_QUOTA_REMAINING.set_function(lambda: LEDGER.remaining() if LEDGER is not None else None)
+M_QUOTA_USED.set_function(lambda: LEDGER.used_today if LEDGER is not None else None)
+M_PACER_RATE.set_function(lambda: PACER.rate if PACER is not None else None)
+M_WAL_BYTES = METRICS.gauge("wal_bytes", "Size of the DB's -wal file")
+M_WAL_LAG = METRICS.gauge("wal_checkpoint_lag_frames", "WAL frames the last checkpoint could not copy (pinned by readers)")
+M_WAL_AGE = METRICS.gauge("wal_checkpoint_age_seconds", "Seconds since the last checkpoint that copied every frame")
+M_CHECKPOINTS = METRICS.counter("wal_checkpoints_total", "Checkpoints run by the manager", ("mode", "result"))
+M_CHECKPOINT_SECONDS = METRICS.histogram("wal_checkpoint_seconds", "Checkpoint wall time", ("mode",))
+M_WAL_BYTES.set_function(lambda: CHECKPOINTER.wal_bytes() if CHECKPOINTER is not None else None)
+M_WAL_LAG.set_function(lambda: CHECKPOINTER.lag_frames if CHECKPOINTER is not None else None)
+M_WAL_AGE.set_function(lambda: time.monotonic() - CHECKPOINTER.last_complete if CHECKPOINTER is not None else None)
+
+
+def _on_checkpoint(mode: str, result: str, seconds: float) -> None:
+    M_CHECKPOINTS.labels(mode, result).inc()
+    M_CHECKPOINT_SECONDS.labels(mode).observe(seconds)
 
 
 # -----------------------------------------------------------------------------
 # Robust session with retries (idempotent GETs)
 # -----------------------------------------------------------------------------
+_RETRY_LOG = threading.local()  # per-thread count of failed attempts in the current api_get
+
+
+class _CountingRetry(Retry):
+    """Retry that tallies every failed attempt, so api_get can refund unsent ones even on errors."""
+
+    def increment(self, *args, **kwargs):
+        _RETRY_LOG.failed = getattr(_RETRY_LOG, "failed", 0) + 1
+        return super().increment(*args, **kwargs)
+
+
 def make_session() -> requests.Session:
     s = requests.Session()
-    retries = Retry(
-        total=5,
+    retries = _CountingRetry(
+        total=RETRY_TOTAL,
         backoff_factor=1.2,
         status_forcelist=(429, 500, 502, 503, 504),
         allowed_methods=("GET",),
@@ -62,11 +147,10 @@ def make_session() -> requests.Session:
     return s
 
 # -----------------------------------------------------------------------------
-# JSON state (fine-grained progress); DB 'collection_state' (authoritative rate)
+# Resume state (DB 'resume_state', written in the page's transaction);
+# DB 'collection_state' (authoritative rate)
 # -----------------------------------------------------------------------------
-def load_state() -> dict:
-    if STATE_FILE.exists():
-        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+def _empty_state() -> dict:
     return {
         "categories": None,
         "current_category_index": 0,  # retained for backwards-compat
@@ -74,12 +158,62 @@ def load_state() -> dict:
         "current_page": 1,
     }
 
-def save_state(state: dict) -> None:
-    STATE_FILE.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+def ensure_resume_state_table(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resume_state(
+            id               INTEGER PRIMARY KEY CHECK (id = 1),
+            categories       TEXT,               -- JSON array (cached category list)
+            current_category TEXT,
+            current_page     INTEGER NOT NULL DEFAULT 1,
+            updated_at       TEXT
+        )
+    """)
+    conn.commit()
+
+def load_state(conn) -> dict:
+    """Single-row resume state; a legacy collector_state.json is imported once."""
+    ensure_resume_state_table(conn)
+    row = conn.execute(
+        "SELECT categories, current_category, current_page FROM resume_state WHERE id = 1"
+    ).fetchone()
+    state = _empty_state()
+    if row is not None:
+        state["categories"] = json.loads(row["categories"]) if row["categories"] else None
+        state["current_category"] = row["current_category"]
+        state["current_page"] = int(row["current_page"] or 1)
+    elif STATE_FILE.exists():
+        state.update(json.loads(STATE_FILE.read_text(encoding="utf-8")))
+        save_state(conn, state)
+        print(f"[state] Imported legacy {STATE_FILE.name} into resume_state (the file is no longer written)")
+    return state
+
+def save_state(conn, state: dict, commit: bool = True) -> None:
+    """Upsert the resume row; commit=False lets it ride in the caller's page transaction."""
+    cats = state.get("categories")
+    conn.execute("""
+        INSERT INTO resume_state(id, categories, current_category, current_page, updated_at)
+        VALUES(1, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            categories=excluded.categories,
+            current_category=excluded.current_category,
+            current_page=excluded.current_page,
+            updated_at=excluded.updated_at
+    """, (json.dumps(cats, ensure_ascii=False) if cats is not None else None,
+          state.get("current_category"), int(state.get("current_page") or 1), now_iso()))
+    if commit:
+        conn.commit()
+
+def clear_state(conn) -> None:
+    ensure_resume_state_table(conn)
+    conn.execute("DELETE FROM resume_state")
+    conn.commit()
+    STATE_FILE.unlink(missing_ok=True)  # never re-import a stale legacy file
 
 # -----------------------------------------------------------------------------
-# Rate limiting stored in DB: collection_state(day, requests_used, last_page_fetched, reset_at)
+# Rate limiting stored in DB: collection_state(day, quota_key, requests_used, last_page_fetched, reset_at)
 # -----------------------------------------------------------------------------
+QUOTA_KEY = "default"  # budget row for this process (--quota-key; one per API key / egress IP)
+
 def _utc_today_str() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
@@ -91,19 +225,26 @@ def _next_midnight_utc(now: Optional[datetime] = None) -> datetime:
 def load_or_init_rate_state(conn) -> dict:
     day = _utc_today_str()
     cur = conn.execute(
-        "SELECT day, requests_used, last_page_fetched, reset_at FROM collection_state WHERE day = ?",
-        (day,),
+        "SELECT day, requests_used, last_page_fetched, reset_at FROM collection_state WHERE day = ? AND quota_key = ?",
+        (day, QUOTA_KEY),
     )
     row = cur.fetchone()
     if row:
         return dict(row)
     reset_at = _next_midnight_utc().isoformat()
+    # OR IGNORE: several workers may race to create today's row
     conn.execute(
-        "INSERT INTO collection_state(day, requests_used, last_page_fetched, reset_at) VALUES(?, ?, ?, ?)",
-        (day, 0, 0, reset_at),
+        "INSERT OR IGNORE INTO collection_state(day, quota_key, requests_used, last_page_fetched, reset_at) "
+        "VALUES(?, ?, ?, ?, ?)",
+        (day, QUOTA_KEY, 0, 0, reset_at),
     )
     return {"day": day, "requests_used": 0, "last_page_fetched": 0, "reset_at": reset_at}
 
+def _sleep_secs_until_reset(state: dict) -> int:
+    reset_at = datetime.fromisoformat(state["reset_at"])
+    now = datetime.now(timezone.utc)
+    return max(1, int((reset_at - now).total_seconds()))
+
 def can_consume_requests(conn, n: int = 1) -> Tuple[bool, int]:
     """
     Returns (allowed, sleep_seconds).
@@ -112,17 +253,117 @@ def can_consume_requests(conn, n: int = 1) -> Tuple[bool, int]:
     state = load_or_init_rate_state(conn)
     if state["requests_used"] + n <= API_DAILY_LIMIT:
         return True, 0
-    reset_at = datetime.fromisoformat(state["reset_at"])
-    now = datetime.now(timezone.utc)
-    sleep_secs = max(1, int((reset_at - now).total_seconds()))
-    return False, sleep_secs
+    return False, _sleep_secs_until_reset(state)
 
 def consume_requests(conn, n: int = 1) -> None:
     day = _utc_today_str()
     conn.execute(
-        "UPDATE collection_state SET requests_used = requests_used + ? WHERE day = ?",
-        (n, day),
+        "UPDATE collection_state SET requests_used = requests_used + ? WHERE day = ? AND quota_key = ?",
+        (n, day, QUOTA_KEY),
+    )
+
+def try_consume_requests(conn, n: int = 1) -> Tuple[bool, int]:
+    """
+    Atomic check-and-consume against collection_state (safe across threads and
+    processes sharing the DB). Returns (allowed, sleep_seconds) like
+    can_consume_requests; when allowed, the n requests are already counted.
+    Commits immediately so other connections see the new total.
+    """
+    state = load_or_init_rate_state(conn)
+    cur = conn.execute(
+        """
+        UPDATE collection_state SET requests_used = requests_used + ?
+        WHERE day = ? AND quota_key = ? AND requests_used + ? <= ?
+        """,
+        (n, state["day"], QUOTA_KEY, n, API_DAILY_LIMIT),
+    )
+    conn.commit()
+    if cur.rowcount == 1:
+        return True, 0
+    return False, _sleep_secs_until_reset(state)
+
+def acquire_request(conn, n: int = 1) -> Tuple[bool, int]:
+    """Budget gate for every API call: in-memory ledger if running, else direct DB."""
+    if LEDGER is not None:
+        return LEDGER.acquire(n)
+    return try_consume_requests(conn, n)
+
+def release_requests(conn, n: int) -> None:
+    """Give back requests that were acquired but never sent."""
+    if n <= 0:
+        return
+    if LEDGER is not None:
+        LEDGER.refund(n)
+        return
+    conn.execute(
+        "UPDATE collection_state SET requests_used = MAX(0, requests_used - ?) WHERE day = ? AND quota_key = ?",
+        (n, _utc_today_str(), QUOTA_KEY),
     )
+    conn.commit()
+
+def _retry_history(resp: requests.Response) -> tuple:
+    """Attempts the urllib3 Retry adapter made before this final response."""
+    retries = getattr(getattr(resp, "raw", None), "retries", None)
+    return tuple(getattr(retries, "history", None) or ())
+
+def _retry_after_secs(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(Retry(0).parse_retry_after(value))
+    except Exception:
+        return None
+
+def api_get(session: requests.Session, conn, params: dict) -> requests.Response:
+    """
+    One logical API GET: paced, quota-accounted per real attempt.
+
+    The Retry adapter may send up to RETRY_TOTAL extra attempts, and each one
+    counts against the daily cap, so 1 + RETRY_TOTAL requests are reserved up
+    front and the unused ones handed back once the attempts are known (also
+    when the GET raises, from the failed attempts the Retry adapter counted).
+    Every attempt is therefore counted exactly once and the cap is never
+    overshot (at the cost of stopping up to RETRY_TOTAL requests early).
+    """
+    reserve = 1 + RETRY_TOTAL
+    allowed, sleep_secs = acquire_request(conn, n=reserve)
+    if not allowed:
+        raise RateLimitHit(f"Cap reached. Sleep {sleep_secs}s until reset.")
+    if PACER is not None:
+        PACER.wait()
+    method = _method_label(params)
+    _RETRY_LOG.failed = 0
+    t0 = time.perf_counter()
+    try:
+        resp = session.get(API_BASE_URL, params=params, timeout=TIMEOUT)
+        latency = time.perf_counter() - t0
+    except requests.RequestException:
+        M_NET_ERRORS.labels(method).inc()
+        if PACER is not None:
+            PACER.on_error()
+        raise
+    finally:
+        # Attempts sent = failed ones (+1 unless the last one exhausted the retries)
+        release_requests(conn, reserve - min(_RETRY_LOG.failed + 1, reserve))
+    history = _retry_history(resp)
+    M_HTTP_SECONDS.labels(method).observe(latency)
+    M_HTTP_REQUESTS.labels(method, resp.status_code).inc()
+    if history:
+        M_HTTP_RETRIES.labels(method).inc(len(history))
+    if PACER is not None:
+        PACER.record(latency, resp.status_code,
+                     retry_statuses=[h.status for h in history],
+                     retry_after=_retry_after_secs(resp))
+    return resp
+
+def _method_label(params: dict) -> str:
+    """'redtube.Videos.searchVideos' -> 'searchVideos' (metrics label)."""
+    return str(params.get("data", "")).rsplit(".", 1)[-1]
+
+def _parse_json(resp: requests.Response, method: str):
+    with M_PARSE_SECONDS.labels(method).time():
+        return resp.json()
 
 # -----------------------------------------------------------------------------
 # Helpers
@@ -199,17 +440,12 @@ class RateLimitHit(Exception):
 
 def get_categories(session: requests.Session, conn) -> List[str]:
     print("Fetching category list from API...")
-    allowed, sleep_secs = can_consume_requests(conn, n=1)
-    if not allowed:
-        raise RateLimitHit(f"Cap reached. Sleep {sleep_secs}s until reset.")
-
     params = {"data": "redtube.Categories.getCategoriesList", "output": "json"}
-    resp = session.get(API_BASE_URL, params=params, timeout=TIMEOUT)
-    consume_requests(conn, 1)
+    resp = api_get(session, conn, params)
 
     if resp.status_code >= 400:
         raise requests.HTTPError(f"HTTP {resp.status_code}: {resp.text[:200]}")
-    data = resp.json()
+    data = _parse_json(resp, "getCategoriesList")
 
     if isinstance(data, dict) and "code" in data:
         code = data.get("code")
@@ -222,10 +458,6 @@ def get_categories(session: requests.Session, conn) -> List[str]:
     return categories
 
 def fetch_videos_for_category(session: requests.Session, conn, category: str, page: int):
-    allowed, sleep_secs = can_consume_requests(conn, n=1)
-    if not allowed:
-        raise RateLimitHit(f"Cap reached. Sleep {sleep_secs}s until reset.")
-
     params = {
         "data": "redtube.Videos.searchVideos",
         "output": "json",
@@ -239,14 +471,13 @@ def fetch_videos_for_category(session: requests.Session, conn, category: str, pa
         if PERIOD:
             params["period"] = PERIOD
 
-    resp = session.get(API_BASE_URL, params=params, timeout=TIMEOUT)
-    consume_requests(conn, 1)
-
+    # Quota is reserved inside api_get: concurrent workers never overshoot the cap
+    resp = api_get(session, conn, params)
 
     if resp.status_code >= 400:
         raise requests.HTTPError(f"HTTP {resp.status_code}: {resp.text[:200]}")
 
-    data = resp.json()
+    data = _parse_json(resp, "searchVideos")
 
     if isinstance(data, dict) and "code" in data:
         code = data.get("code")
@@ -261,11 +492,41 @@ def fetch_videos_for_category(session: requests.Session, conn, category: str, pa
     if not videos:
         print(f"[info] Empty result set for '{category}' page {page} - likely end of content")
         return [], True
+    M_PAGES.labels(category).inc()
+
+    if ARCHIVE is not None:
+        ARCHIVE.append(category, page, data, ordering=ORDERING, period=PERIOD if ORDERING else None)
+    if str(data.get("count", "")).isdigit():
+        CATEGORY_TOTALS[category] = int(data["count"])
 
     return videos, False
 
+def fetch_video_by_id(session: requests.Session, conn, video_id: int) -> Optional[dict]:
+    """Current video record from getVideoById; None if the API no longer has it (code 2002)."""
+    params = {"data": "redtube.Videos.getVideoById", "output": "json", "video_id": video_id}
+    resp = api_get(session, conn, params)
+    if resp.status_code >= 400:
+        raise requests.HTTPError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+    data = _parse_json(resp, "getVideoById")
+    if isinstance(data, dict) and "code" in data:
+        code = data.get("code")
+        if code == 2002:
+            return None
+        if code == 1005:
+            raise RateLimitHit("API daily limit reached (1005).")
+        raise RuntimeError(f"API error for video {video_id}: {code} {data.get('message', '')}")
+    video = data.get("video") if isinstance(data, dict) else None
+    if not isinstance(video, dict):
+        raise ValueError(f"Malformed getVideoById response for {video_id}")
+    return video
+
+def _error_backoff() -> float:
+    """Seconds to wait after a failed fetch (exponential via the pacer)."""
+    return PACER.error_backoff() if PACER is not None else 60.0
+
 # -----------------------------------------------------------------------------
-# DB Writes (normalized: videos + video_tags + video_categories)
+# DB Writes (normalized: videos + video_tags + video_categories; the legacy
+# per-row path goes through the compatibility views, the bulk path writes ids)
 # -----------------------------------------------------------------------------
 def save_videos_to_db(conn, videos: list, category_ctx: str) -> int:
     if not videos:
@@ -291,24 +552,7 @@ def save_videos_to_db(conn, videos: list, category_ctx: str) -> int:
         is_active = 1
 
         cur.execute(
-            """
-            INSERT INTO videos(
-                video_id, title, url, duration, views, rating, ratings,
-                publish_date, category_source, is_active, retrieved_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(video_id) DO UPDATE SET
-                title=excluded.title,
-                url=excluded.url,
-                duration=COALESCE(excluded.duration, videos.duration),
-                views=COALESCE(excluded.views, videos.views),
-                rating=COALESCE(excluded.rating, videos.rating),
-                ratings=COALESCE(excluded.ratings, videos.ratings),
-                publish_date=COALESCE(excluded.publish_date, videos.publish_date),
-                category_source=excluded.category_source,
-                is_active=excluded.is_active,
-                retrieved_at=excluded.retrieved_at
-            """,
+            UPSERT_VIDEO_SQL,
             (vid, title, url, duration, views, rating, ratings,
              publish_date, category_ctx, is_active, now)
         )
@@ -336,9 +580,160 @@ def save_videos_to_db(conn, videos: list, category_ctx: str) -> int:
             "INSERT OR IGNORE INTO video_categories(video_id, category) VALUES(?, ?)", cats
         )
 
+    refresh_video_docs(conn, [_norm_video_id(vw.get("video", {}).get("video_id")) for vw in videos], now)
     conn.commit()
     return actually_new
 
+# -----------------------------------------------------------------------------
+# Bulk ingest (set-based): one existence probe per batch, one executemany per table
+# -----------------------------------------------------------------------------
+# publish_day / publish_ym are derived from the publish_date parameter (?8) in SQL,
+# so row tuples stay 11 wide and follow publish_date's keep-if-NULL rule
+UPSERT_VIDEO_SQL = f"""
+    INSERT INTO videos(
+        video_id, title, url, duration, views, rating, ratings,
+        publish_date, category_source, is_active, retrieved_at,
+        publish_day, publish_ym
+    )
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11,
+            {publish_day_expr("?8")}, {publish_ym_expr("?8")})
+    ON CONFLICT(video_id) DO UPDATE SET
+        title=excluded.title,
+        url=excluded.url,
+        duration=COALESCE(excluded.duration, videos.duration),
+        views=COALESCE(excluded.views, videos.views),
+        rating=COALESCE(excluded.rating, videos.rating),
+        ratings=COALESCE(excluded.ratings, videos.ratings),
+        publish_date=COALESCE(excluded.publish_date, videos.publish_date),
+        publish_day=CASE WHEN excluded.publish_date IS NULL THEN videos.publish_day ELSE excluded.publish_day END,
+        publish_ym=CASE WHEN excluded.publish_date IS NULL THEN videos.publish_ym ELSE excluded.publish_ym END,
+        category_source=excluded.category_source,
+        is_active=excluded.is_active,
+        retrieved_at=excluded.retrieved_at
+"""
+
+SQLITE_MAX_PARAMS = 900  # stay below SQLITE_MAX_VARIABLE_NUMBER on old builds
+
+def _norm_video_id(vid):
+    """API ids arrive as int or numeric str; match INTEGER PRIMARY KEY storage."""
+    try:
+        return int(vid)
+    except (TypeError, ValueError):
+        return vid
+
+def existing_video_ids(conn, ids: List) -> set:
+    """Subset of `ids` already present in videos (chunked IN probes)."""
+    found = set()
+    ids = list(ids)
+    for i in range(0, len(ids), SQLITE_MAX_PARAMS):
+        chunk = ids[i:i + SQLITE_MAX_PARAMS]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT video_id FROM videos WHERE video_id IN ({marks})", chunk).fetchall()
+        found.update(r[0] for r in rows)
+    return found
+
+def extract_page_rows(videos: list, category_ctx: str, now: str):
+    """
+    Flatten one API page into (video_rows, tag_rows, cat_rows, page_ids) tuples
+    ready for executemany; same field mapping as save_videos_to_db.
+    """
+    video_rows, tag_rows, cat_rows, page_ids = [], [], [], []
+    for vwrap in videos:
+        v = vwrap.get("video", {})
+        vid = _norm_video_id(v.get("video_id"))
+        if vid is None:
+            continue
+        page_ids.append(vid)
+        video_rows.append((
+            vid, v.get("title"), v.get("url"), parse_duration_to_seconds(v.get("duration")),
+            v.get("views"), v.get("rating"), v.get("ratings"),
+            v.get("publish_date") or v.get("publishDate"), category_ctx, 1, now,
+        ))
+        for t in (v.get("tags") or []):
+            tag = t.get("tag_name") or t.get("tag")
+            if tag:
+                tag_rows.append((vid, tag))
+        for c in (v.get("categories") or []):
+            cname = c.get("category") or c.get("category_name")
+            if cname:
+                cat_rows.append((vid, cname))
+        cat_rows.append((vid, category_ctx))
+    return video_rows, tag_rows, cat_rows, page_ids
+
+def save_pages_to_db(conn, pages: List[Tuple[list, str]], commit: bool = True) -> List[int]:
+    """
+    Bulk variant of save_videos_to_db for a batch of pages [(videos, category_ctx), ...].
+    Returns the number of genuinely NEW video_ids per page (a video first seen on
+    an earlier page of the same batch is not new again). With commit=False the
+    caller owns the transaction (e.g. to add the resume pointer to it).
+    """
+    with M_DB_WRITE_SECONDS.time():
+        return _save_pages(conn, pages, commit)
+
+def _save_pages(conn, pages: List[Tuple[list, str]], commit: bool) -> List[int]:
+    now = now_iso()
+    video_rows, tag_rows, cat_rows, per_page_ids = [], [], [], []
+    for videos, category_ctx in pages:
+        v_rows, t_rows, c_rows, ids = extract_page_rows(videos or [], category_ctx, now)
+        video_rows += v_rows
+        tag_rows += t_rows
+        cat_rows += c_rows
+        per_page_ids.append(ids)
+
+    if not video_rows:
+        return [0] * len(pages)
+
+    known = existing_video_ids(conn, {vid for ids in per_page_ids for vid in ids})
+    new_counts = []
+    for ids in per_page_ids:
+        n_new = 0
+        for vid in ids:
+            if vid not in known:
+                known.add(vid)
+                n_new += 1
+        new_counts.append(n_new)
+    for (_, category_ctx), ids, n_new in zip(pages, per_page_ids, new_counts):
+        M_ROWS.labels(category_ctx, "new").inc(n_new)
+        M_ROWS.labels(category_ctx, "updated").inc(len(ids) - n_new)
+
+    cur = conn.cursor()
+    cur.executemany(UPSERT_VIDEO_SQL, video_rows)
+    # Write the integer link tables directly (the text views' triggers cost a lookup per row)
+    if tag_rows:
+        tag_ids = intern_terms(conn, "tags", (t for _, t in tag_rows))
+        cur.executemany("INSERT OR IGNORE INTO video_tag_ids(video_id, tag_id) VALUES(?, ?)",
+                        [(vid, tag_ids[t]) for vid, t in tag_rows])
+    cat_ids = intern_terms(conn, "categories", (c for _, c in cat_rows))
+    cur.executemany("INSERT OR IGNORE INTO video_category_ids(video_id, category_id) VALUES(?, ?)",
+                    [(vid, cat_ids[c]) for vid, c in cat_rows])
+    refresh_video_docs(conn, (vid for ids in per_page_ids for vid in ids), now)
+    if commit:
+        conn.commit()
+    return new_counts
+
+def save_videos_bulk(conn, videos: list, category_ctx: str, commit: bool = True) -> int:
+    """Single-page convenience wrapper around save_pages_to_db."""
+    return save_pages_to_db(conn, [(videos, category_ctx)], commit=commit)[0]
+
+def link_videos_to_category(conn, video_ids: list, category_ctx: str, commit: bool = True) -> None:
+    """
+    Record category membership for already-known videos skipped by --new-only
+    (no row upsert, no tag rewrite: just the video_category_ids link).
+    """
+    if video_ids:
+        cat_id = intern_terms(conn, "categories", [category_ctx])[category_ctx]
+        # EXISTS guard: never trip the FK if the index ran ahead of the videos table
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO video_category_ids(video_id, category_id)
+            SELECT ?, ? WHERE EXISTS (SELECT 1 FROM videos WHERE video_id = ?)
+            """,
+            [(_norm_video_id(vid), cat_id, _norm_video_id(vid)) for vid in video_ids],
+        )
+        M_ROWS.labels(category_ctx, "linked").inc(len(video_ids))
+    if commit:
+        conn.commit()
+
 def ensure_category_status_table(conn) -> None:
     conn.execute("""
         CREATE TABLE IF NOT EXISTS category_status(
@@ -348,9 +743,15 @@ def ensure_category_status_table(conn) -> None:
             last_checked TEXT
         )
     """)
+    # Incremental (newest-first) watermark columns; added in place on older DBs
+    have = {r[1] for r in conn.execute("PRAGMA table_info(category_status)")}
+    for col, decl in (("wm_publish_date", "TEXT"), ("wm_video_id", "INTEGER"), ("last_incremental", "TEXT")):
+        if col not in have:
+            conn.execute(f"ALTER TABLE category_status ADD COLUMN {col} {decl}")
     conn.commit()
 
-def upsert_category_progress(conn, category: str, last_page: int, end_reached: int = 0) -> None:
+def upsert_category_progress(conn, category: str, last_page: int, end_reached: int = 0,
+                             commit: bool = True) -> None:
     now = now_iso()
     conn.execute("""
         INSERT INTO category_status(category, end_reached, last_page, last_checked)
@@ -360,7 +761,8 @@ def upsert_category_progress(conn, category: str, last_page: int, end_reached: i
             last_page=excluded.last_page,
             last_checked=excluded.last_checked
     """, (category, end_reached, last_page, now))
-    conn.commit()
+    if commit:
+        conn.commit()
 
 def get_start_page_for_category(conn, category: str) -> int:
     ensure_category_status_table(conn)
@@ -395,222 +797,932 @@ def get_incomplete_categories(conn, categories: List[str]) -> List[str]:
     return incomplete
 
 # -----------------------------------------------------------------------------
-# Main
+# Incremental mode: newest-first top-up down to a per-category watermark
 # -----------------------------------------------------------------------------
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--category", help="Focus on specific category")
-    parser.add_argument("--reset", action="store_true", help="Reset state and start fresh")
-    parser.add_argument("--reopen", action="store_true", help="Reopen the focused category (end_reached=0,last_page=0)")
-    parser.add_argument("--start-page", type=int, help="Override starting page (e.g., 60)")
-    # keep your existing --ordering/--period adds if you already added them
-    parser.add_argument("--ordering", choices=["newest", "mostviewed", "rating"], help="API ordering for result list")
-    parser.add_argument("--period", choices=["weekly", "monthly", "alltime"], help="API period (valid only when --ordering is used)")
-    parser.add_argument("--new-only", action="store_true",
-                    help="Only persist videos not already in DB (skip updates)")
-    args = parser.parse_args()
+Watermark = Tuple[str, int]  # (publish_date, video_id); compared lexicographically
 
-    print(f"[i] Using DB at: {DB_FILE}")
-    session = make_session()
+def _video_key(v: dict) -> Optional[Watermark]:
+    vid = _norm_video_id(v.get("video_id"))
+    if not isinstance(vid, int):
+        return None
+    return (v.get("publish_date") or v.get("publishDate") or "", vid)
 
-    if args.reset:
-        STATE_FILE.unlink(missing_ok=True)
-        print("[reset] Cleared state file")
+def get_category_watermark(conn, category: str) -> Optional[Watermark]:
+    """Stored watermark, else the newest video already linked to the category."""
+    ensure_category_status_table(conn)
+    row = conn.execute(
+        "SELECT wm_publish_date, wm_video_id FROM category_status WHERE category = ?", (category,)
+    ).fetchone()
+    if row and row["wm_video_id"] is not None:
+        return (row["wm_publish_date"] or "", int(row["wm_video_id"]))
+    row = conn.execute("""
+        SELECT v.publish_date, v.video_id
+        FROM video_categories vc JOIN videos v ON v.video_id = vc.video_id
+        WHERE vc.category = ?
+        ORDER BY v.publish_date DESC, v.video_id DESC
+        LIMIT 1
+    """, (category,)).fetchone()
+    if row is None:
+        return None
+    return (row["publish_date"] or "", int(row["video_id"]))
 
-    # >>> THIS MUST COME BEFORE ANY use of `state` <<<
-    state = load_state()
+def set_category_watermark(conn, category: str, wm: Watermark) -> None:
+    conn.execute("""
+        INSERT INTO category_status(category, end_reached, last_page, last_checked,
+                                    wm_publish_date, wm_video_id, last_incremental)
+        VALUES(?, 0, 0, ?, ?, ?, ?)
+        ON CONFLICT(category) DO UPDATE SET
+            wm_publish_date=excluded.wm_publish_date,
+            wm_video_id=excluded.wm_video_id,
+            last_incremental=excluded.last_incremental
+    """, (category, now_iso(), wm[0], wm[1], now_iso()))
+    conn.commit()
 
-    # >>> PUT THE OVERRIDES *AFTER* load_state AND *BEFORE* the DB context <<<
-    global ORDERING, PERIOD
-    if args.ordering:
-        ORDERING = args.ordering
-    if args.period:
-        PERIOD = args.period
+def incremental_crawl_category(session: requests.Session, conn, cat: str, max_pages: int = 0,
+                               new_only: bool = False, seen: Optional[SeenIndex] = None) -> int:
+    """
+    Fetch `cat` with ordering=newest from page 1 until a page holds nothing newer
+    than the watermark (or the list ends / max_pages is reached), saving every
+    fetched page. The watermark only advances once the pass has reached the old
+    one (or the end of the list), so an interrupted or capped pass leaves no
+    gap: the next run simply starts again from page 1. Returns requests spent
+    (ledger delta, so retries inside api_get count too).
+    """
+    wm = get_category_watermark(conn, cat)
+    newest = wm
+    reached = False
+    page = 1
+    spent = 0
+    print(f"\n--- Incremental: {cat} (watermark: {wm[0] + ' #' + str(wm[1]) if wm else 'none'}) ---")
+    while True:
+        before = LEDGER.used_today if LEDGER is not None else None
+        try:
+            videos, end_of_pages = fetch_videos_for_category(session, conn, cat, page)
+        finally:
+            spent += (LEDGER.used_today - before) if before is not None else 1
+        if end_of_pages:
+            print(f"[inc] '{cat}': end of list at page {page}")
+            reached = True
+            break
+        keys = [k for k in (_video_key(vw.get("video", {})) for vw in videos) if k is not None]
+        fresh = [k for k in keys if wm is None or k > wm]
+
+        to_save, known = videos, []
+        if new_only and seen is not None:
+            to_save = []
+            for vw in videos:
+                vid = vw.get("video", {}).get("video_id")
+                if vid in seen:
+                    known.append(vid)
+                else:
+                    to_save.append(vw)
+        inserted = save_videos_bulk(conn, to_save, cat, commit=False)
+        link_videos_to_category(conn, known, cat, commit=False)
+        conn.commit()
+        if seen is not None:
+            seen.add_many(vw.get("video", {}).get("video_id") for vw in to_save)
+
+        if keys:
+            newest = max(newest, max(keys)) if newest else max(keys)
+        print(f"[inc] '{cat}' p{page}: {len(fresh)}/{len(videos)} newer than watermark, {inserted} NEW rows")
+        if not fresh:
+            reached = True
+            break
+        if max_pages and page >= max_pages:
+            print(f"[inc] '{cat}': stopped at --incremental-max-pages={max_pages}; watermark kept")
+            break
+        page += 1
+
+    if reached and newest is not None:
+        set_category_watermark(conn, cat, newest)
+    return spent
+
+def run_incremental(session: requests.Session, conn, categories: List[str], args,
+                    seen: Optional[SeenIndex] = None) -> Optional[int]:
+    """Top up every category newest-first. Returns cap sleep seconds or None."""
+    total = 0
+    start = LEDGER.used_today if LEDGER is not None else None
+    for i, cat in enumerate(categories, 1):
+        try:
+            total += incremental_crawl_category(session, conn, cat, args.incremental_max_pages,
+                                                new_only=args.new_only, seen=seen)
+        except RateLimitHit as e:
+            print(f"[cap] {e} (incremental pass for '{cat}' restarts from page 1 next run)")
+            return _sleep_secs_until_reset(load_or_init_rate_state(conn))
+        except (requests.RequestException, ValueError) as netex:
+            print(f"[net] Incremental '{cat}' failed: {netex}; watermark unchanged, moving on")
+        except RuntimeError as apiex:
+            # API error code for this category: same as step(), log it and keep going
+            print(f"[error] Incremental '{cat}' failed: {apiex}; watermark unchanged, moving on")
+    if start is not None:
+        total = LEDGER.used_today - start   # also counts requests of categories that failed
+    print(f"[inc] {len(categories)} categories topped up with {total} requests")
+    return None
 
-    with get_conn() as conn:
-        # 1) Categories (resume-friendly)
-        if state.get("categories") is None:
+# -----------------------------------------------------------------------------
+# Refresh mode: re-fetch stale engagement numbers within a share of the budget
+# -----------------------------------------------------------------------------
+def run_refresh(session: requests.Session, conn, args) -> Optional[int]:
+    """
+    Re-fetch the stalest (views-weighted) videos in batches of --refresh-batch,
+    bulk-updating only views/rating/ratings (+ retrieved_at), until today's
+    --refresh-share of the daily limit is spent. Returns cap sleep seconds or None.
+    """
+    planner = RefreshPlanner(conn, QUOTA_KEY)
+    budget = min(_remaining_budget(conn), planner.budget_left(args.refresh_share, API_DAILY_LIMIT))
+    print(f"[refresh] Budget {budget} requests (share {args.refresh_share:.1%} of {API_DAILY_LIMIT}, "
+          f"{planner.used_today()} already used today); min age {args.refresh_min_age_days:g} days")
+    if budget <= 0:
+        print("[refresh] Nothing to do: today's refresh share (or the daily cap) is used up")
+        return None
+    spent = refreshed = gone = 0
+    while spent < budget:
+        ids = planner.select(min(args.refresh_batch, budget - spent), args.refresh_min_age_days)
+        if not ids:
+            print("[refresh] No stale videos left")
+            break
+        updates, missing, batch_spent = [], [], 0
+        cap_hit = False
+        for vid in ids:
+            before = LEDGER.used_today if LEDGER is not None else None
             try:
-                cats = get_categories(session, conn)
-                state["categories"] = cats
-                state["current_category_index"] = 0
-                state["current_category"] = None
-                state["current_page"] = 1
-                save_state(state)
+                v = fetch_video_by_id(session, conn, vid)
             except RateLimitHit as e:
-                rate = load_or_init_rate_state(conn)
-                reset_at = datetime.fromisoformat(rate["reset_at"])
-                now = datetime.now(timezone.utc)
-                sleep_secs = max(1, int((reset_at - now).total_seconds()))
-                print(f"[cap] {e}. Sleeping {sleep_secs}s until {reset_at} (UTC).")
-                time.sleep(sleep_secs)
-                return
-            except Exception as ex:
-                print(f"[error] Cannot fetch categories: {ex}")
-                return
-
-        # 2) Optionally focus on one category
-        cats = state["categories"]
-        if args.category:
-            if args.category in cats:
-                cats = [args.category]
-                print(f"[focus] Targeting only category: {args.category}")
-                # NEW: --reopen resets DB status for the focused category
-                if args.reopen:
-                    conn.execute(
-                        "UPDATE category_status SET end_reached=0, last_page=0 WHERE category = ?",
-                        (args.category,)
-                    )
-                    conn.commit()
-                    # also clear JSON resume pointer so page=1 is respected
-                    STATE_FILE.unlink(missing_ok=True)
-                    print(f"[reopen] Reset status for '{args.category}' (end_reached=0, last_page=0)")
+                print(f"[cap] {e}")
+                cap_hit = True
+                break
+            except (requests.RequestException, ValueError, RuntimeError) as ex:
+                print(f"[refresh] Video {vid} failed: {ex}")
+                if isinstance(ex, requests.RequestException):
+                    time.sleep(_error_backoff())
+                continue
+            finally:
+                batch_spent += (LEDGER.used_today - before) if before is not None else 1
+            if v is None:
+                missing.append(vid)
             else:
-                print(f"[error] Category '{args.category}' not found!")
-                return
+                updates.append((vid, v.get("views"), v.get("rating"), v.get("ratings")))
+        planner.apply(updates, missing, batch_spent)
+        spent += batch_spent
+        refreshed += len(updates)
+        gone += len(missing)
+        print(f"[refresh] Batch: {len(updates)} refreshed, {len(missing)} gone ({spent}/{budget} requests)")
+        if cap_hit:
+            return _sleep_secs_until_reset(load_or_init_rate_state(conn))
+    print(f"[refresh] Done: {refreshed} refreshed, {gone} marked inactive, {spent} requests")
+    return None
 
+# -----------------------------------------------------------------------------
+# Pipeline mode: single writer thread fed by a bounded queue of parsed pages
+# -----------------------------------------------------------------------------
+@dataclass
+class PageItem:
+    """One unit of writer work. videos=None means 'status update only'."""
+    category: str
+    page: int
+    videos: Optional[list]
+    end_reached: int = 0
+    links: Optional[list] = None  # known video_ids: category link only (--new-only)
+    future: Future = field(default_factory=Future)
+
+
+class PageWriter:
+    """
+    Dedicated DB writer. Fetchers `submit()` parsed pages into a bounded queue
+    (blocking when the writer falls behind = backpressure); the writer folds up
+    to `batch_pages` queued items into one transaction that holds both the rows
+    and each category's resume pointer, then resolves every item's future with
+    its count of genuinely new videos.
+    """
 
-        # 3) Filter to incomplete categories only
-        incomplete_cats = get_incomplete_categories(conn, cats)
-        if not incomplete_cats:
-            print("[done] All categories appear complete!")
+    _STOP = object()
+
+    def __init__(self, queue_pages: int = WRITER_QUEUE_PAGES, batch_pages: int = WRITER_BATCH_PAGES,
+                 seen: Optional[SeenIndex] = None):
+        self.q: "queue.Queue" = queue.Queue(maxsize=max(1, queue_pages))
+        self.batch_pages = max(1, batch_pages)
+        self.seen = seen
+        self.pages_written = 0
+        self.transactions = 0
+        self._thread = threading.Thread(target=self._run, name="collector-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, category: str, page: int, videos: Optional[list], end_reached: int = 0,
+               links: Optional[list] = None) -> Future:
+        item = PageItem(category, page, videos, end_reached, links)
+        self.q.put(item)  # blocks while the queue is full
+        return item.future
+
+    def close(self) -> None:
+        """Flush everything still queued, then stop the writer thread."""
+        self.q.put(self._STOP)
+        self._thread.join()
+        print(f"[writer] {self.pages_written} pages in {self.transactions} transactions")
+
+    def _write_batch(self, conn, batch: List[PageItem]) -> None:
+        pages = [it for it in batch if it.videos is not None]
+        try:
+            counts = save_pages_to_db(conn, [(it.videos, it.category) for it in pages], commit=False)
+            for it in batch:
+                if it.links:
+                    link_videos_to_category(conn, it.links, it.category, commit=False)
+                upsert_category_progress(conn, it.category, last_page=it.page,
+                                         end_reached=it.end_reached, commit=False)
+            conn.commit()
+        except Exception as ex:
+            conn.rollback()
+            for it in batch:
+                it.future.set_exception(ex)
             return
+        self.pages_written += len(pages)
+        self.transactions += 1
+        if self.seen is not None:
+            for it in pages:
+                self.seen.add_many(vw.get("video", {}).get("video_id") for vw in it.videos)
+        new_by_item = dict(zip(map(id, pages), counts))
+        for it in batch:
+            it.future.set_result(new_by_item.get(id(it), 0))
+
+    def _run(self) -> None:
+        with get_conn(check_same_thread=False) as conn:
+            stopping = False
+            while not stopping:
+                first = self.q.get()
+                if first is self._STOP:
+                    break
+                batch = [first]
+                while len(batch) < self.batch_pages:
+                    try:
+                        nxt = self.q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(nxt)
+                self._write_batch(conn, batch)
 
-        # 4) Decide starting index based on current_category name (not index)
-        start_idx = 0
-        if state.get("current_category") in incomplete_cats:
-            start_idx = incomplete_cats.index(state["current_category"])
+# -----------------------------------------------------------------------------
+# Per-category crawl (one page per step; shared by sequential + concurrent modes)
+# -----------------------------------------------------------------------------
+class CategoryCrawl:
+    """
+    Resumable crawl of a single category. Each `step()` fetches one page, stores
+    it and advances the category_status resume pointer, so an interrupted run
+    restarts exactly at the next unfetched page of every category.
 
-        for i in range(start_idx, len(incomplete_cats)):
-            cat = incomplete_cats[i]
-            state["current_category"] = cat
-            save_state(state)
+    With a PageWriter, `step()` only fetches + enqueues; write results come back
+    through futures and drive the empty/duplicate streak rules a few pages late.
 
-            # Show how many we already have for this category
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) as cnt FROM video_categories WHERE category = ?", (cat,))
-            existing_count = cur.fetchone()["cnt"]
-            print(f"\n--- Category: {cat} ({i+1}/{len(incomplete_cats)}) - Already have {existing_count} videos ---")
-            
-            # NEW: choose duplicate-page stop threshold per category
-            dup_limit = NEW_CAT_DUP_LIMIT if existing_count < LOW_COUNT_LIMIT else EXISTING_CAT_DUP_LIMIT
-            print(f"[info] Duplicate-page stop limit for '{cat}': {dup_limit} (existing_count={existing_count})")
-            # Pre-load existing IDs for fast "new-only" filtering
-            existing_ids = get_existing_ids_for_category(conn, cat)
+    With a SeenIndex (--new-only), any video already known in *any* category is
+    skipped: only its link to this category is recorded.
 
+    With a resume_state dict (sequential mode), the run-level resume pointer is
+    written in the same transaction as each page and its category_status row.
+    """
 
+    def __init__(self, session: requests.Session, conn, cat: str, page: int,
+                 dup_limit: int, new_only: bool = False, writer: Optional[PageWriter] = None,
+                 seen: Optional[SeenIndex] = None, resume_state: Optional[dict] = None):
+        self.session = session
+        self.conn = conn
+        self.cat = cat
+        self.page = page
+        self.dup_limit = dup_limit
+        self.new_only = new_only
+        self.writer = writer
+        self.inflight: deque = deque()  # (page, n_found, n_saved, future) awaiting the writer
+        self.seen = seen
+        self.videos_this_session = 0
+        self.empty_page_streak = 0
+        self.duplicate_page_streak = 0
+        self.done = False
+        self.on_page = None  # optional callback(cat, page, n_found, inserted), e.g. YieldScheduler
+        self.resume_state = resume_state
+
+        # Ensure status row exists and reflect that we are about to attempt `page`
+        self._commit_progress(last_page=page - 1, end_reached=0)
+
+    def _commit_progress(self, last_page: int, end_reached: int) -> None:
+        """category_status (+ resume_state) update; commits the open page transaction."""
+        if self.resume_state is not None:
+            self.resume_state["current_category"] = None if end_reached else self.cat
+            self.resume_state["current_page"] = 1 if end_reached else last_page + 1
+            save_state(self.conn, self.resume_state, commit=False)
+        upsert_category_progress(self.conn, self.cat, last_page=last_page, end_reached=end_reached)
+
+    def _finish(self, reason: str, last_page: int) -> bool:
+        print(reason)
+        if self.writer is None:
+            self._commit_progress(last_page=last_page, end_reached=1)
+        else:
+            self.inflight.clear()  # later pages are written anyway; the marker lands after them
+            self.writer.submit(self.cat, last_page, None, end_reached=1).result()
+        self.done = True
+        return False
+
+    def checkpoint(self) -> None:
+        """Persist 'next page to fetch' (used on cap hits / shutdown)."""
+        if self.writer is None:
+            self._commit_progress(last_page=self.page - 1, end_reached=0)
+        else:
+            self._drain(block=True)  # each written page already carries its pointer
+
+    def _account(self, page: int, n_found: int, n_saved: int, inserted: int) -> bool:
+        """Apply empty/duplicate stop rules for one written page; False = category finished."""
+        cat = self.cat
+        # Log based on what we actually tried to save
+        print(f"[db] '{cat}' p{page}: found {n_found} videos, attempted to save {n_saved}; "
+              f"{inserted} were NEW, {n_saved-inserted} were updates (skipped when --new-only).")
+        if self.on_page is not None:
+            self.on_page(cat, page, n_found, inserted)
+
+        if n_found == 0:
+            self.empty_page_streak += 1
+            self.duplicate_page_streak = 0
+            print(f"[warn] Page {page} was empty. Empty streak: {self.empty_page_streak}")
+            if self.empty_page_streak >= 3:
+                return self._finish(f"[done] 3 consecutive empty pages for '{cat}' - assuming end",
+                                    last_page=max(page, self.page - 1))
+        else:
+            self.empty_page_streak = 0
+            if inserted == 0:
+                self.duplicate_page_streak += 1
+                print(f"[warn] Page {page} had 0 new videos (all duplicates). Duplicate streak: {self.duplicate_page_streak}")
+                if self.duplicate_page_streak >= self.dup_limit:
+                    return self._finish(
+                        f"[done] {self.duplicate_page_streak} consecutive pages with only duplicates for '{cat}' "
+                        f"(limit={self.dup_limit}) - marking as complete",
+                        last_page=max(page, self.page - 1))
+            else:
+                self.duplicate_page_streak = 0
+                self.videos_this_session += inserted
+        return True
+
+    def _drain(self, block: bool) -> bool:
+        """Consume writer results in page order (all of them if block=True)."""
+        while self.inflight and (block or self.inflight[0][3].done()):
+            page, n_found, n_saved, fut = self.inflight.popleft()
+            if not self._account(page, n_found, n_saved, fut.result()):
+                return False
+        return True
+
+    def step(self) -> bool:
+        """
+        Fetch + persist one page. Returns False once the category is finished.
+        RateLimitHit propagates to the caller (after checkpointing).
+        """
+        cat, page = self.cat, self.page
+        print(f"[req] Fetching page {page} for '{cat}' (session total: {self.videos_this_session})...")
+        try:
+            videos, end_of_pages = fetch_videos_for_category(self.session, self.conn, cat, page)
+        except RateLimitHit:
+            self.checkpoint()
+            raise
+        except (requests.RequestException, ValueError) as netex:
+            backoff = _error_backoff()
+            print(f"[net] Network/parse error on '{cat}' page {page}: {netex}. Retrying in {backoff:.0f}s.")
+            time.sleep(backoff)
+            return True
+        except Exception as ex:
+            print(f"[error] Unexpected error on '{cat}' page {page}: {ex}. Retrying in 60s.")
+            time.sleep(60)
+            return True
+
+        if end_of_pages:
+            if not self._drain(block=True):
+                return False
+            return self._finish(f"[done] No more videos for '{cat}'. Total this session: {self.videos_this_session}",
+                                last_page=page)
+
+        # New-only pre-filter: skip any video already known globally (any category)
+        videos_to_save, known_ids = videos, []
+        if self.new_only and self.seen is not None:
+            videos_to_save = []
+            for vw in videos:
+                vid = vw.get("video", {}).get("video_id")
+                if vid in self.seen:
+                    known_ids.append(vid)
+                else:
+                    videos_to_save.append(vw)
+
+        if self.writer is not None:
+            self.page += 1
+            fut = self.writer.submit(cat, page, videos_to_save, links=known_ids)
+            self.inflight.append((page, len(videos), len(videos_to_save), fut))
+            return self._drain(block=False)
+
+        # Page rows + resume pointers land in one transaction (one commit per page);
+        # advance only once committed, so a checkpoint after a failed write refetches it
+        inserted = save_videos_bulk(self.conn, videos_to_save, cat, commit=False)
+        link_videos_to_category(self.conn, known_ids, cat, commit=False)
+        self._commit_progress(last_page=page, end_reached=0)
+        self.page += 1
+        if self.seen is not None:
+            # Committed: now known to every worker (the index is shared)
+            self.seen.add_many(vw.get("video", {}).get("video_id") for vw in videos_to_save)
+        return self._account(page, len(videos), len(videos_to_save), inserted)
+
+
+def open_category_crawl(session: requests.Session, conn, cat: str, args, resume_page: int = 1,
+                        label: str = "", writer: Optional[PageWriter] = None,
+                        seen: Optional[SeenIndex] = None, resume_state: Optional[dict] = None) -> CategoryCrawl:
+    """Decide dup-limit + starting page for `cat` and build its CategoryCrawl."""
+    # Show how many we already have for this category
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) as cnt FROM video_categories WHERE category = ?", (cat,))
+    existing_count = cur.fetchone()["cnt"]
+    print(f"\n--- Category: {cat}{label} - Already have {existing_count} videos ---")
 
+    # NEW: choose duplicate-page stop threshold per category
+    dup_limit = NEW_CAT_DUP_LIMIT if existing_count < LOW_COUNT_LIMIT else EXISTING_CAT_DUP_LIMIT
+    print(f"[info] Duplicate-page stop limit for '{cat}': {dup_limit} (existing_count={existing_count})")
 
-            # Decide starting page
-            page = max(
-                get_start_page_for_category(conn, cat),
-                state.get("current_page", 1) if state.get("current_category") == cat else 1
-            )
-            # NEW: explicit override from CLI (keeps everything else intact)
-            if args.start_page and args.start_page > 0:
-                page = args.start_page
+    # Decide starting page
+    page = max(get_start_page_for_category(conn, cat), resume_page)
+    # NEW: explicit override from CLI (keeps everything else intact)
+    if args.start_page and args.start_page > 0:
+        page = args.start_page
+
+    return CategoryCrawl(session, conn, cat, page, dup_limit, new_only=args.new_only,
+                         writer=writer, seen=seen, resume_state=resume_state)
+
+# -----------------------------------------------------------------------------
+# Yield-scheduled mode: every request goes to the best expected category
+# -----------------------------------------------------------------------------
+def _remaining_budget(conn) -> int:
+    if LEDGER is not None:
+        return LEDGER.remaining()
+    return max(0, API_DAILY_LIMIT - int(load_or_init_rate_state(conn)["requests_used"]))
+
+def run_scheduled(session: requests.Session, conn, categories: List[str], args,
+                  writer: Optional[PageWriter] = None, seen: Optional[SeenIndex] = None) -> Optional[int]:
+    """
+    Interleave pages across `categories`, always stepping the category with the
+    highest expected new rows per request (YieldScheduler). Each category keeps
+    its own category_status resume pointer, exactly as in concurrent mode.
+    Stops when no category is expected to yield --min-yield new rows/request.
+
+    Returns seconds to sleep until reset if the cap was hit, else None.
+    """
+    sched = YieldScheduler(conn, categories, window=args.yield_window)
+    sched.print_plan(_remaining_budget(conn))
+    crawls = {}
+
+    def _on_page(cat: str, page: int, n_found: int, inserted: int) -> None:
+        sched.record(cat, page, inserted, total_count=CATEGORY_TOTALS.get(cat))
+
+    try:
+        while True:
+            cat = sched.choose()
+            if cat is None:
+                print("[sched] All scheduled categories finished or out of pages")
+                return None
+            if sched.expected_yield(cat) < args.min_yield:
+                print(f"[sched] Best expected yield {sched.expected_yield(cat):.2f} new/request "
+                      f"('{cat}') < --min-yield {args.min_yield}; stopping")
+                return None
+            crawl = crawls.get(cat)
+            if crawl is None:
+                crawl = open_category_crawl(session, conn, cat, args, label=" [yield]", writer=writer, seen=seen)
+                crawl.on_page = _on_page
+                crawls[cat] = crawl
+            if not crawl.step() or crawl.done:
+                sched.finish(cat)
+    except RateLimitHit as e:
+        print(f"[cap] {e}")
+        return _sleep_secs_until_reset(load_or_init_rate_state(conn))
+    finally:
+        for crawl in crawls.values():
+            if not crawl.done:
+                crawl.checkpoint()  # drains writer results into the stats, persists resume points
+        sched.print_plan(_remaining_budget(conn))
+
+# -----------------------------------------------------------------------------
+# Replay mode: rebuild from the raw archive (no API calls, no quota)
+# -----------------------------------------------------------------------------
+def replay_archive(conn, root: Path, batch_pages: int = WRITER_BATCH_PAGES,
+                   only_category: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Re-ingest archived searchVideos pages through the bulk write path, in fetch
+    order, `batch_pages` pages per transaction. Returns (pages, new_videos).
+    """
+    segments = list_segments(root)
+    if not segments:
+        print(f"[replay] No archive segments under {root}")
+        return 0, 0
+    print(f"[replay] {len(segments)} segments from {root}")
+    t0 = time.perf_counter()
+    n_pages = n_rows = n_new = 0
+    batch: List[Tuple[list, str]] = []
+    for rec in iter_records(root):
+        cat = rec.get("category")
+        if only_category and cat != only_category:
+            continue
+        videos = record_videos(rec)
+        if not videos:
+            continue
+        batch.append((videos, cat))
+        n_pages += 1
+        n_rows += len(videos)
+        if len(batch) >= batch_pages:
+            n_new += sum(save_pages_to_db(conn, batch))
+            batch = []
+            if n_pages % (batch_pages * 40) == 0:
+                rate = n_rows / max(1e-9, time.perf_counter() - t0)
+                print(f"[replay] {n_pages:,} pages, {n_rows:,} rows ({rate:,.0f} rows/s)")
+    if batch:
+        n_new += sum(save_pages_to_db(conn, batch))
+    secs = time.perf_counter() - t0
+    print(f"[replay] Done: {n_pages:,} pages, {n_rows:,} rows, {n_new:,} new videos in {secs:.1f}s")
+    return n_pages, n_new
 
-            # Ensure status row exists and reflect that we are about to attempt `page`
-            upsert_category_progress(conn, cat, last_page=page-1, end_reached=0)
 
+# -----------------------------------------------------------------------------
+# Concurrent mode: N workers, one category each, one shared DB-backed quota
+# -----------------------------------------------------------------------------
+def _category_finished(conn, cat: str) -> bool:
+    row = conn.execute("SELECT end_reached FROM category_status WHERE category = ?", (cat,)).fetchone()
+    return bool(row and row["end_reached"])
+
+def run_concurrent(categories: List[str], args, workers: int,
+                   writer: Optional[PageWriter] = None, seen: Optional[SeenIndex] = None,
+                   leases: Optional[LeaseManager] = None) -> Optional[int]:
+    """
+    Crawl several categories at once. Every worker owns a session + DB
+    connection and pulls the next category from a shared list; the daily budget
+    is drawn through acquire_request (QuotaLedger blocks or a direct atomic
+    UPDATE on collection_state), and each
+    category keeps its own category_status resume pointer. With a PageWriter,
+    workers only fetch and all data/pointer writes go through its queue.
+
+    With a LeaseManager, a category is only crawled while this process holds
+    its lease, so several collector processes can share the category list.
 
-            videos_this_session = 0
-            empty_page_streak = 0
-            duplicate_page_streak = 0
+    Returns seconds to sleep until reset if the cap was hit, else None.
+    """
+    lock = threading.Lock()
+    pending = list(categories)
+    total = len(categories)
+    stop = threading.Event()
+    cap_sleep: List[int] = []
+
+    def _next_category(conn) -> Optional[Tuple[int, str]]:
+        with lock:
+            while not stop.is_set() and pending:
+                if leases is None:
+                    return total - len(pending) + 1, pending.pop(0)
+                cat = leases.claim(pending)
+                if cat is None:
+                    return None  # everything left is leased by other collectors
+                pending.remove(cat)
+                if _category_finished(conn, cat):
+                    leases.release(cat)  # finished by another collector meanwhile
+                    continue
+                return total - len(pending), cat
+            return None
 
+    def _worker(wid: int) -> None:
+        session = make_session()
+        with get_conn(check_same_thread=False) as conn:
             while True:
-                print(f"[req] Fetching page {page} for '{cat}' (session total: {videos_this_session})...")
+                item = _next_category(conn)
+                if item is None:
+                    return
+                n, cat = item
+                crawl = open_category_crawl(session, conn, cat, args,
+                                            label=f" ({n}/{total}) [worker {wid}]", writer=writer, seen=seen)
                 try:
-                    videos, end_of_pages = fetch_videos_for_category(session, conn, cat, page)
+                    while not stop.is_set() and crawl.step():
+                        if leases is not None and not leases.holds(cat):
+                            break  # lease expired and was taken over: stop after this page
+                    if not crawl.done:
+                        crawl.checkpoint()  # cap hit elsewhere / lease lost: persist resume point
                 except RateLimitHit as e:
-                    # Persist exact resume point and exit cleanly
-                    rate = load_or_init_rate_state(conn)
-                    reset_at = datetime.fromisoformat(rate["reset_at"])
-                    now = datetime.now(timezone.utc)
-                    sleep_secs = max(1, int((reset_at - now).total_seconds()))
-                    upsert_category_progress(conn, cat, last_page=page-1, end_reached=0)
-                    state["current_page"] = page
-                    state["current_category"] = cat
-                    save_state(state)
-                    print(f"[cap] {e}. Sleeping {sleep_secs}s until {reset_at} (UTC).")
-                    time.sleep(sleep_secs)
+                    print(f"[cap] worker {wid}: {e}")
+                    with lock:
+                        cap_sleep.append(_sleep_secs_until_reset(load_or_init_rate_state(conn)))
+                    stop.set()
                     return
-                except (requests.RequestException, ValueError) as netex:
-                    print(f"[net] Network/parse error on '{cat}' page {page}: {netex}. Retrying in 60s.")
-                    time.sleep(60)
-                    continue
-                except Exception as ex:
-                    print(f"[error] Unexpected error: {ex}. Retrying in 60s.")
-                    time.sleep(60)
-                    continue
+                except Exception as e:
+                    # DB error / failed writer future: stop the whole pool now, not after every category
+                    print(f"[error] worker {wid}: '{cat}' failed: {e!r}; stopping all workers")
+                    stop.set()
+                    try:
+                        conn.rollback()       # drop the half-written page
+                        crawl.checkpoint()
+                    except Exception as cex:
+                        print(f"[warn] worker {wid}: could not checkpoint '{cat}': {cex!r}")
+                    raise
+                finally:
+                    if leases is not None:
+                        leases.release(cat)  # checkpointed: another collector may continue it
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collector") as pool:
+        futures = [pool.submit(_worker, w + 1) for w in range(workers)]
+        for f in futures:
+            f.result()
+    return max(cap_sleep) if cap_sleep else None
 
-                if end_of_pages:
-                    print(f"[done] No more videos for '{cat}'. Total this session: {videos_this_session}")
-                    upsert_category_progress(conn, cat, last_page=page, end_reached=1)
-                    # prepare for next category
-                    state["current_page"] = 1
-                    state["current_category"] = None
-                    save_state(state)
-                    break
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--category", help="Focus on specific category")
+    parser.add_argument("--reset", action="store_true", help="Reset state and start fresh")
+    parser.add_argument("--reopen", action="store_true", help="Reopen the focused category (end_reached=0,last_page=0)")
+    parser.add_argument("--start-page", type=int, help="Override starting page (e.g., 60)")
+    # keep your existing --ordering/--period adds if you already added them
+    parser.add_argument("--ordering", choices=["newest", "mostviewed", "rating"], help="API ordering for result list")
+    parser.add_argument("--period", choices=["weekly", "monthly", "alltime"], help="API period (valid only when --ordering is used)")
+    parser.add_argument("--new-only", action="store_true",
+                    help="Only persist videos not already in DB, in any category (skip updates)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Crawl this many categories concurrently (shared daily quota; 1 = sequential)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Decouple fetching from DB writes: fetchers feed one batching writer thread")
+    parser.add_argument("--writer-queue", type=int, default=WRITER_QUEUE_PAGES,
+                        help="Max pages waiting for the writer before fetchers block (pipeline mode)")
+    parser.add_argument("--writer-batch", type=int, default=WRITER_BATCH_PAGES,
+                        help="Max pages per writer transaction (pipeline mode)")
+    parser.add_argument("--quota-block", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="Requests reserved from collection_state per DB round-trip (1 = per-request accounting)")
+    parser.add_argument("--quota-flush-secs", type=float, default=DEFAULT_FLUSH_SECS,
+                        help="Hand unused quota reservations back to the DB at least this often")
+    parser.add_argument("--archive", action="store_true",
+                        help="Archive every raw searchVideos page (gzip NDJSON) for later --replay")
+    parser.add_argument("--archive-dir", type=str, default=str(RAW_ARCHIVE_DIR),
+                        help="Directory for raw archive segments")
+    parser.add_argument("--schedule", choices=["order", "yield"], default="order",
+                        help="Category order: API list order, or always the best expected new-rows/request")
+    parser.add_argument("--yield-window", type=int, default=DEFAULT_WINDOW,
+                        help="Pages per category in the moving yield window (--schedule yield)")
+    parser.add_argument("--min-yield", type=float, default=0.5,
+                        help="Stop when no category is expected to give this many new rows/request (--schedule yield)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Newest-first top-up of every category down to its stored watermark")
+    parser.add_argument("--incremental-max-pages", type=int, default=0,
+                        help="Safety cap on pages per category in --incremental mode (0 = no cap)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-fetch stale views/rating/ratings via getVideoById instead of crawling")
+    parser.add_argument("--refresh-share", type=float, default=DEFAULT_SHARE,
+                        help="Share of the daily limit --refresh may spend per day (all runs together)")
+    parser.add_argument("--refresh-batch", type=int, default=DEFAULT_BATCH,
+                        help="Videos per refresh batch (one bulk UPDATE transaction each)")
+    parser.add_argument("--refresh-min-age-days", type=float, default=DEFAULT_MIN_AGE_DAYS,
+                        help="Only refresh rows whose retrieved_at is at least this old")
+    parser.add_argument("--min-delay", type=float, default=0.1,
+                        help="Adaptive pacing: never send faster than one request per this many seconds")
+    parser.add_argument("--max-delay", type=float, default=10.0,
+                        help="Adaptive pacing: never back off slower than one request per this many seconds")
+    parser.add_argument("--replay", action="store_true",
+                        help="Rebuild the DB from --archive-dir at disk speed (no API calls) and exit")
+    parser.add_argument("--lease", action="store_true",
+                        help="Share categories with other collector processes via category_leases")
+    parser.add_argument("--owner", default=None,
+                        help="Lease owner id (default: host:pid)")
+    parser.add_argument("--lease-ttl", type=int, default=DEFAULT_TTL_SECS,
+                        help="Seconds before an un-renewed lease (crashed collector) can be reclaimed")
+    parser.add_argument("--quota-key", default="default",
+                        help="collection_state budget row for this process (one per API key / egress IP)")
+    parser.add_argument("--metrics-dir", type=str, default=None,
+                        help=f"Export metrics here as collector.prom + collector.jsonl (e.g. {METRICS_DIR})")
+    parser.add_argument("--metrics-interval", type=float, default=15.0,
+                        help="Seconds between metrics exports (--metrics-dir)")
+    parser.add_argument("--exit-on-cap", action="store_true",
+                        help="Exit when the daily cap is hit instead of sleeping until the reset (cron/benchmarks)")
+    parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_INTERVAL_SECS,
+                        help="Seconds between PASSIVE WAL checkpoints (0 = leave checkpointing to SQLite)")
+    parser.add_argument("--checkpoint-idle", type=float, default=DEFAULT_IDLE_SECS,
+                        help="Seconds without commits before a TRUNCATE checkpoint resets the -wal file")
+    parser.add_argument("--checkpoint-busy-ms", type=int, default=DEFAULT_BUSY_MS,
+                        help="How long a TRUNCATE checkpoint may wait for readers")
+    parser.add_argument("--journal-size-limit", type=int, default=JOURNAL_SIZE_LIMIT,
+                        help="Bytes the -wal file is cut back to after a checkpoint (-1 = no limit)")
+    args = parser.parse_args(argv)
+    set_journal_size_limit(args.journal_size_limit)
 
-                # New-only pre-filter (skip already-known IDs if the flag is on)
-                videos_to_save = videos
-                if args.new_only:
-                    videos_to_save = [
-                        vw for vw in videos
-                        if vw.get("video", {}).get("video_id") not in existing_ids
-                    ]
-
-                inserted = save_videos_to_db(conn, videos_to_save, cat)
-                upsert_category_progress(conn, cat, last_page=page, end_reached=0)
-
-                # Keep the in-memory set fresh to avoid re-inserting within this run
-                if videos_to_save:
-                    for vw in videos_to_save:
-                        vid = vw.get("video", {}).get("video_id")
-                        if vid:
-                            existing_ids.add(vid)
-
-                # Log based on what we actually tried to save
-                print(f"[db] Found {len(videos)} videos, attempted to save {len(videos_to_save)}; "
-                      f"{inserted} were NEW, {len(videos_to_save)-inserted} were updates (skipped when --new-only).")
-
-                if len(videos) == 0:
-                    empty_page_streak += 1
-                    duplicate_page_streak = 0
-                    print(f"[warn] Page {page} was empty. Empty streak: {empty_page_streak}")
-                    if empty_page_streak >= 3:
-                        print(f"[done] 3 consecutive empty pages for '{cat}' - assuming end")
-                        upsert_category_progress(conn, cat, last_page=page, end_reached=1)
-                        state["current_page"] = 1
-                        state["current_category"] = None
-                        save_state(state)
-                        break
-                else:
-                    empty_page_streak = 0
-                    if inserted == 0:
-                        duplicate_page_streak += 1
-                        print(f"[warn] Page {page} had 0 new videos (all duplicates). Duplicate streak: {duplicate_page_streak}")
-                        if duplicate_page_streak >= dup_limit:
-                            print(f"[done] {duplicate_page_streak} consecutive pages with only duplicates for '{cat}' (limit={dup_limit}) - marking as complete")
-                            upsert_category_progress(conn, cat, last_page=page, end_reached=1)
-                            state["current_page"] = 1
-                            state["current_category"] = None
-                            save_state(state)
-                            break
-                    else:
-                        duplicate_page_streak = 0
-                        videos_this_session += inserted
-
-
-                # advance: persist next page in JSON
-                page += 1
-                state["current_page"] = page
-                state["current_category"] = cat
-                save_state(state)
-                time.sleep(REQUEST_DELAY)
+    print(f"[i] Using DB at: {DB_FILE}")
+    global QUOTA_KEY
+    QUOTA_KEY = args.quota_key
+    if args.lease and not args.owner:
+        args.owner = default_owner()
+    with get_conn() as conn:
+        migrate_collection_state(conn)
+        migrate_dictionary_encoding(conn)
+        ensure_video_docs_table(conn)
+        migrate_publish_columns(conn)
+        ensure_eda_aggregates(conn)
+
+    if args.replay:
+        with get_conn() as conn:
+            replay_archive(conn, Path(args.archive_dir), max(1, args.writer_batch), args.category)
+        return
+    session = make_session()
+
+    if args.reset:
+        with get_conn() as conn:
+            clear_state(conn)
+        print("[reset] Cleared resume state")
+
+    # >>> PUT THE OVERRIDES *BEFORE* the DB context <<<
+    global ORDERING, PERIOD
+    if args.ordering:
+        ORDERING = args.ordering
+    if args.period:
+        PERIOD = args.period
+    if args.incremental:
+        # Watermarks only make sense on the newest-first listing
+        if ORDERING not in (None, "newest"):
+            print(f"[inc] Ignoring --ordering {ORDERING}: incremental mode uses ordering=newest")
+        ORDERING, PERIOD = "newest", None
+
+    # Quota ledger on its own connection (it commits independently of page writes)
+    global LEDGER, ARCHIVE, PACER, CHECKPOINTER
+    PACER = AdaptivePacer(initial_delay=REQUEST_DELAY, min_delay=args.min_delay, max_delay=args.max_delay)
+    if args.archive:
+        ARCHIVE = RawArchive(Path(args.archive_dir))
+    if args.checkpoint_interval > 0:
+        CHECKPOINTER = WalCheckpointer(DB_FILE, interval=args.checkpoint_interval, idle_secs=args.checkpoint_idle,
+                                       busy_ms=args.checkpoint_busy_ms, journal_size_limit=args.journal_size_limit,
+                                       on_checkpoint=_on_checkpoint).start()
+    exporter = MetricsExporter(METRICS, Path(args.metrics_dir), interval=args.metrics_interval).start() \
+        if args.metrics_dir else None
+    sleep_secs = None
+    with get_conn(check_same_thread=False) as ledger_conn:
+        LEDGER = QuotaLedger(ledger_conn, API_DAILY_LIMIT, args.quota_block, args.quota_flush_secs,
+                             quota_key=QUOTA_KEY)
+        try:
+            with get_conn() as conn:
+                sleep_secs = run_collection(session, conn, args)
+        finally:
+            if CHECKPOINTER is not None:
+                CHECKPOINTER.close()  # final TRUNCATE before the last metrics export
+                print(f"[wal] {CHECKPOINTER.describe()}")
+            if exporter is not None:
+                exporter.close()  # final export while the ledger is still readable
+                print(f"[metrics] {exporter.prom_path} / {exporter.jsonl_path}")
+            CHECKPOINTER = None
+            LEDGER.close()
+            print(f"[quota] {LEDGER.used_today} requests used this run "
+                  f"({LEDGER.db_round_trips} ledger round-trips)")
+            LEDGER = None
+            print(f"[pace] {PACER.describe()}")
+            if ARCHIVE is not None:
+                ARCHIVE.close()
+                print(f"[archive] {ARCHIVE.records} raw pages -> {ARCHIVE.root}")
+                ARCHIVE = None
+
+    if sleep_secs is not None:
+        reset_at = datetime.now(timezone.utc) + timedelta(seconds=sleep_secs)
+        if args.exit_on_cap:
+            print(f"[cap] Daily cap reached; quota resets {reset_at:%Y-%m-%d %H:%M} (UTC). Exiting (--exit-on-cap).")
+            return
+        print(f"[cap] Daily cap reached. Sleeping {sleep_secs}s until {reset_at:%Y-%m-%d %H:%M} (UTC).")
+        time.sleep(sleep_secs)
+        return
 
     print("\n--- Collection complete for available categories/pages at this run. ---")
 
+
+def run_collection(session: requests.Session, conn, args) -> Optional[int]:
+    """
+    Categories -> focus/reopen -> incomplete filter -> crawl (or the --refresh sweep).
+    Returns seconds to sleep until the quota resets if the cap was hit, else None.
+    """
+    if args.refresh:
+        return run_refresh(session, conn, args)
+
+    state = load_state(conn)
+
+    # 1) Categories (resume-friendly)
+    if state.get("categories") is None:
+        try:
+            cats = get_categories(session, conn)
+            state["categories"] = cats
+            state["current_category_index"] = 0
+            state["current_category"] = None
+            state["current_page"] = 1
+            save_state(conn, state)
+        except RateLimitHit as e:
+            print(f"[cap] {e}")
+            return _sleep_secs_until_reset(load_or_init_rate_state(conn))
+        except Exception as ex:
+            print(f"[error] Cannot fetch categories: {ex}")
+            return None
+
+    # 2) Optionally focus on one category
+    cats = state["categories"]
+    if args.category:
+        if args.category in cats:
+            cats = [args.category]
+            print(f"[focus] Targeting only category: {args.category}")
+            # NEW: --reopen resets DB status for the focused category
+            if args.reopen:
+                conn.execute(
+                    "UPDATE category_status SET end_reached=0, last_page=0 WHERE category = ?",
+                    (args.category,)
+                )
+                # also clear the run-level resume pointer so page=1 is respected
+                state["current_category"] = None
+                state["current_page"] = 1
+                save_state(conn, state)
+                print(f"[reopen] Reset status for '{args.category}' (end_reached=0, last_page=0)")
+        else:
+            print(f"[error] Category '{args.category}' not found!")
+            return None
+
+    # 2b) Incremental top-up covers finished categories too
+    if args.incremental:
+        seen = SeenIndex.load(conn, SEEN_INDEX_FILE) if args.new_only else None
+        try:
+            return run_incremental(session, conn, cats, args, seen)
+        finally:
+            if seen is not None:
+                seen.save(conn=conn)
+
+    # 3) Filter to incomplete categories only
+    incomplete_cats = get_incomplete_categories(conn, cats)
+    if not incomplete_cats:
+        print("[done] All categories appear complete!")
+        return None
+
+    # Global seen-video index (one for all categories/workers); persisted on exit
+    seen = SeenIndex.load(conn, SEEN_INDEX_FILE) if args.new_only else None
+    try:
+        sleep_secs = _crawl_incomplete(session, conn, state, incomplete_cats, args, seen)
+    finally:
+        if seen is not None:
+            seen.save(conn=conn)
+            print(f"[seen] Saved {seen.size():,} ids -> {SEEN_INDEX_FILE}")
+    return sleep_secs
+
+
+def _crawl_incomplete(session: requests.Session, conn, state: dict, incomplete_cats: List[str],
+                      args, seen: Optional[SeenIndex]) -> Optional[int]:
+    """
+    Crawl all incomplete categories (concurrent/pipeline or classic sequential).
+    Returns seconds to sleep until the quota resets if the cap was hit, else None.
+    """
+    # 4a) Yield-scheduled mode (single fetcher, optional pipelined writer)
+    if args.schedule == "yield":
+        if args.workers > 1:
+            print("[sched] --schedule yield uses one fetcher; ignoring --workers")
+        state["current_category"] = None
+        state["current_page"] = 1
+        save_state(conn, state)
+        writer = PageWriter(args.writer_queue, args.writer_batch, seen=seen) if args.pipeline else None
+        try:
+            return run_scheduled(session, conn, incomplete_cats, args, writer=writer, seen=seen)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    # 4b) Concurrent / pipeline / leased mode: resume pointers live in category_status only
+    if args.workers > 1 or args.pipeline or args.lease:
+        print(f"[concurrent] Crawling {len(incomplete_cats)} categories with {args.workers} workers"
+              + (" (pipelined writer)" if args.pipeline else "")
+              + (f" (leases as '{args.owner}', quota '{QUOTA_KEY}')" if args.lease else ""))
+        state["current_category"] = None
+        state["current_page"] = 1
+        save_state(conn, state)
+        writer = PageWriter(args.writer_queue, args.writer_batch, seen=seen) if args.pipeline else None
+        leases = None
+        if args.lease:
+            lease_conn = create_connection(check_same_thread=False)
+            leases = LeaseManager(lease_conn, lambda: create_connection(check_same_thread=False),
+                                  owner=args.owner, ttl_secs=args.lease_ttl,
+                                  heartbeat_secs=max(1, args.lease_ttl // 5)).start()
+        try:
+            return run_concurrent(incomplete_cats, args, args.workers, writer=writer, seen=seen, leases=leases)
+        finally:
+            if writer is not None:
+                writer.close()
+            if leases is not None:
+                leases.close()
+                leases.conn.close()
+
+    # 4c) Sequential mode: decide starting index based on current_category name (not index)
+    start_idx = 0
+    if state.get("current_category") in incomplete_cats:
+        start_idx = incomplete_cats.index(state["current_category"])
+
+    for i in range(start_idx, len(incomplete_cats)):
+        cat = incomplete_cats[i]
+        resume_page = state.get("current_page", 1) if state.get("current_category") == cat else 1
+
+        # The crawl keeps `state` in step with every page commit (resume_state table)
+        crawl = open_category_crawl(session, conn, cat, args, resume_page=resume_page,
+                                    label=f" ({i+1}/{len(incomplete_cats)})", seen=seen, resume_state=state)
+        try:
+            while crawl.step():
+                pass
+        except RateLimitHit as e:
+            # step() already checkpointed the exact resume point
+            print(f"[cap] {e}")
+            return _sleep_secs_until_reset(load_or_init_rate_state(conn))
+    return None
+
 if __name__ == "__main__":
     main()
@@ -1,12 +1,17 @@
-# msc_fairness_project/src/utils/database.py
+# msc_fairness_project/src/collect/database.py
 
 import pandas as pd
 import os
+import queue
 import sqlite3
+import threading
 from sqlite3 import Error
 from pathlib import Path
-from contextlib import contextmanager
-from typing import Iterator, Optional
+from contextlib import closing, contextmanager
+from typing import Iterator, Optional, Tuple
+
+from src.utils.video_docs import VIDEO_DOCS_SQL
+from src.utils.eda_aggregates import ensure_eda_aggregates
 
 # --- Didactic Explanation ---
 # This script is our single source of truth for the database.
@@ -28,11 +33,15 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 DB_FILE = Path(os.environ.get("MSC_DB_FILE", str(DATA_DIR / "redtube_videos.db"))).resolve()
 
+# Bytes the -wal file is cut back to whenever a checkpoint resets it (-1 = never truncate)
+JOURNAL_SIZE_LIMIT = int(os.environ.get("MSC_JOURNAL_SIZE_LIMIT", str(64 * 1024 * 1024)))
+
 # -----------------------------------------------------------------------------
 # 2) Connection helper with safe defaults (WAL, timeouts, foreign keys, row factory)
 # -----------------------------------------------------------------------------
 
-def _apply_pragmas(conn: sqlite3.Connection) -> None:
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    """The project's connection pragmas (WAL, timeouts, FKs, WAL size bound); benchmarks reuse them."""
     cur = conn.cursor()
     # Better concurrency + durability trade-off
     cur.execute("PRAGMA journal_mode=WAL;")
@@ -41,9 +50,17 @@ def _apply_pragmas(conn: sqlite3.Connection) -> None:
     cur.execute("PRAGMA busy_timeout=5000;")  # ms
     # Keep relational integrity if you use FKs (tags/categories tables)
     cur.execute("PRAGMA foreign_keys=ON;")
+    # Bound the -wal file left on disk after checkpoints (see src/collect/checkpointer.py)
+    cur.execute(f"PRAGMA journal_size_limit={int(JOURNAL_SIZE_LIMIT)};")
     cur.close()
 
 
+def set_journal_size_limit(limit: int) -> None:
+    """Override JOURNAL_SIZE_LIMIT for connections opened from now on (collector --journal-size-limit)."""
+    global JOURNAL_SIZE_LIMIT
+    JOURNAL_SIZE_LIMIT = int(limit)
+
+
 def create_connection(check_same_thread: bool = True) -> Optional[sqlite3.Connection]:
     """
     Create a database connection to the SQLite database.
@@ -57,7 +74,7 @@ def create_connection(check_same_thread: bool = True) -> Optional[sqlite3.Connec
         )
         # dict-like row access: row["title"]
         conn.row_factory = sqlite3.Row
-        _apply_pragmas(conn)
+        apply_pragmas(conn)
         print(f"Successfully connected to SQLite database at {DB_FILE}")
         return conn
     except Error as e:
@@ -87,11 +104,78 @@ def get_conn(check_same_thread: bool = True) -> Iterator[sqlite3.Connection]:
 # -----------------------------------------------------------------------------
 # 3) Schema (normalized for fairness slicing + resumable collection)
 #    - videos: main facts
-#    - video_tags: 1:N tags (enables clean group/audit slices)
-#    - video_categories: 1:N categories
+#    - tags / categories: dictionaries (each distinct string stored once)
+#    - video_tag_ids / video_category_ids: integer-keyed WITHOUT ROWID links
+#    - video_tags / video_categories: compatibility views exposing the text
+#      columns (INSTEAD OF triggers keep INSERT/DELETE on them working)
+#    - video_docs: per-video title + tags text for the analysis scripts
+#      (maintained by the collector, see src/utils/video_docs.py)
 #    - audit_terms: curated identity terms (race/gender/orientation)
 #    - collection_state: track API daily cap + resume pointers
 # -----------------------------------------------------------------------------
+DICTIONARY_SQL = """
+CREATE TABLE IF NOT EXISTS tags (
+    tag_id      INTEGER PRIMARY KEY,
+    tag         TEXT    NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    category_id INTEGER PRIMARY KEY,
+    category    TEXT    NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS video_tag_ids (
+    video_id    INTEGER NOT NULL REFERENCES videos(video_id) ON DELETE CASCADE,
+    tag_id      INTEGER NOT NULL REFERENCES tags(tag_id),
+    PRIMARY KEY(video_id, tag_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_video_tag_ids_tag ON video_tag_ids(tag_id);
+
+CREATE TABLE IF NOT EXISTS video_category_ids (
+    video_id    INTEGER NOT NULL REFERENCES videos(video_id) ON DELETE CASCADE,
+    category_id INTEGER NOT NULL REFERENCES categories(category_id),
+    PRIMARY KEY(video_id, category_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_video_category_ids_category ON video_category_ids(category_id);
+"""
+
+COMPAT_VIEWS_SQL = """
+CREATE VIEW IF NOT EXISTS video_tags(video_id, tag) AS
+    SELECT vt.video_id, t.tag FROM video_tag_ids vt JOIN tags t ON t.tag_id = vt.tag_id;
+
+CREATE TRIGGER IF NOT EXISTS video_tags_insert INSTEAD OF INSERT ON video_tags
+BEGIN
+    INSERT OR IGNORE INTO tags(tag) VALUES (NEW.tag);
+    INSERT OR IGNORE INTO video_tag_ids(video_id, tag_id)
+        SELECT NEW.video_id, tag_id FROM tags WHERE tag = NEW.tag;
+END;
+
+CREATE TRIGGER IF NOT EXISTS video_tags_delete INSTEAD OF DELETE ON video_tags
+BEGIN
+    DELETE FROM video_tag_ids
+    WHERE video_id = OLD.video_id AND tag_id = (SELECT tag_id FROM tags WHERE tag = OLD.tag);
+END;
+
+CREATE VIEW IF NOT EXISTS video_categories(video_id, category) AS
+    SELECT vc.video_id, c.category FROM video_category_ids vc JOIN categories c ON c.category_id = vc.category_id;
+
+CREATE TRIGGER IF NOT EXISTS video_categories_insert INSTEAD OF INSERT ON video_categories
+BEGIN
+    INSERT OR IGNORE INTO categories(category) VALUES (NEW.category);
+    INSERT OR IGNORE INTO video_category_ids(video_id, category_id)
+        SELECT NEW.video_id, category_id FROM categories WHERE category = NEW.category;
+END;
+
+CREATE TRIGGER IF NOT EXISTS video_categories_delete INSTEAD OF DELETE ON video_categories
+BEGIN
+    DELETE FROM video_category_ids
+    WHERE video_id = OLD.video_id
+      AND category_id = (SELECT category_id FROM categories WHERE category = OLD.category);
+END;
+"""
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS videos (
     video_id        INTEGER PRIMARY KEY,
@@ -102,46 +186,85 @@ CREATE TABLE IF NOT EXISTS videos (
     rating          REAL,
     ratings         INTEGER,
     publish_date    TEXT,                -- ISO-8601 string (YYYY-MM-DD)
+    publish_day     INTEGER,             -- days since 1970-01-01, derived from publish_date at ingest
+    publish_ym      INTEGER,             -- year*100 + month (e.g. 202401), derived likewise
     category_source TEXT,
     is_active       INTEGER,             -- 0/1
     retrieved_at    TEXT NOT NULL        -- ISO-8601 UTC timestamp
 );
-
-CREATE TABLE IF NOT EXISTS video_tags (
-    video_id    INTEGER NOT NULL,
-    tag         TEXT    NOT NULL,
-    FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
-    UNIQUE(video_id, tag)
-);
-
-CREATE INDEX IF NOT EXISTS idx_video_tags_tag ON video_tags(tag);
-
-CREATE TABLE IF NOT EXISTS video_categories (
-    video_id    INTEGER NOT NULL,
-    category    TEXT    NOT NULL,
-    FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
-    UNIQUE(video_id, category)
-);
-
-CREATE INDEX IF NOT EXISTS idx_video_categories_category ON video_categories(category);
-
+""" + DICTIONARY_SQL + COMPAT_VIEWS_SQL + VIDEO_DOCS_SQL + """
 CREATE TABLE IF NOT EXISTS audit_terms (
     term    TEXT PRIMARY KEY,
     group_name TEXT NOT NULL            -- e.g., 'race', 'gender', 'orientation'
 );
 
 CREATE TABLE IF NOT EXISTS collection_state (
-    day                 TEXT PRIMARY KEY,    -- YYYY-MM-DD (UTC)
+    day                 TEXT NOT NULL,       -- YYYY-MM-DD (UTC)
+    quota_key           TEXT NOT NULL DEFAULT 'default',  -- one budget per API key / IP
     requests_used       INTEGER NOT NULL DEFAULT 0,
     last_page_fetched   INTEGER NOT NULL DEFAULT 0,
-    reset_at            TEXT NOT NULL        -- ISO-8601 UTC timestamp of next reset
+    reset_at            TEXT NOT NULL,       -- ISO-8601 UTC timestamp of next reset
+    PRIMARY KEY(day, quota_key)
 );
 
 -- Helpful read paths
 CREATE INDEX IF NOT EXISTS idx_videos_publish_date ON videos(publish_date);
 CREATE INDEX IF NOT EXISTS idx_videos_is_active ON videos(is_active);
+CREATE INDEX IF NOT EXISTS idx_videos_retrieved_at ON videos(retrieved_at);   -- refresh sweeper
+"""
+
+# Separate from SCHEMA_SQL: on older DBs the columns only exist after migrate_publish_columns
+PUBLISH_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_videos_publish_day ON videos(publish_day);            -- time splits / ranges
+CREATE INDEX IF NOT EXISTS idx_videos_active_ym ON videos(is_active, publish_ym);    -- monthly trends
 """
 
+def publish_day_expr(col: str) -> str:
+    """SQL: epoch day of an ISO date/datetime text (NULL if unparseable)."""
+    return f"CAST(julianday(SUBSTR({col}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+def publish_ym_expr(col: str) -> str:
+    """SQL: YYYYMM integer of an ISO date/datetime text (NULL if unparseable)."""
+    return f"CAST(strftime('%Y%m', SUBSTR({col}, 1, 10)) AS INTEGER)"
+
+def publish_columns_sql(conn: sqlite3.Connection, alias: str = "") -> Tuple[str, str]:
+    """
+    (publish_day, publish_ym) SQL for reading: the stored columns, or the same
+    expressions over publish_date when a read-only connection meets a DB the
+    collector has not migrated yet.
+    """
+    pre = f"{alias}." if alias else ""
+    have = {r[1] for r in conn.execute("PRAGMA table_info(videos)")}
+    if {"publish_day", "publish_ym"} <= have:
+        return f"{pre}publish_day", f"{pre}publish_ym"
+    return publish_day_expr(f"{pre}publish_date"), publish_ym_expr(f"{pre}publish_date")
+
+# Dictionary name -> (id column, text column)
+DICTIONARIES = {"tags": ("tag_id", "tag"), "categories": ("category_id", "category")}
+
+def intern_terms(conn: sqlite3.Connection, table: str, values) -> dict:
+    """
+    Map each distinct string in `values` to its id in dictionary `table`
+    ('tags' or 'categories'), inserting unseen strings. Runs inside the
+    caller's transaction.
+    """
+    id_col, text_col = DICTIONARIES[table]
+    values = list({v for v in values if v})
+    ids = {}
+    for i in range(0, len(values), 900):
+        chunk = values[i:i + 900]
+        marks = ",".join("?" * len(chunk))
+        sql = f"SELECT {text_col}, {id_col} FROM {table} WHERE {text_col} IN ({marks})"
+        ids.update((r[0], r[1]) for r in conn.execute(sql, chunk))
+        missing = [v for v in chunk if v not in ids]
+        if missing:
+            conn.executemany(f"INSERT OR IGNORE INTO {table}({text_col}) VALUES (?)", [(v,) for v in missing])
+            marks = ",".join("?" * len(missing))
+            ids.update((r[0], r[1]) for r in conn.execute(
+                f"SELECT {text_col}, {id_col} FROM {table} WHERE {text_col} IN ({marks})", missing
+            ))
+    return ids
+
 def load_data_from_db(db_path: Path) -> pd.DataFrame:
     """
     Connects to the SQLite DB and loads the full, current video data into a DataFrame.
@@ -175,10 +298,258 @@ def load_data_from_db(db_path: Path) -> pd.DataFrame:
         print(f"Error loading data: {e}")
         return pd.DataFrame()
 
+# Compact dtypes for iter_data_from_db (nullable ints: API rows may lack counts)
+VIDEO_DTYPES = {
+    "video_id": "int64",
+    "duration": "Int32",
+    "views": "Int64",
+    "rating": "float32",
+    "ratings": "Int32",
+    "is_active": "Int8",
+    "publish_day": "Int32",
+    "publish_ym": "Int32",
+}
+
+def _tags_for_range(conn: sqlite3.Connection, lo: int, hi: int, ids: list, as_arrow: bool):
+    """Tags of videos lo..hi aligned to `ids`: comma-joined strings, or a pyarrow list<string> column."""
+    if not as_arrow:
+        rows = conn.execute(
+            "SELECT video_id, GROUP_CONCAT(tag) FROM video_tags WHERE video_id BETWEEN ? AND ? GROUP BY video_id",
+            (lo, hi),
+        ).fetchall()
+        joined = dict(rows)
+        return pd.Series([joined.get(v) for v in ids], dtype=object)
+    import pyarrow as pa  # optional: only needed for tags="arrow"
+    lists = {v: [] for v in ids}
+    for vid, tag in conn.execute(
+        "SELECT video_id, tag FROM video_tags WHERE video_id BETWEEN ? AND ? ORDER BY video_id", (lo, hi)
+    ):
+        bucket = lists.get(vid)
+        if bucket is not None:
+            bucket.append(tag)
+    arr = pa.array([lists[v] for v in ids], type=pa.list_(pa.string()))
+    return pd.Series(pd.arrays.ArrowExtensionArray(arr))
+
+def _frame_chunks(db_path: Path, cols: list, chunksize: int, tags: Optional[str],
+                  categories) -> Iterator[pd.DataFrame]:
+    # Imported lazily: the collector imports this module without the analysis config stack
+    from src.utils.sqlite_read import connect_readonly
+    conn = connect_readonly(db_path)
+    conn.row_factory = None
+    try:
+        last = -1
+        select = ", ".join(cols)
+        while True:
+            rows = conn.execute(
+                f"SELECT {select} FROM videos WHERE video_id > ? ORDER BY video_id LIMIT ?", (last, chunksize)
+            ).fetchall()
+            if not rows:
+                return
+            df = pd.DataFrame.from_records(rows, columns=cols)
+            for c in cols:
+                if c in VIDEO_DTYPES:
+                    df[c] = df[c].astype(VIDEO_DTYPES[c])
+                elif c == "category_source":
+                    df[c] = df[c].astype(categories)
+                elif c == "publish_date":
+                    df[c] = pd.to_datetime(df[c], errors="coerce", format="ISO8601")
+                elif c == "retrieved_at":
+                    df[c] = pd.to_datetime(df[c], errors="coerce", format="ISO8601", utc=True)
+            ids = df["video_id"].tolist()
+            if tags:
+                df["tags"] = _tags_for_range(conn, ids[0], ids[-1], ids, tags == "arrow")
+            last = ids[-1]
+            yield df
+    finally:
+        conn.close()
+
+def iter_data_from_db(db_path: Path, columns: Optional[list] = None, chunksize: int = 50_000,
+                      tags: Optional[str] = "string", prefetch: int = 1) -> Iterator[pd.DataFrame]:
+    """
+    Streaming, memory-compact variant of load_data_from_db.
+
+    Yields DataFrames of up to `chunksize` videos in video_id order (keyset
+    pagination, read-only connection from src.utils.sqlite_read), with:
+      - int64 video_id, nullable Int32/Int64 counts, float32 rating, Int8 is_active
+      - categorical category_source (one dtype for every chunk, so pd.concat keeps it)
+      - datetime64 publish_date / UTC retrieved_at (unparseable -> NaT)
+
+    Args:
+        db_path: SQLite file.
+        columns: videos columns to project (video_id is always included); None = all.
+        chunksize: videos per chunk.
+        tags: "string" = comma-joined like load_data_from_db (None when untagged),
+              "arrow" = pyarrow list<string> column (needs pyarrow; [] when untagged),
+              None = no tags column.
+        prefetch: chunks read ahead on a background thread while the caller
+              works on the current one (SQLite releases the GIL); 0 = inline.
+    """
+    if tags not in (None, "string", "arrow"):
+        raise ValueError(f"tags must be 'string', 'arrow' or None, got {tags!r}")
+    if tags == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("tags='arrow' needs pyarrow: pip install pyarrow") from e
+    db_path = Path(db_path)
+    from src.utils.sqlite_read import connect_readonly
+    with closing(connect_readonly(db_path)) as conn:
+        have = [r[1] for r in conn.execute("PRAGMA table_info(videos)")]
+        cols = have if columns is None else ["video_id"] + [c for c in columns if c != "video_id"]
+        unknown = sorted(set(cols) - set(have))
+        if unknown:
+            raise ValueError(f"Unknown videos columns: {unknown}")
+        categories = None
+        if "category_source" in cols:
+            cats = [r[0] for r in conn.execute(
+                "SELECT DISTINCT category_source FROM videos WHERE category_source IS NOT NULL ORDER BY 1")]
+            categories = pd.CategoricalDtype(cats)
+
+    chunks = _frame_chunks(db_path, cols, chunksize, tags, categories)
+    if prefetch <= 0:
+        yield from chunks
+        return
+
+    q: "queue.Queue" = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    done = object()
+
+    def _produce() -> None:
+        try:
+            for df in chunks:
+                while not stop.is_set():
+                    try:
+                        q.put(df, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+        except BaseException as e:  # re-raised in the consumer
+            q.put(e)
+            return
+        finally:
+            chunks.close()
+        q.put(done)
+
+    t = threading.Thread(target=_produce, name="iter-data-prefetch", daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while t.is_alive():
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                t.join(0.05)
+
+def migrate_collection_state(conn: sqlite3.Connection) -> None:
+    """
+    Older DBs keyed collection_state by day only. Rebuild it with the
+    (day, quota_key) key so several collectors with separate quotas can share
+    the DB; existing rows become quota_key='default'. No-op once migrated.
+    """
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(collection_state)")}
+    if not cols or "quota_key" in cols:
+        return
+    conn.executescript("""
+        BEGIN;
+        CREATE TABLE collection_state_new (
+            day                 TEXT NOT NULL,
+            quota_key           TEXT NOT NULL DEFAULT 'default',
+            requests_used       INTEGER NOT NULL DEFAULT 0,
+            last_page_fetched   INTEGER NOT NULL DEFAULT 0,
+            reset_at            TEXT NOT NULL,
+            PRIMARY KEY(day, quota_key)
+        );
+        INSERT INTO collection_state_new(day, quota_key, requests_used, last_page_fetched, reset_at)
+            SELECT day, 'default', requests_used, last_page_fetched, reset_at FROM collection_state;
+        DROP TABLE collection_state;
+        ALTER TABLE collection_state_new RENAME TO collection_state;
+        COMMIT;
+    """)
+    print("Migrated collection_state to per-quota_key rows.")
+
+def migrate_dictionary_encoding(conn: sqlite3.Connection) -> bool:
+    """
+    Older DBs stored the tag/category text on every video_tags / video_categories
+    row. Move them to the dictionary tables + integer link tables (ids assigned
+    by descending frequency, so common strings get the shortest varints) and
+    replace the old tables with the compatibility views, in one transaction.
+    Returns True if a migration ran; no-op once migrated. Run VACUUM afterwards
+    to hand the freed pages back to the filesystem.
+    """
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'video_tags'").fetchone()
+    if row is None or row[0] != "table":
+        return False
+    script = "BEGIN;\n" + DICTIONARY_SQL + """
+        INSERT OR IGNORE INTO tags(tag)
+            SELECT tag FROM video_tags GROUP BY tag ORDER BY COUNT(*) DESC, tag;
+        INSERT OR IGNORE INTO categories(category)
+            SELECT category FROM video_categories GROUP BY category ORDER BY COUNT(*) DESC, category;
+        INSERT OR IGNORE INTO video_tag_ids(video_id, tag_id)
+            SELECT vt.video_id, t.tag_id FROM video_tags vt JOIN tags t ON t.tag = vt.tag
+            WHERE EXISTS (SELECT 1 FROM videos v WHERE v.video_id = vt.video_id)
+            ORDER BY 1, 2;
+        INSERT OR IGNORE INTO video_category_ids(video_id, category_id)
+            SELECT vc.video_id, c.category_id FROM video_categories vc JOIN categories c ON c.category = vc.category
+            WHERE EXISTS (SELECT 1 FROM videos v WHERE v.video_id = vc.video_id)
+            ORDER BY 1, 2;
+        DROP TABLE video_tags;
+        DROP TABLE video_categories;
+    """ + COMPAT_VIEWS_SQL + "\nCOMMIT;"
+    try:
+        conn.executescript(script)
+    except Error:
+        conn.rollback()
+        raise
+    n_tags = conn.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+    n_cats = conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+    print(f"Migrated video_tags/video_categories to dictionary encoding ({n_tags} tags, {n_cats} categories).")
+    return True
+
+def migrate_publish_columns(conn: sqlite3.Connection) -> int:
+    """
+    Add publish_day / publish_ym to older videos tables, backfill them from
+    publish_date and create their indexes. Returns rows filled; no-op once done
+    (only rows with an unparseable publish_date stay NULL).
+    """
+    have = {r[1] for r in conn.execute("PRAGMA table_info(videos)")}
+    if not have:
+        return 0
+    for col in ("publish_day", "publish_ym"):
+        if col not in have:
+            conn.execute(f"ALTER TABLE videos ADD COLUMN {col} INTEGER")
+    conn.executescript(PUBLISH_INDEX_SQL)
+    cur = conn.execute(f"""
+        UPDATE videos
+        SET publish_day = {publish_day_expr("publish_date")},
+            publish_ym  = {publish_ym_expr("publish_date")}
+        WHERE publish_day IS NULL AND publish_date IS NOT NULL
+          AND julianday(SUBSTR(publish_date, 1, 10)) IS NOT NULL
+    """)
+    conn.commit()
+    if cur.rowcount > 0:
+        print(f"Backfilled publish_day/publish_ym for {cur.rowcount:,} videos.")
+    return max(cur.rowcount, 0)
+
 def create_tables(conn: sqlite3.Connection) -> None:
     try:
+        # Must precede SCHEMA_SQL: its views/triggers cannot sit on the legacy tables
+        migrate_dictionary_encoding(conn)
         conn.executescript(SCHEMA_SQL)
-        print("Schema ensured: videos, video_tags, video_categories, audit_terms, collection_state.")
+        migrate_collection_state(conn)
+        migrate_publish_columns(conn)
+        ensure_eda_aggregates(conn)
+        print("Schema ensured: videos, tags, categories, video_tag_ids, video_category_ids "
+              "(+ video_tags/video_categories views), audit_terms, collection_state, agg_* EDA aggregates.")
     except Error as e:
         print(f"Error creating tables: {e}")
 
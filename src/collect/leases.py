@@ -0,0 +1,174 @@
+"""
+src/collect/leases.py
+
+Purpose
+-------
+Category leases so several collector processes (possibly on different IPs with
+separate quotas) can share one database without crawling the same category:
+
+    category_leases(category PK, owner, lease_expires, heartbeat_at, acquired_at)
+
+- claim(): one atomic upsert per candidate; succeeds only if the category is
+  unleased, its lease expired, or we already own it.
+- A heartbeat thread renews all of our leases every `heartbeat_secs` on its own
+  connection; a lease not renewed within `ttl_secs` (crashed process) becomes
+  claimable by anyone.
+- release(): drop one lease when its category is finished / on shutdown.
+
+Resume pointers stay in category_status, so whoever claims a category next
+continues from its last written page.
+
+Assumptions
+-----------
+- Hosts sharing the DB have roughly synchronised clocks (ttl >> clock skew).
+- Timestamps are ISO-8601 UTC strings (lexicographic order == time order).
+"""
+
+from __future__ import annotations
+import os
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Iterable, Optional, Set
+
+DEFAULT_TTL_SECS = 300
+DEFAULT_HEARTBEAT_SECS = 60
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def ensure_lease_table(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS category_leases(
+            category      TEXT PRIMARY KEY,
+            owner         TEXT NOT NULL,
+            lease_expires TEXT NOT NULL,
+            heartbeat_at  TEXT NOT NULL,
+            acquired_at   TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+class LeaseManager:
+    """
+    Thread-safe claim/renew/release of category leases for one owner.
+    `connect` opens a new DB connection (used by the heartbeat thread).
+    """
+
+    def __init__(self, conn, connect: Callable[[], sqlite3.Connection], owner: Optional[str] = None,
+                 ttl_secs: int = DEFAULT_TTL_SECS, heartbeat_secs: int = DEFAULT_HEARTBEAT_SECS):
+        self.conn = conn
+        self._connect = connect
+        self.owner = owner or default_owner()
+        self.ttl_secs = int(ttl_secs)
+        self.heartbeat_secs = max(1, int(heartbeat_secs))
+        self.held: Set[str] = set()
+        self.lost: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        ensure_lease_table(conn)
+
+    # ---------- claiming ----------
+
+    def _try_claim(self, category: str) -> bool:
+        now = datetime.now(timezone.utc)
+        cur = self.conn.execute("""
+            INSERT INTO category_leases(category, owner, lease_expires, heartbeat_at, acquired_at)
+            VALUES(?, ?, ?, ?, ?)
+            ON CONFLICT(category) DO UPDATE SET
+                owner=excluded.owner,
+                lease_expires=excluded.lease_expires,
+                heartbeat_at=excluded.heartbeat_at,
+                acquired_at=CASE WHEN category_leases.owner = excluded.owner
+                                 THEN category_leases.acquired_at ELSE excluded.acquired_at END
+            WHERE category_leases.owner = excluded.owner OR category_leases.lease_expires < excluded.heartbeat_at
+        """, (category, self.owner, _iso(now + timedelta(seconds=self.ttl_secs)), _iso(now), _iso(now)))
+        self.conn.commit()
+        return cur.rowcount == 1
+
+    def claim(self, candidates: Iterable[str]) -> Optional[str]:
+        """Claim the first candidate nobody else holds; None if all are taken."""
+        with self._lock:
+            for cat in candidates:
+                if cat in self.held:
+                    continue
+                if self._try_claim(cat):
+                    self.held.add(cat)
+                    self.lost.discard(cat)
+                    return cat
+        return None
+
+    def holds(self, category: str) -> bool:
+        with self._lock:
+            return category in self.held and category not in self.lost
+
+    def release(self, category: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM category_leases WHERE category = ? AND owner = ?", (category, self.owner)
+            )
+            self.conn.commit()
+            self.held.discard(category)
+            self.lost.discard(category)
+
+    def release_all(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM category_leases WHERE owner = ?", (self.owner,))
+            self.conn.commit()
+            self.held.clear()
+            self.lost.clear()
+
+    # ---------- heartbeat ----------
+
+    def renew(self, conn=None) -> None:
+        """Extend all of our leases; any we no longer own are marked lost."""
+        conn = conn or self.conn
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            held = set(self.held)
+            if not held:
+                return
+            conn.execute(
+                "UPDATE category_leases SET lease_expires = ?, heartbeat_at = ? WHERE owner = ?",
+                (_iso(now + timedelta(seconds=self.ttl_secs)), _iso(now), self.owner),
+            )
+            conn.commit()
+            owned = {r[0] for r in conn.execute(
+                "SELECT category FROM category_leases WHERE owner = ?", (self.owner,)
+            )}
+            for cat in held - owned:
+                if cat not in self.lost:
+                    print(f"[lease] Lost lease on '{cat}' (expired and reclaimed by another collector)")
+                self.lost.add(cat)
+
+    def _heartbeat(self) -> None:
+        conn = self._connect()
+        try:
+            while not self._stop.wait(self.heartbeat_secs):
+                try:
+                    self.renew(conn)
+                except sqlite3.Error as e:
+                    print(f"[lease] Heartbeat failed: {e}")
+        finally:
+            conn.close()
+
+    def start(self) -> "LeaseManager":
+        self._thread = threading.Thread(target=self._heartbeat, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.release_all()
@@ -0,0 +1,298 @@
+"""
+src/collect/metrics.py
+
+Purpose
+-------
+Small in-process metrics registry for the collector (no client library needed):
+- Counter:   monotonically increasing total (requests, rows, retries)
+- Gauge:     last value, or a callback evaluated only at export time
+             (quota remaining, pacer rate) so the hot path pays nothing
+- Histogram: fixed cumulative buckets + sum/count (HTTP, parse, DB write time)
+
+Every metric may carry labels; `.labels(...)` children are cached, so a hot-path
+update is a dict lookup plus a locked add (about a microsecond).
+
+Outputs
+-------
+- render_prometheus(): Prometheus text exposition format (node_exporter
+  textfile collector: write to <dir>/*.prom, replaced atomically)
+- snapshot(): plain dict, appended as one JSON line per export
+- MetricsExporter: background thread doing both every `interval` seconds
+
+Test Notes
+----------
+- python src/collect/collector.py --metrics-dir data/metrics --metrics-interval 5
+- cat data/metrics/collector.prom; tail -n1 data/metrics/collector.jsonl
+"""
+
+from __future__ import annotations
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-ms DB writes up to slow API responses
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _fmt(v: float) -> str:
+    v = float(v)
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+
+def _finite(v: Optional[float]) -> Optional[float]:
+    return None if v is None or math.isinf(v) else v
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    esc = [(k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in esc) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> "_Metric":
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], "_Metric"]]:
+        if self.labelnames:
+            return sorted(self._children.items())
+        return [((), self)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.help)
+
+    def inc(self, n: float = 1.0) -> None:
+        with self._lock:
+            self.value += n
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+        self._fn: Optional[Callable[[], Optional[float]]] = None
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.help)
+
+    def set(self, v: float) -> None:
+        self.value = float(v)
+
+    def set_function(self, fn: Optional[Callable[[], Optional[float]]]) -> None:
+        """Evaluate `fn` at export time instead of storing a value (None = skip the series)."""
+        self._fn = fn
+
+    def read(self) -> Optional[float]:
+        if self._fn is None:
+            return self.value
+        try:
+            v = self._fn()
+        except Exception:
+            return None
+        return None if v is None else float(v)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # last = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, v: float) -> None:
+        i = bisect_left(self.buckets, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+            self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound holding the q-quantile (coarse; for the JSON summary)."""
+        if not self.count:
+            return None
+        rank, acc = q * self.count, 0
+        for bound, c in zip(self.buckets + (math.inf,), self.counts):
+            acc += c
+            if acc >= rank:
+                return bound
+        return math.inf
+
+
+class _Timer:
+    __slots__ = ("h", "t0")
+
+    def __init__(self, h: Histogram):
+        self.h = h
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.h.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class MetricsRegistry:
+    """Owns the metrics of one process; render/snapshot are safe to call from any thread."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help, labelnames, buckets))
+
+    # ---------- export ----------
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for values, s in m._series():
+                if isinstance(s, Histogram):
+                    with s._lock:
+                        counts, total, n = list(s.counts), s.sum, s.count
+                    acc = 0
+                    for bound, c in zip(s.buckets + (math.inf,), counts):
+                        acc += c
+                        lines.append(f"{m.name}_bucket{_label_str(m.labelnames, values, ('le', _fmt(bound)))} {acc}")
+                    lines.append(f"{m.name}_sum{_label_str(m.labelnames, values)} {_fmt(total)}")
+                    lines.append(f"{m.name}_count{_label_str(m.labelnames, values)} {n}")
+                else:
+                    v = s.read() if isinstance(s, Gauge) else s.value
+                    if v is not None:
+                        lines.append(f"{m.name}{_label_str(m.labelnames, values)} {_fmt(v)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """{name: value | {label=value,...: value} | histogram summary} for JSON lines."""
+        out: Dict = {"ts": round(time.time(), 3)}
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            series = {}
+            for values, s in m._series():
+                key = ",".join(f"{k}={v}" for k, v in zip(m.labelnames, values)) or "_"
+                if isinstance(s, Histogram):
+                    if not s.count:
+                        continue
+                    series[key] = {"count": s.count, "sum": round(s.sum, 6),
+                                   "p50_le": _finite(s.quantile(0.5)), "p95_le": _finite(s.quantile(0.95)),
+                                   "p99_le": _finite(s.quantile(0.99))}
+                else:
+                    v = s.read() if isinstance(s, Gauge) else s.value
+                    if v is not None:
+                        series[key] = v
+            if series:
+                out[m.name] = series.get("_", series) if not m.labelnames else series
+        return out
+
+
+class MetricsExporter:
+    """Writes `<dir>/<name>.prom` (atomic replace) and appends `<dir>/<name>.jsonl` every `interval` s."""
+
+    def __init__(self, registry: MetricsRegistry, out_dir: Path, name: str = "collector",
+                 interval: float = 15.0):
+        self.registry = registry
+        self.out_dir = Path(out_dir)
+        self.prom_path = self.out_dir / f"{name}.prom"
+        self.jsonl_path = self.out_dir / f"{name}.jsonl"
+        self.interval = max(0.5, float(interval))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+    def export(self) -> None:
+        tmp = self.prom_path.with_suffix(f".prom.tmp{os.getpid()}")
+        tmp.write_text(self.registry.render_prometheus(), encoding="utf-8")
+        os.replace(tmp, self.prom_path)
+        snap = self.registry.snapshot()
+        with self.jsonl_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(snap) + "\n")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                print(f"[metrics] Export failed: {e}")
+
+    def start(self) -> "MetricsExporter":
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.export()   # final state of the run
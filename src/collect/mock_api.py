@@ -0,0 +1,281 @@
+"""
+src/collect/mock_api.py
+
+Purpose
+-------
+Local stand-in for the RedTube API so collector.py can be load-tested without
+spending real quota. Serves:
+- redtube.Categories.getCategoriesList
+- redtube.Videos.searchVideos   (category, page; ordering/period accepted)
+- redtube.Videos.getVideoById
+
+Data comes from a deterministic synthetic generator (category/page counts,
+cross-category overlap) or from a recorded raw archive (see raw_archive.py).
+
+Fault injection
+---------------
+- latency_ms / jitter_ms: per-request service time
+- error_rate: share of requests answered with HTTP 503 (+ Retry-After if set)
+- daily_limit: after this many requests every call returns code 1005
+- past the last page: code 2001 ("No videos found"), like the real API
+
+Every request (including injected errors) is counted in `stats`, which is the
+ground truth the collector's quota accounting is checked against.
+
+Test Notes
+----------
+- python -m src.collect.mock_api --port 8765 --categories 10 --pages 30 --latency_ms 40
+- MSC_API_BASE_URL=http://127.0.0.1:8765/ python src/collect/collector.py --workers 4
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Dict, List, Optional, Tuple
+
+ID_BASE = 10_000_000
+
+
+@dataclass
+class MockConfig:
+    categories: int = 10
+    pages: int = 30                 # pages per category before code 2001
+    page_size: int = 20
+    overlap: float = 0.3            # share of each page drawn from a cross-category pool
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    retry_after: Optional[int] = None
+    daily_limit: Optional[int] = None
+    recorded_dir: Optional[str] = None
+    seed: int = 7
+
+
+class SyntheticCatalog:
+    """Deterministic API-shaped pages: same (category, page) -> same videos."""
+
+    def __init__(self, cfg: MockConfig):
+        self.cfg = cfg
+        self.names = [f"mockcat_{i:03d}" for i in range(cfg.categories)]
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.pool = max(1, cfg.categories * cfg.pages * cfg.page_size // 4)
+
+    def categories(self) -> List[str]:
+        return self.names
+
+    def total(self, category: str) -> int:
+        return self.cfg.pages * self.cfg.page_size if category in self.index else 0
+
+    def video(self, vid: int, category: Optional[str] = None) -> Dict:
+        rnd = random.Random(vid)
+        cats = [category] if category else [self.names[vid % len(self.names)]]
+        return {
+            "video_id": vid,
+            "title": f"mock video {vid}",
+            "url": f"https://example.invalid/{vid}",
+            "duration": f"{rnd.randint(0, 40)}:{rnd.randint(0, 59):02d}",
+            "views": rnd.randint(0, 3_000_000),
+            "rating": round(rnd.uniform(0, 100), 1),
+            "ratings": rnd.randint(0, 5000),
+            "publish_date": f"20{rnd.randint(12, 25)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 12:00:00",
+            "tags": [{"tag_name": f"tag_{rnd.randint(0, 499)}"} for _ in range(6)],
+            "categories": [{"category": c} for c in cats],
+        }
+
+    def page(self, category: str, page: int) -> Optional[List[Dict]]:
+        ci = self.index.get(category)
+        if ci is None or page < 1 or page > self.cfg.pages:
+            return None
+        rnd = random.Random(self.cfg.seed * 1_000_003 + ci * 10_007 + page)
+        out = []
+        for k in range(self.cfg.page_size):
+            if rnd.random() < self.cfg.overlap:
+                vid = ID_BASE + rnd.randrange(self.pool)
+            else:
+                vid = ID_BASE + self.pool + ((ci * self.cfg.pages + page - 1) * self.cfg.page_size + k)
+            out.append({"video": self.video(vid, category)})
+        return out
+
+
+class RecordedCatalog:
+    """Pages replayed from a raw archive directory (last fetch of each (category, page) wins)."""
+
+    def __init__(self, root: Path):
+        from src.collect.raw_archive import iter_records, record_videos
+        self.pages: Dict[Tuple[str, int], List[Dict]] = {}
+        self.by_id: Dict[int, Dict] = {}
+        for rec in iter_records(root):
+            videos = record_videos(rec)
+            self.pages[(rec["category"], int(rec["page"]))] = videos
+            for vw in videos:
+                v = vw.get("video", {})
+                if isinstance(v.get("video_id"), int):
+                    self.by_id[v["video_id"]] = v
+        self.names = sorted({c for c, _ in self.pages})
+
+    def categories(self) -> List[str]:
+        return self.names
+
+    def total(self, category: str) -> int:
+        return sum(len(v) for (c, _), v in self.pages.items() if c == category)
+
+    def video(self, vid: int, category: Optional[str] = None) -> Optional[Dict]:
+        return self.by_id.get(vid)
+
+    def page(self, category: str, page: int) -> Optional[List[Dict]]:
+        return self.pages.get((category, page))
+
+
+class MockRedTubeAPI:
+    """Threaded HTTP server; start() returns the base URL to use as API_BASE_URL."""
+
+    def __init__(self, cfg: Optional[MockConfig] = None):
+        self.cfg = cfg or MockConfig()
+        self.catalog = RecordedCatalog(Path(self.cfg.recorded_dir)) if self.cfg.recorded_dir else SyntheticCatalog(self.cfg)
+        self._lock = threading.Lock()
+        self._rnd = random.Random(self.cfg.seed)
+        self.stats: Dict[str, int] = {"requests": 0, "http_503": 0, "code_1005": 0, "code_2001": 0, "pages": 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _respond(self, query: Dict[str, str]) -> Tuple[int, Dict, Dict]:
+        """Returns (http_status, headers, body)."""
+        cfg = self.cfg
+        with self._lock:
+            self.stats["requests"] += 1
+            n = self.stats["requests"]
+            fail = cfg.error_rate > 0 and self._rnd.random() < cfg.error_rate
+            delay = max(0.0, cfg.latency_ms + self._rnd.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000.0
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._bump("http_503")
+            headers = {"Retry-After": str(cfg.retry_after)} if cfg.retry_after is not None else {}
+            return 503, headers, {"error": "injected"}
+        if cfg.daily_limit is not None and n > cfg.daily_limit:
+            self._bump("code_1005")
+            return 200, {}, {"code": 1005, "message": "Daily limit reached"}
+
+        data = query.get("data")
+        if data == "redtube.Categories.getCategoriesList":
+            return 200, {}, {"categories": [{"category": c} for c in self.catalog.categories()]}
+        if data == "redtube.Videos.getVideoById":
+            try:
+                video = self.catalog.video(int(query.get("video_id", "")))
+            except ValueError:
+                video = None
+            if video is None:
+                return 200, {}, {"code": 2002, "message": "No video with this ID"}
+            return 200, {}, {"video": video}
+        if data == "redtube.Videos.searchVideos":
+            cat = query.get("category", "")
+            try:
+                page = int(query.get("page", "1"))
+            except ValueError:
+                page = 0
+            videos = self.catalog.page(cat, page)
+            if not videos:
+                self._bump("code_2001")
+                return 200, {}, {"code": 2001, "message": "No videos found"}
+            self._bump("pages")
+            return 200, {}, {"videos": videos, "count": self.catalog.total(cat)}
+        return 200, {}, {"code": 1001, "message": f"Unknown method {data!r}"}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def do_GET(self):
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                status, headers, body = api._respond(query)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        categories=args.categories, pages=args.pages, page_size=args.page_size, overlap=args.overlap,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        retry_after=args.retry_after, daily_limit=args.daily_limit, recorded_dir=args.recorded_dir,
+        seed=args.seed,
+    )
+
+
+def add_mock_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--categories", type=int, default=10, help="Synthetic categories.")
+    ap.add_argument("--pages", type=int, default=30, help="Pages per category before code 2001.")
+    ap.add_argument("--page_size", type=int, default=20, help="Videos per page.")
+    ap.add_argument("--overlap", type=float, default=0.3, help="Share of videos shared across categories.")
+    ap.add_argument("--latency_ms", type=float, default=0.0, help="Mean service latency per request.")
+    ap.add_argument("--jitter_ms", type=float, default=0.0, help="Uniform +/- latency jitter.")
+    ap.add_argument("--error_rate", type=float, default=0.0, help="Share of requests answered with HTTP 503.")
+    ap.add_argument("--retry_after", type=int, default=None, help="Retry-After seconds on injected 503s.")
+    ap.add_argument("--daily_limit", type=int, default=None, help="Answer code 1005 after this many requests.")
+    ap.add_argument("--recorded_dir", type=str, default=None, help="Serve pages from a raw archive directory.")
+    ap.add_argument("--seed", type=int, default=7)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Local mock of the RedTube API for collector load tests.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(ap)
+    args = ap.parse_args(argv)
+
+    api = MockRedTubeAPI(config_from_args(args))
+    url = api.start(args.host, args.port)
+    print(f"[mock] Serving {len(api.catalog.categories())} categories at {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"[mock] {api.stats}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
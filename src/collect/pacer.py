@@ -0,0 +1,125 @@
+"""
+src/collect/pacer.py
+
+Purpose
+-------
+Adaptive request pacing (AIMD) shared by every fetcher thread, replacing the
+fixed REQUEST_DELAY sleep:
+
+- Additive increase: each fast (latency <= target), clean response raises the
+  rate by `increase / rate` req/s, i.e. about +`increase` req/s per second of
+  healthy traffic.
+- Multiplicative decrease: a 429/5xx (final status *or* any attempt retried by
+  the urllib3 Retry adapter) multiplies the rate by `decrease`; a slow response
+  applies a milder `slow_decrease`.
+- Retry-After on a final response holds every thread until it has elapsed.
+- Network errors back off exponentially (2s, 4s, ... capped) instead of a flat
+  60s, and also cut the rate.
+
+Requests are spaced on one shared schedule, so `rate` is the total request rate
+of the process no matter how many workers are fetching.
+
+Inputs
+------
+- record(latency, status, retry_statuses, retry_after) after every response.
+
+Outputs
+-------
+- `[pace]` log lines on every decrease and every `log_every` requests.
+"""
+
+from __future__ import annotations
+import threading
+import time
+from typing import Iterable, Optional
+
+CONGESTION_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AdaptivePacer:
+    """Thread-safe AIMD rate controller; call wait() before each request."""
+
+    def __init__(self, initial_delay: float = 0.35, min_delay: float = 0.1, max_delay: float = 10.0,
+                 increase: float = 0.05, decrease: float = 0.5, slow_decrease: float = 0.9,
+                 latency_target: float = 2.0, max_error_backoff: float = 60.0, log_every: int = 200):
+        self.min_rate = 1.0 / max(max_delay, 1e-3)
+        self.max_rate = 1.0 / max(min_delay, 1e-3)
+        self.rate = self._clamp(1.0 / initial_delay if initial_delay > 0 else self.max_rate)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.slow_decrease = float(slow_decrease)
+        self.latency_target = float(latency_target)
+        self.max_error_backoff = float(max_error_backoff)
+        self.log_every = max(1, int(log_every))
+        self._lock = threading.Lock()
+        self._next_slot = 0.0       # monotonic time the next request may start
+        self._error_streak = 0
+        self.requests = 0
+        self.congestion_events = 0
+        self._lat_ewma: Optional[float] = None
+
+    def _clamp(self, rate: float) -> float:
+        return min(self.max_rate, max(self.min_rate, rate))
+
+    @property
+    def delay(self) -> float:
+        return 1.0 / self.rate
+
+    def describe(self) -> str:
+        lat = f"{self._lat_ewma:.2f}s" if self._lat_ewma is not None else "n/a"
+        return (f"rate={self.rate:.2f} req/s (delay {self.delay:.2f}s), latency~{lat}, "
+                f"requests={self.requests}, congestion={self.congestion_events}")
+
+    # ---------- scheduling ----------
+
+    def wait(self) -> None:
+        """Block until this caller's slot on the shared schedule."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    # ---------- feedback ----------
+
+    def _cut(self, factor: float, reason: str) -> None:
+        old = self.rate
+        self.rate = self._clamp(self.rate * factor)
+        if self.rate < old:
+            print(f"[pace] {reason}: {old:.2f} -> {self.rate:.2f} req/s")
+
+    def record(self, latency: float, status: int, retry_statuses: Iterable[Optional[int]] = (),
+               retry_after: Optional[float] = None) -> None:
+        """Feed one completed HTTP exchange (including adapter-level retries)."""
+        with self._lock:
+            self.requests += 1
+            self._lat_ewma = latency if self._lat_ewma is None else 0.8 * self._lat_ewma + 0.2 * latency
+            congested = status in CONGESTION_STATUSES or any(s in CONGESTION_STATUSES for s in retry_statuses)
+            if congested:
+                self.congestion_events += 1
+                self._cut(self.decrease, f"HTTP {status} (retried: {list(retry_statuses)})")
+            elif latency > self.latency_target:
+                self._cut(self.slow_decrease, f"slow response {latency:.2f}s")
+            else:
+                self.rate = self._clamp(self.rate + self.increase / self.rate)
+            if status in CONGESTION_STATUSES:
+                self._error_streak += 1
+            elif status < 400:
+                self._error_streak = 0
+            if retry_after:
+                self._next_slot = max(self._next_slot, time.monotonic() + retry_after)
+                print(f"[pace] Retry-After {retry_after:.0f}s")
+            if self.requests % self.log_every == 0:
+                print(f"[pace] {self.describe()}")
+
+    def on_error(self) -> None:
+        """Network failure (no response at all): cut the rate."""
+        with self._lock:
+            self._error_streak += 1
+            self._cut(self.decrease, "network error")
+
+    def error_backoff(self) -> float:
+        """Seconds a caller should wait before retrying a failed fetch (2s, 4s, ... capped)."""
+        with self._lock:
+            return min(self.max_error_backoff, 2.0 ** max(1, self._error_streak))
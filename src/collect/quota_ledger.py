@@ -0,0 +1,173 @@
+"""
+src/collect/quota_ledger.py
+
+Purpose
+-------
+In-memory ledger for the daily API request budget kept in `collection_state`.
+Instead of a SELECT (+ INSERT) + UPDATE per HTTP call, the ledger reserves
+requests from the DB in blocks and hands them out locally:
+
+- acquire(n): served from the local block; a new block is reserved only when
+  the current one runs out (one atomic conditional UPDATE).
+- flush(): every `flush_secs` seconds (and on close) the unused part of the
+  block is handed back, so `requests_used` equals real usage at flush points.
+
+Crash safety
+------------
+Reservations are counted in `collection_state` *before* any request is sent,
+so the DB total is always >= real usage. A crash can only strand the unused
+part of one block (the day's budget shrinks slightly); it can never push the
+process, or several processes sharing the DB, past the daily limit.
+
+Complexity
+----------
+- One SQLite write per `block_size` requests (+1 per flush interval).
+"""
+
+from __future__ import annotations
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple
+
+DEFAULT_BLOCK_SIZE = 50      # requests reserved per DB round-trip
+DEFAULT_FLUSH_SECS = 30.0    # hand unused reservations back at least this often
+
+
+def utc_today_str() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def next_midnight_utc(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).date()
+    return datetime.combine(tomorrow, datetime.min.time(), tzinfo=timezone.utc)
+
+
+class QuotaLedger:
+    """
+    Thread-safe block-reserving view of today's `collection_state` row for one
+    quota_key (one API key / egress IP).
+    `conn` should be a dedicated connection: the ledger commits on its own.
+    """
+
+    def __init__(self, conn, daily_limit: int, block_size: int = DEFAULT_BLOCK_SIZE,
+                 flush_secs: float = DEFAULT_FLUSH_SECS, quota_key: str = "default"):
+        self.conn = conn
+        self.quota_key = quota_key
+        self.daily_limit = int(daily_limit)
+        self.block_size = max(1, int(block_size))
+        self.flush_secs = float(flush_secs)
+        self._lock = threading.Lock()
+        self.day: Optional[str] = None
+        self.reset_at: Optional[str] = None
+        self.reserved_left = 0       # reserved in DB, not yet handed out
+        self.used_today = 0          # handed out by this ledger today
+        self.db_round_trips = 0
+        self._last_flush = time.monotonic()
+
+    # ---------- DB side ----------
+
+    def _ensure_day(self) -> None:
+        day = utc_today_str()
+        if day == self.day:
+            return
+        if self.day is not None:
+            self._release()  # give back yesterday's remainder (harmless after reset)
+        reset_at = next_midnight_utc().isoformat()
+        self.conn.execute(
+            "INSERT OR IGNORE INTO collection_state(day, quota_key, requests_used, last_page_fetched, reset_at) "
+            "VALUES(?, ?, 0, 0, ?)",
+            (day, self.quota_key, reset_at),
+        )
+        row = self.conn.execute(
+            "SELECT reset_at FROM collection_state WHERE day = ? AND quota_key = ?", (day, self.quota_key)
+        ).fetchone()
+        self.conn.commit()
+        self.day, self.reset_at = day, row[0]
+        self.reserved_left = 0
+        self.used_today = 0
+
+    def _reserve(self, want: int) -> int:
+        """Atomically reserve up to `want` requests (falls back to what is left)."""
+        cur = self.conn.execute(
+            "UPDATE collection_state SET requests_used = requests_used + ? "
+            "WHERE day = ? AND quota_key = ? AND requests_used + ? <= ?",
+            (want, self.day, self.quota_key, want, self.daily_limit),
+        )
+        got = want if cur.rowcount == 1 else 0
+        if not got:
+            left = self.daily_limit - self._used()
+            if left > 0:
+                cur = self.conn.execute(
+                    "UPDATE collection_state SET requests_used = requests_used + ? "
+                    "WHERE day = ? AND quota_key = ? AND requests_used + ? <= ?",
+                    (left, self.day, self.quota_key, left, self.daily_limit),
+                )
+                got = left if cur.rowcount == 1 else 0
+        self.conn.commit()
+        self.db_round_trips += 1
+        self.reserved_left += got
+        return got
+
+    def _release(self) -> None:
+        if self.reserved_left > 0 and self.day is not None:
+            self.conn.execute(
+                "UPDATE collection_state SET requests_used = MAX(0, requests_used - ?) "
+                "WHERE day = ? AND quota_key = ?",
+                (self.reserved_left, self.day, self.quota_key),
+            )
+            self.conn.commit()
+            self.db_round_trips += 1
+        self.reserved_left = 0
+        self._last_flush = time.monotonic()
+
+    def _used(self) -> int:
+        row = self.conn.execute(
+            "SELECT requests_used FROM collection_state WHERE day = ? AND quota_key = ?",
+            (self.day, self.quota_key),
+        ).fetchone()
+        return int(row[0])
+
+    def _sleep_secs_until_reset(self) -> int:
+        reset_at = datetime.fromisoformat(self.reset_at)
+        return max(1, int((reset_at - datetime.now(timezone.utc)).total_seconds()))
+
+    # ---------- public API ----------
+
+    def acquire(self, n: int = 1) -> Tuple[bool, int]:
+        """
+        Take n requests from the budget. Returns (allowed, sleep_seconds) with
+        the same meaning as collector.can_consume_requests.
+        """
+        with self._lock:
+            self._ensure_day()
+            if time.monotonic() - self._last_flush >= self.flush_secs:
+                self._release()
+            if self.reserved_left < n:
+                self._reserve(max(self.block_size, n - self.reserved_left))
+            if self.reserved_left < n:
+                return False, self._sleep_secs_until_reset()
+            self.reserved_left -= n
+            self.used_today += n
+            return True, 0
+
+    def refund(self, n: int) -> None:
+        """Return requests that were acquired but never sent."""
+        with self._lock:
+            self.reserved_left += n
+            self.used_today -= n
+
+    def remaining(self) -> int:
+        """Budget left today across all processes (DB view + our unused block)."""
+        with self._lock:
+            self._ensure_day()
+            return self.daily_limit - self._used() + self.reserved_left
+
+    def flush(self) -> None:
+        """Make `requests_used` exact: hand the unused reservation back."""
+        with self._lock:
+            self._release()
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,153 @@
+"""
+src/collect/raw_archive.py
+
+Purpose
+-------
+Opt-in archive of raw `searchVideos` responses so the DB can be rebuilt after a
+schema / parsing change without spending API quota.
+
+- Writer: every archived page becomes one NDJSON record
+      {"category", "page", "ordering", "period", "fetched_at", "response"}
+  appended to gzip segments `raw_<UTC start>_<pid>_<seq>.ndjson.gz`; a new
+  segment is started every `segment_records` pages.
+- Reader: iter_records() walks segments in name (= chronological) order, so a
+  replay applies pages in the order they were fetched and the upsert path ends
+  with the same "latest fetch wins" state as the original crawl.
+
+Assumptions
+-----------
+- `response` is the decoded JSON body exactly as returned by the API; all
+  parsing (durations, tags, categories) happens again on replay.
+- The gzip stream is sync-flushed every `flush_every` records. After a crash
+  the reader keeps every complete line before the truncated tail.
+
+Test Notes
+----------
+- python -m src.collect.raw_archive   (segments / pages / videos on disk)
+"""
+
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Dict, Iterator, List, Optional
+
+SEGMENT_RECORDS = 5000   # pages per segment file
+FLUSH_EVERY = 50         # records between gzip sync-flushes (crash-loss bound)
+SEGMENT_GLOB = "raw_*.ndjson.gz"
+
+
+class RawArchive:
+    """Thread-safe appender of raw API pages to rotating gzip NDJSON segments."""
+
+    def __init__(self, root: Path, segment_records: int = SEGMENT_RECORDS, flush_every: int = FLUSH_EVERY):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_records = max(1, int(segment_records))
+        self.flush_every = max(1, int(flush_every))
+        self._lock = threading.Lock()
+        self._stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._seq = 0
+        self._fh = None
+        self._in_segment = 0
+        self.records = 0
+
+    def _open_segment(self) -> None:
+        name = f"raw_{self._stamp}_{os.getpid()}_{self._seq:05d}.ndjson.gz"
+        self._seq += 1
+        self._fh = gzip.open(self.root / name, "wt", encoding="utf-8", compresslevel=6)
+        self._in_segment = 0
+
+    def _close_segment(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def append(self, category: str, page: int, response, ordering: Optional[str] = None,
+               period: Optional[str] = None, fetched_at: Optional[str] = None) -> None:
+        rec = {
+            "category": category,
+            "page": int(page),
+            "ordering": ordering,
+            "period": period,
+            "fetched_at": fetched_at or datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "response": response,
+        }
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fh is None or self._in_segment >= self.segment_records:
+                self._close_segment()
+                self._open_segment()
+            self._fh.write(line)
+            self._in_segment += 1
+            self.records += 1
+            if self._in_segment % self.flush_every == 0:
+                self._fh.flush()
+                self._fh.buffer.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
+
+
+# --------------------------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------------------------
+
+def list_segments(root: Path) -> List[Path]:
+    return sorted(Path(root).glob(SEGMENT_GLOB))
+
+
+def iter_records(root: Path) -> Iterator[Dict]:
+    """Yield archived records in fetch order; tolerates a truncated last segment."""
+    for seg in list_segments(root):
+        try:
+            with gzip.open(seg, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # partial line at a crash point
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            print(f"[archive] {seg.name}: truncated segment ({e}); kept complete records")
+
+
+def record_videos(rec: Dict) -> list:
+    resp = rec.get("response")
+    if isinstance(resp, dict):
+        return resp.get("videos") or []
+    return []
+
+
+# --------------------------------------------------------------------------------------
+# CLI
+# --------------------------------------------------------------------------------------
+
+def _cli(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Summarize the raw API response archive.")
+    ap.add_argument("--dir", type=str, default=None, help="Archive directory (default: data/raw_api).")
+    args = ap.parse_args(argv)
+
+    root = Path(args.dir) if args.dir else Path(__file__).resolve().parents[2] / "data" / "raw_api"
+    segs = list_segments(root)
+    n_pages = n_videos = 0
+    cats = set()
+    for rec in iter_records(root):
+        n_pages += 1
+        n_videos += len(record_videos(rec))
+        cats.add(rec.get("category"))
+    size_mb = sum(p.stat().st_size for p in segs) / 1e6
+    print(f"[ok] {root}: {len(segs)} segments, {size_mb:.1f} MB, {n_pages:,} pages, "
+          f"{n_videos:,} videos, {len(cats)} categories")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
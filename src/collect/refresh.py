@@ -0,0 +1,149 @@
+"""
+src/collect/refresh.py
+
+Purpose
+-------
+Stale-engagement refresh planning. views/rating/ratings in `videos` only change
+when a video is re-seen by a category crawl, so snapshots drift apart in age.
+The collector's --refresh mode re-fetches rows via getVideoById; this module
+decides which rows, how many, and writes the results:
+
+- Candidates: active rows whose `retrieved_at` is older than `min_age_days`,
+  oldest first (a pool of `POOL_FACTOR` x batch rows from the
+  idx_videos_retrieved_at index).
+- Weighted sampling without replacement (Efraimidis-Spirakis keys u^(1/w)) from
+  that pool, w = age_days * log10(10 + views): popular videos are refreshed
+  more often, but age keeps growing every unrefreshed row's weight and the pool
+  always comes from the oldest slice, so refreshes sweep the whole corpus.
+- Budget: `share` of the daily limit per (day, quota_key), tracked in
+  `engagement_refresh` so several runs on one day share the same allowance.
+- Writes: one executemany UPDATE of the engagement columns (+ retrieved_at)
+  per batch; videos the API no longer has are marked is_active=0.
+
+Assumptions
+-----------
+- retrieved_at is ISO-8601 UTC (lexicographic order == time order).
+"""
+
+from __future__ import annotations
+import math
+import random
+from datetime import datetime, timezone, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+POOL_FACTOR = 4
+DEFAULT_SHARE = 0.1
+DEFAULT_BATCH = 100
+DEFAULT_MIN_AGE_DAYS = 7.0
+
+# (video_id, views, rating, ratings) as returned by getVideoById
+Engagement = Tuple[int, Optional[int], Optional[float], Optional[int]]
+
+
+def ensure_refresh_table(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS engagement_refresh(
+            day            TEXT NOT NULL,
+            quota_key      TEXT NOT NULL DEFAULT 'default',
+            requests_used  INTEGER NOT NULL DEFAULT 0,
+            refreshed      INTEGER NOT NULL DEFAULT 0,
+            gone           INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(day, quota_key)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_retrieved_at ON videos(retrieved_at)")
+    conn.commit()
+
+
+def _parse_ts(s: Optional[str]) -> Optional[datetime]:
+    if not s:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(s))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class RefreshPlanner:
+    """Chooses stale videos to re-fetch and records refresh results for one quota key."""
+
+    def __init__(self, conn, quota_key: str = "default", seed: Optional[int] = None):
+        self.conn = conn
+        self.quota_key = quota_key
+        self.rnd = random.Random(seed)
+        self.skip: Set[int] = set()    # attempted this run (failed ones must not be re-picked)
+        ensure_refresh_table(conn)
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    # ---------- budget ----------
+
+    def used_today(self) -> int:
+        row = self.conn.execute(
+            "SELECT requests_used FROM engagement_refresh WHERE day = ? AND quota_key = ?",
+            (self._today(), self.quota_key),
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def budget_left(self, share: float, daily_limit: int) -> int:
+        return max(0, int(share * daily_limit) - self.used_today())
+
+    # ---------- selection ----------
+
+    @staticmethod
+    def weight(age_days: float, views: Optional[int]) -> float:
+        return max(age_days, 1e-3) * math.log10(10 + max(0, int(views or 0)))
+
+    def select(self, n: int, min_age_days: float = DEFAULT_MIN_AGE_DAYS) -> List[int]:
+        """Up to n video_ids: weighted sample from the oldest eligible rows."""
+        if n <= 0:
+            return []
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=min_age_days)).isoformat(timespec="seconds")
+        rows = self.conn.execute("""
+            SELECT video_id, views, retrieved_at FROM videos
+            WHERE retrieved_at < ? AND COALESCE(is_active, 1) = 1
+            ORDER BY retrieved_at
+            LIMIT ?
+        """, (cutoff, n * POOL_FACTOR + len(self.skip))).fetchall()
+        keyed = []
+        for vid, views, retrieved_at in rows:
+            if vid in self.skip:
+                continue
+            ts = _parse_ts(retrieved_at)
+            age = (now - ts).total_seconds() / 86400.0 if ts else min_age_days
+            keyed.append((self.rnd.random() ** (1.0 / self.weight(age, views)), vid))
+        keyed.sort(reverse=True)
+        picked = [vid for _, vid in keyed[:n]]
+        self.skip.update(picked)
+        return picked
+
+    # ---------- writes ----------
+
+    def apply(self, updates: Iterable[Engagement], gone: Iterable[int], requests_used: int) -> None:
+        """Write one batch (engagement columns, gone flags, usage) in a single transaction."""
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        updates, gone = list(updates), list(gone)
+        self.conn.executemany("""
+            UPDATE videos SET
+                views=COALESCE(?, views),
+                rating=COALESCE(?, rating),
+                ratings=COALESCE(?, ratings),
+                retrieved_at=?
+            WHERE video_id = ?
+        """, [(views, rating, ratings, now, vid) for vid, views, rating, ratings in updates])
+        self.conn.executemany(
+            "UPDATE videos SET is_active=0, retrieved_at=? WHERE video_id = ?", [(now, vid) for vid in gone]
+        )
+        self.conn.execute("""
+            INSERT INTO engagement_refresh(day, quota_key, requests_used, refreshed, gone)
+            VALUES(?, ?, ?, ?, ?)
+            ON CONFLICT(day, quota_key) DO UPDATE SET
+                requests_used=engagement_refresh.requests_used + excluded.requests_used,
+                refreshed=engagement_refresh.refreshed + excluded.refreshed,
+                gone=engagement_refresh.gone + excluded.gone
+        """, (self._today(), self.quota_key, int(requests_used), len(updates), len(gone)))
+        self.conn.commit()
@@ -0,0 +1,169 @@
+"""
+src/collect/scheduler.py
+
+Purpose
+-------
+Yield-driven category scheduler for the daily request budget. Instead of
+crawling categories in API list order, every request goes to the category with
+the highest expected number of NEW videos per request.
+
+Per-category statistics (persisted in `category_yield`):
+- recent: new-row counts of the last K pages (JSON array)
+- pages_fetched / new_rows: lifetime totals
+- total_count: latest `count` reported by searchVideos (-> remaining pages)
+
+Expected yield = (sum(recent) + PRIOR_NEW * w) / (len(recent) + w),
+with w = PRIOR_WEIGHT / (1 + pages_fetched): a smoothed mean with an
+optimistic prior that fades as the category is measured. Unexplored categories
+get tried before well-measured low-yield ones, and a category that keeps
+returning no new rows drops below --min-yield after a handful of pages.
+Categories whose estimated remaining pages reach 0 are not scheduled.
+
+Outputs
+-------
+- print_plan(): per-run plan table (greedy allocation of the remaining budget
+  to the best categories, capped by estimated remaining pages).
+
+Assumptions
+-----------
+- One API page = one request = up to PAGE_SIZE videos.
+- Yield is treated as flat over the remaining pages of a category when planning.
+"""
+
+from __future__ import annotations
+import json
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PAGE_SIZE = 20
+DEFAULT_WINDOW = 20      # K: pages in the moving yield window
+PRIOR_NEW = float(PAGE_SIZE)
+PRIOR_WEIGHT = 1.0       # pseudo-pages of prior before the first fetch; decays with pages_fetched
+
+
+def ensure_yield_table(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS category_yield(
+            category      TEXT PRIMARY KEY,
+            pages_fetched INTEGER NOT NULL DEFAULT 0,
+            new_rows      INTEGER NOT NULL DEFAULT 0,
+            recent        TEXT    NOT NULL DEFAULT '[]',
+            total_count   INTEGER,
+            updated_at    TEXT
+        )
+    """)
+    conn.commit()
+
+
+class YieldScheduler:
+    """Picks the next category to fetch; keeps and persists per-category yield stats."""
+
+    def __init__(self, conn, categories: Iterable[str], window: int = DEFAULT_WINDOW):
+        self.conn = conn
+        self.window = max(1, int(window))
+        self.categories: List[str] = list(categories)
+        self.active = set(self.categories)
+        self.recent: Dict[str, List[int]] = {c: [] for c in self.categories}
+        self.pages_fetched: Dict[str, int] = {c: 0 for c in self.categories}
+        self.new_rows: Dict[str, int] = {c: 0 for c in self.categories}
+        self.total_count: Dict[str, Optional[int]] = {c: None for c in self.categories}
+        self.last_page: Dict[str, int] = {c: 0 for c in self.categories}
+        self._load()
+
+    def _load(self) -> None:
+        ensure_yield_table(self.conn)
+        for row in self.conn.execute(
+            "SELECT category, pages_fetched, new_rows, recent, total_count FROM category_yield"
+        ):
+            cat = row[0]
+            if cat not in self.active:
+                continue
+            self.pages_fetched[cat] = int(row[1])
+            self.new_rows[cat] = int(row[2])
+            self.recent[cat] = list(json.loads(row[3] or "[]"))[-self.window:]
+            self.total_count[cat] = row[4]
+        for row in self.conn.execute("SELECT category, last_page FROM category_status"):
+            if row[0] in self.active:
+                self.last_page[row[0]] = int(row[1] or 0)
+
+    # ---------- estimates ----------
+
+    def expected_yield(self, cat: str) -> float:
+        r = self.recent[cat]
+        w = PRIOR_WEIGHT / (1 + self.pages_fetched.get(cat, 0))
+        return (sum(r) + PRIOR_NEW * w) / (len(r) + w)
+
+    def remaining_pages(self, cat: str) -> Optional[int]:
+        total = self.total_count.get(cat)
+        if total is None:
+            return None
+        return max(0, math.ceil(int(total) / PAGE_SIZE) - self.last_page[cat])
+
+    def schedulable(self, cat: str) -> bool:
+        """Still active and not known to be out of pages."""
+        return cat in self.active and self.remaining_pages(cat) != 0
+
+    # ---------- decisions ----------
+
+    def choose(self) -> Optional[str]:
+        """Schedulable category with the highest expected new rows per request (list order breaks ties)."""
+        best, best_y = None, -1.0
+        for cat in self.categories:
+            if self.schedulable(cat):
+                y = self.expected_yield(cat)
+                if y > best_y:
+                    best, best_y = cat, y
+        return best
+
+    def finish(self, cat: str) -> None:
+        self.active.discard(cat)
+
+    def record(self, cat: str, page: int, inserted: int, total_count: Optional[int] = None) -> None:
+        """One page written for `cat`: update the window and persist the row."""
+        r = self.recent.setdefault(cat, [])
+        r.append(int(inserted))
+        del r[:-self.window]
+        self.pages_fetched[cat] = self.pages_fetched.get(cat, 0) + 1
+        self.new_rows[cat] = self.new_rows.get(cat, 0) + int(inserted)
+        self.last_page[cat] = max(self.last_page.get(cat, 0), int(page))
+        if total_count is not None:
+            self.total_count[cat] = int(total_count)
+        self.conn.execute("""
+            INSERT INTO category_yield(category, pages_fetched, new_rows, recent, total_count, updated_at)
+            VALUES(?, ?, ?, ?, ?, ?)
+            ON CONFLICT(category) DO UPDATE SET
+                pages_fetched=excluded.pages_fetched,
+                new_rows=excluded.new_rows,
+                recent=excluded.recent,
+                total_count=COALESCE(excluded.total_count, category_yield.total_count),
+                updated_at=excluded.updated_at
+        """, (cat, self.pages_fetched[cat], self.new_rows[cat], json.dumps(r),
+              self.total_count.get(cat), datetime.now(timezone.utc).isoformat(timespec="seconds")))
+        self.conn.commit()
+
+    # ---------- reporting ----------
+
+    def plan(self, budget: int) -> List[Tuple[str, float, Optional[int], int, float]]:
+        """Greedy allocation: (category, yield/request, est. remaining pages, requests, expected new)."""
+        rows = []
+        left = max(0, int(budget))
+        active = [c for c in self.categories if self.schedulable(c)]
+        for cat in sorted(active, key=lambda c: -self.expected_yield(c)):
+            y = self.expected_yield(cat)
+            rem = self.remaining_pages(cat)
+            alloc = left if rem is None else min(left, rem)
+            left -= alloc
+            rows.append((cat, y, rem, alloc, y * alloc))
+        return rows
+
+    def print_plan(self, budget: int, top: int = 15) -> None:
+        rows = self.plan(budget)
+        expected = sum(r[4] for r in rows)
+        print(f"[plan] Budget {budget} requests over {len(rows)} categories -> ~{expected:,.0f} new rows expected")
+        print(f"[plan] {'category':<28} {'new/req':>8} {'rem.pages':>10} {'requests':>9} {'exp.new':>9}")
+        for cat, y, rem, alloc, exp_new in rows[:top]:
+            rem_s = "?" if rem is None else str(rem)
+            print(f"[plan] {cat[:28]:<28} {y:>8.2f} {rem_s:>10} {alloc:>9} {exp_new:>9.0f}")
+        if len(rows) > top:
+            print(f"[plan] ... {len(rows) - top} more categories")
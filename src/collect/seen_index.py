@@ -0,0 +1,219 @@
+"""
+src/collect/seen_index.py
+
+Purpose
+-------
+Global membership index of known video_ids, shared by every category crawl.
+- Base: sorted NumPy array (uint32 while ids fit, else int64), persisted as
+  `<db>.seen.npy` next to the SQLite file and memory-mapped on load; the
+  sidecar `<db>.seen.json` records its size and how many DB rows were at or
+  below its maximum id when it was saved.
+- Delta: plain Python set of ids added during this run; merged into the base
+  on compaction / save.
+
+10M ids take ~40 MB as uint32; loading a persisted index is an mmap (ms), and
+only ids above the persisted maximum are topped up from the DB on startup.
+
+Assumptions
+-----------
+- videos.video_id is the INTEGER PRIMARY KEY (ids are monotonic-ish), so the
+  top-up query `video_id > max` is a cheap PK range scan.
+- Ids are added only after their rows are committed, so a lagging index only
+  ever makes a known video look new: the upsert path stays idempotent and the
+  DB probe in save_pages_to_db stays authoritative for new-row counts.
+- A persisted index is reused only while the DB still holds as many rows at or
+  below its maximum id as at save time; rows deleted, restored or rewritten
+  below the max (or a missing sidecar) trigger a full rebuild.
+
+Test Notes
+----------
+- python -m src.collect.seen_index --rebuild   (build + print size/timing)
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+UINT32_MAX = np.iinfo(np.uint32).max
+COMPACT_EVERY = 500_000  # merge delta into the base array past this many ids
+
+
+def default_index_path(db_file: Path) -> Path:
+    return Path(str(db_file) + ".seen.npy")
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+
+def _rows_upto(conn, max_id: int) -> int:
+    """DB rows with video_id <= max_id (COUNT(*) is served by the smallest index)."""
+    total = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    above = conn.execute("SELECT COUNT(*) FROM videos WHERE video_id > ?", (max_id,)).fetchone()[0]
+    return int(total) - int(above)
+
+
+def _as_int(vid) -> Optional[int]:
+    try:
+        return int(vid)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compact_dtype(max_id: int):
+    return np.uint32 if 0 <= max_id <= UINT32_MAX else np.int64
+
+
+class SeenIndex:
+    """Sorted array + delta set of known video_ids (thread-safe for add/contains)."""
+
+    def __init__(self, base: Optional[np.ndarray] = None, path: Optional[Path] = None):
+        self.base = base if base is not None else np.empty(0, dtype=np.uint32)
+        self.delta: set = set()
+        self.path = path
+        self._lock = threading.Lock()
+
+    # ---------- construction ----------
+
+    @classmethod
+    def build(cls, conn, path: Optional[Path] = None) -> "SeenIndex":
+        """Full build from videos (PK order, so no sort needed)."""
+        cur = conn.execute("SELECT video_id FROM videos ORDER BY video_id")
+        ids = np.fromiter((r[0] for r in cur if isinstance(r[0], int)), dtype=np.int64, count=-1)
+        max_id = int(ids[-1]) if ids.size else 0
+        return cls(ids.astype(_compact_dtype(max_id)), path=path)
+
+    @classmethod
+    def load(cls, conn, path: Path) -> "SeenIndex":
+        """mmap the persisted index and top it up with ids added since it was saved."""
+        if not path.exists():
+            idx = cls.build(conn, path)
+            print(f"[seen] Built index from DB: {idx.size():,} ids ({idx.nbytes() / 1e6:.1f} MB)")
+            return idx
+        base = np.load(path, mmap_mode="r")
+        last = int(base[-1]) if base.size else -1
+        try:
+            meta = json.loads(_meta_path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get("ids") != int(base.size) or meta.get("db_rows") != _rows_upto(conn, last):
+            # Rows at/below the index max changed since the save (DB replaced/restored,
+            # rows deleted or rewritten), or no sidecar: the array cannot be trusted
+            idx = cls.build(conn, path)
+            print(f"[seen] Stale index ({path.name}); rebuilt from DB: {idx.size():,} ids")
+            return idx
+        idx = cls(base, path=path)
+        rows = conn.execute("SELECT video_id FROM videos WHERE video_id > ?", (last,)).fetchall()
+        idx.add_many(r[0] for r in rows)
+        print(f"[seen] Loaded {base.size:,} ids from {path.name} (+{len(idx.delta):,} newer in DB)")
+        return idx
+
+    # ---------- membership ----------
+
+    def __contains__(self, vid) -> bool:
+        v = _as_int(vid)
+        if v is None:
+            return False
+        if v in self.delta:
+            return True
+        base = self.base
+        if not base.size or v < 0 or v > int(base[-1]):
+            return False
+        i = int(np.searchsorted(base, v))
+        return i < base.size and int(base[i]) == v
+
+    def contains_many(self, ids: Iterable) -> List[bool]:
+        return [vid in self for vid in ids]
+
+    def add(self, vid) -> None:
+        self.add_many((vid,))
+
+    def add_many(self, ids: Iterable) -> None:
+        vals = [v for v in map(_as_int, ids) if v is not None]
+        with self._lock:
+            self.delta.update(vals)
+            full = len(self.delta) >= COMPACT_EVERY
+        if full:
+            self.compact()
+
+    # ---------- maintenance ----------
+
+    def compact(self) -> None:
+        """Merge the delta set into the sorted base array."""
+        with self._lock:
+            if not self.delta:
+                return
+            pending = list(self.delta)
+            extra = np.fromiter(pending, dtype=np.int64, count=len(pending))
+            merged = np.union1d(np.asarray(self.base, dtype=np.int64), extra)
+            max_id = int(merged[-1]) if merged.size else 0
+            self.base = merged.astype(_compact_dtype(max_id))
+            self.delta.difference_update(pending)
+
+    def save(self, path: Optional[Path] = None, conn=None) -> Path:
+        """
+        Compact, then write the array and its sidecar atomically (tmp file + rename).
+        With `conn`, the sidecar records the DB's row count at/below the max id;
+        without it the index is taken to cover every such row.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("SeenIndex.save needs a path")
+        self.compact()
+        base = self.base
+        last = int(base[-1]) if base.size else -1
+        meta = {"ids": int(base.size), "max_id": last,
+                "db_rows": _rows_upto(conn, last) if conn is not None else int(base.size)}
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.save(f, np.ascontiguousarray(base))
+        os.replace(tmp, path)
+        meta_path = _meta_path(path)
+        tmp = meta_path.with_name(meta_path.name + ".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, meta_path)
+        return path
+
+    def size(self) -> int:
+        return int(self.base.size) + len(self.delta)
+
+    def nbytes(self) -> int:
+        # delta entries cost ~ a set slot + int object each; a rough upper bound
+        return int(self.base.nbytes) + len(self.delta) * 60
+
+
+# --------------------------------------------------------------------------------------
+# CLI
+# --------------------------------------------------------------------------------------
+
+def _cli(argv: Optional[List[str]] = None) -> int:
+    from src.collect.database import get_conn, DB_FILE
+
+    ap = argparse.ArgumentParser(description="Build / inspect the global seen-video index.")
+    ap.add_argument("--rebuild", action="store_true", help="Rebuild from the DB and overwrite the index file.")
+    args = ap.parse_args(argv)
+
+    path = default_index_path(DB_FILE)
+    with get_conn() as conn:
+        t0 = time.perf_counter()
+        if args.rebuild:
+            path.unlink(missing_ok=True)
+        idx = SeenIndex.load(conn, path)
+        t_load = time.perf_counter() - t0
+        idx.save(path, conn=conn)
+    print(f"[ok] {path}: {idx.size():,} ids, {idx.nbytes() / 1e6:.1f} MB, dtype={idx.base.dtype}, load {t_load * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
@@ -13,10 +13,13 @@ needed for downstream fairness evaluation.
 
 Inputs (SQLite)
 ---------------
-- videos(video_id, title, publish_date, is_active)
+- videos(video_id, title, publish_day, is_active)
 - video_tags(video_id, tag)
 - video_categories(video_id, category)
 
+Alternatively (--snapshot): the Parquet corpus snapshot (src/utils/parquet_snapshot.py),
+read with column pruning; --months YYYY-MM:YYYY-MM prunes publish-month partitions.
+
 Text feature:
 - Combined "doc" = title + " " + aggregated tags (word-bounded lexicon already audited).
 
@@ -88,30 +91,25 @@ except Exception as e:
         "Example: pip install 'pandas>=1.5' 'scikit-learn>=1.2' scipy joblib numpy"
     ) from e
 
+from src.utils.sqlite_read import connect_readonly
+from src.utils.db_snapshot import analysis_db_path
+from src.utils.parquet_snapshot import parse_month_range, read_snapshot, snapshot_synced_at
+from src.utils.video_docs import ensure_video_docs
+from src.collect.database import publish_columns_sql
 from src.utils.config_loader import (
     load_config as load_project_config,
     ensure_directories,
     set_global_seed,
     pick_device,
     print_run_header,
+    SqliteReadConfig,
 )
 
 # ------------------------------ DB utils ------------------------------
 
-def _connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def _ensure_temp_tag_agg(conn: sqlite3.Connection) -> None:
-    conn.execute("DROP TABLE IF EXISTS temp_vt_agg")
-    conn.execute("""
-        CREATE TEMP TABLE temp_vt_agg AS
-        SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags
-        FROM video_tags
-        GROUP BY video_id
-    """)
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_temp_vt_agg_vid ON temp_vt_agg(video_id)")
+def _connect(db_path: Path, profile: Optional[SqliteReadConfig] = None) -> sqlite3.Connection:
+    # Read-only profile (mode=ro, query_only, big cache, mmap); see src/utils/sqlite_read.py
+    return connect_readonly(db_path, profile)
 
 # ------------------------------ I/O utils -----------------------------
 
@@ -130,22 +128,44 @@ def _dump_json(path: Path, payload: Dict) -> None:
 
 # ------------------------------ Data prep -----------------------------
 
+_DAY_2010 = 14610  # epoch day of 2010-01-01 (fill value when no video has a date)
+
 def _fetch_base_df(conn: sqlite3.Connection, limit: Optional[int]) -> pd.DataFrame:
-    base = """
-        SELECT v.video_id, v.title, v.publish_date, COALESCE(t.tags,'') AS tags
+    day_sql, _ = publish_columns_sql(conn, "v")
+    base = f"""
+        SELECT v.video_id, v.title, {day_sql} AS publish_day, COALESCE(d.tags_text,'') AS tags
         FROM videos v
-        LEFT JOIN temp_vt_agg t ON t.video_id = v.video_id
+        LEFT JOIN video_docs d ON d.video_id = v.video_id
         WHERE v.is_active = 1
         ORDER BY v.video_id
     """
     if limit:
         base += f" LIMIT {int(limit)}"
     rows = conn.execute(base).fetchall()
-    df = pd.DataFrame(rows, columns=rows[0].keys() if rows else ["video_id","title","publish_date","tags"])
+    df = pd.DataFrame(rows, columns=rows[0].keys() if rows else ["video_id","title","publish_day","tags"])
+    return _prepare_base_df(df)
+
+def _snapshot_base_df(snapshot_dir: Path, limit: Optional[int], months) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Active videos + (video_id, category) pairs from the Parquet snapshot."""
+    snap = read_snapshot(snapshot_dir, columns=["video_id","title","publish_date","tags_text","categories"],
+                         months=months, active_only=True)
+    if limit:
+        snap = snap.head(int(limit))
+    cats = snap[["video_id","categories"]].explode("categories").dropna(subset=["categories"])
+    cats = cats.rename(columns={"categories": "category"}).reset_index(drop=True)
+    df = snap[["video_id","title","publish_date","tags_text"]].rename(columns={"tags_text": "tags"})
+    return _prepare_base_df(df), cats
+
+def _prepare_base_df(df: pd.DataFrame) -> pd.DataFrame:
     df["title"] = df["title"].fillna("")
     df["tags"] = df["tags"].fillna("")
     df["doc"] = (df["title"].astype(str) + " " + df["tags"].astype(str)).str.strip()
-    # dates
+    # dates: integer epoch days from the DB (no parsing); Parquet snapshot frames carry publish_date
+    if "publish_day" in df:
+        day = pd.to_numeric(df["publish_day"], errors="coerce")
+        # backfill missing with earliest day to keep in train
+        df["publish_day"] = day.fillna(day.min() if day.notna().any() else _DAY_2010).astype("int64")
+        return df
     df["publish_date"] = pd.to_datetime(df["publish_date"], errors="coerce")
     # backfill missing with earliest date to keep in train
     if df["publish_date"].isna().any():
@@ -161,7 +181,9 @@ def _labels_for_top_k(conn: sqlite3.Connection, candidates: pd.Series, top_k: in
     vids = ",".join(map(str, candidates.tolist()))
     q = f"SELECT video_id, category FROM video_categories WHERE video_id IN ({vids})"
     rows = conn.execute(q).fetchall()
-    df = pd.DataFrame(rows, columns=["video_id","category"])
+    return _labels_from_pairs(pd.DataFrame(rows, columns=["video_id","category"]), top_k, min_cat_count)
+
+def _labels_from_pairs(df: pd.DataFrame, top_k: int, min_cat_count: int) -> Tuple[Dict[int, List[str]], List[str], pd.DataFrame]:
     # support
     sup = df["category"].value_counts().reset_index()
     sup.columns = ["category","count"]
@@ -179,20 +201,16 @@ def _assign_multilabel(df: pd.DataFrame, vid2labels: Dict[int, List[str]]) -> Li
 
 def _time_split(df: pd.DataFrame, train_q: float = 0.70, val_q: float = 0.85) -> pd.Series:
     """
-    Split by publish_date quantiles into train/val/test (non-overlapping).
+    Split by publish date quantiles into train/val/test (non-overlapping).
+    Uses integer publish_day when present, else publish_date as ns epoch.
     """
-    ords = df["publish_date"].astype(np.int64)  # ns epoch
+    if "publish_day" in df:
+        ords = df["publish_day"].to_numpy(dtype=np.int64)
+    else:
+        ords = df["publish_date"].astype(np.int64).to_numpy()  # ns epoch
     q1 = np.quantile(ords, train_q)
     q2 = np.quantile(ords, val_q)
-    def _bucket(x):
-        xi = int(x.value)
-        if xi <= q1:
-            return "train"
-        elif xi <= q2:
-            return "val"
-        else:
-            return "test"
-    return df["publish_date"].apply(_bucket)
+    return pd.Series(np.where(ords <= q1, "train", np.where(ords <= q2, "val", "test")), index=df.index)
 
 # ------------------------------ Modeling -----------------------------
 
@@ -280,6 +298,8 @@ def main() -> int:
     ap.add_argument("--rf_max_depth", type=int, default=20, help="Max depth for RF.")
     ap.add_argument("--interpret_k", type=int, default=8, help="#classes to run RF permutation importance on (val split).")
     ap.add_argument("--n_jobs", type=int, default=-1, help="Parallelism for scikit-learn (OVR etc.).")
+    ap.add_argument("--snapshot", action="store_true", help="Read from the Parquet snapshot (paths.snapshot) instead of SQLite.")
+    ap.add_argument("--months", type=str, default=None, help="Publish-month range YYYY-MM:YYYY-MM (--snapshot only).")
     args = ap.parse_args()
 
     cfg = load_project_config()
@@ -292,13 +312,16 @@ def main() -> int:
     metrics_dir = (cfg.paths.metrics / "baseline_v1"); metrics_dir.mkdir(parents=True, exist_ok=True)
     models_dir  = (cfg.paths.root / "models" / "baseline_v1"); models_dir.mkdir(parents=True, exist_ok=True)
 
-    # DB
-    conn = _connect(cfg.paths.database)
-    _ensure_temp_tag_agg(conn)
-
     # Data
-    df = _fetch_base_df(conn, args.limit)
-    vid2labels, classes, sup_df = _labels_for_top_k(conn, df["video_id"], top_k=args.top_k, min_cat_count=args.min_cat_count)
+    if args.snapshot:
+        print(f"[snapshot] Reading {cfg.paths.snapshot} (synced {snapshot_synced_at(cfg.paths.snapshot)})")
+        df, pairs = _snapshot_base_df(cfg.paths.snapshot, args.limit, parse_month_range(args.months))
+        vid2labels, classes, sup_df = _labels_from_pairs(pairs, top_k=args.top_k, min_cat_count=args.min_cat_count)
+    else:
+        conn = _connect(analysis_db_path(cfg), cfg.sqlite_read)
+        ensure_video_docs(conn)
+        df = _fetch_base_df(conn, args.limit)
+        vid2labels, classes, sup_df = _labels_for_top_k(conn, df["video_id"], top_k=args.top_k, min_cat_count=args.min_cat_count)
     _write_csv(metrics_dir / "labels_summary.csv", ["category","count"], sup_df[["category","count"]].itertuples(index=False))
 
     df["labels"] = _assign_multilabel(df, vid2labels)
@@ -0,0 +1,186 @@
+"""
+src/setup/bench_read_profile.py
+
+Purpose
+-------
+Wall-time comparison of the analysis read profile (src/utils/sqlite_read.py)
+against the bare sqlite3.connect() the scripts used before, on the full-table
+scans they actually run:
+
+- profile:   00_full_eda dataset_profile (COUNT/AVG over videos)
+- monthly:   00_full_eda monthly_trends GROUP BY SUBSTR(publish_date,1,7)
+- top_tags:  00_full_eda top tags through the video_tags view (GROUP BY + sort)
+- top_cats:  same for video_categories
+- docs_scan: videos LEFT JOIN video_docs ORDER BY video_id (00/01/baselines)
+
+Each repetition opens a fresh connection and runs the whole suite in order on
+it, the way a script does, so the page cache built by one scan is available to
+the next. Per-query median over --repeat runs is reported.
+
+Inputs
+------
+- --db <path>: benchmark an existing DB (read-only), or
+- synthetic DB (bench_dictionary generator + video_docs backfill) when omitted.
+- Profile: config.yaml `sqlite_read`.
+
+Outputs
+-------
+- Console table; optional JSON via --out.
+- --cold drops the OS page cache before every suite run (Linux, root), so
+  the first scan of each run reads from disk.
+
+Assumptions
+-----------
+- Warm-cache numbers mostly measure SQLite's page-cache and copy overhead;
+  the profile's large cache and mmap pay off when the scans repeat on one
+  connection after a cold start (--cold).
+
+Test Notes
+----------
+- python -m src.setup.bench_read_profile --videos 100000 --repeat 5 [--cold]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.config_loader import load_config, SqliteReadConfig
+from src.collect.database import apply_pragmas, migrate_dictionary_encoding
+from src.utils.sqlite_read import connect_readonly, mmap_bytes
+from src.utils.video_docs import backfill_video_docs
+from src.collect.bench_dictionary import build_legacy_db
+
+SCANS: List[Tuple[str, str]] = [
+    ("profile", """
+        SELECT COUNT(*), SUM(is_active=1), AVG(duration), AVG(views), AVG(rating), SUM(ratings)
+        FROM videos
+    """),
+    ("monthly", """
+        SELECT SUBSTR(publish_date,1,7) AS ym, COUNT(*), AVG(rating), AVG(views)
+        FROM videos
+        WHERE is_active=1 AND publish_date IS NOT NULL
+        GROUP BY ym ORDER BY ym
+    """),
+    ("top_tags", """
+        SELECT tag AS name, COUNT(*) AS c FROM video_tags
+        GROUP BY tag HAVING c >= 5 ORDER BY c DESC LIMIT 200
+    """),
+    ("top_cats", """
+        SELECT category AS name, COUNT(*) AS c FROM video_categories
+        GROUP BY category ORDER BY c DESC LIMIT 200
+    """),
+    ("docs_scan", """
+        SELECT v.video_id, v.title, COALESCE(d.tags_text,'') AS tags
+        FROM videos v
+        LEFT JOIN video_docs d ON d.video_id = v.video_id
+        WHERE v.is_active = 1
+        ORDER BY v.video_id
+    """),
+]
+
+
+def _bare(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def drop_os_caches() -> bool:
+    """Linux + root only: evict the page cache so the next run starts cold."""
+    try:
+        os.sync()
+        Path("/proc/sys/vm/drop_caches").write_text("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def run_suite(connect: Callable[[], sqlite3.Connection], repeat: int, cold: bool = False) -> Dict[str, Dict]:
+    times: Dict[str, List[float]] = {name: [] for name, _ in SCANS}
+    rows: Dict[str, int] = {}
+    for _ in range(repeat):
+        if cold:
+            drop_os_caches()
+        conn = connect()
+        for name, sql in SCANS:
+            t0 = time.perf_counter()
+            n = sum(1 for _ in conn.execute(sql))
+            times[name].append(time.perf_counter() - t0)
+            rows[name] = n
+        conn.close()
+    return {name: {"ms": statistics.median(ts) * 1000, "rows": rows[name]} for name, ts in times.items()}
+
+
+def build_synthetic(path: Path, n_videos: int, seed: int) -> None:
+    build_legacy_db(path, n_videos, vocab=12_000, tags_per_video=12, n_categories=90, seed=seed)
+    conn = sqlite3.connect(str(path))
+    apply_pragmas(conn)
+    migrate_dictionary_encoding(conn)
+    backfill_video_docs(conn)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Bare connect vs read-only analysis profile on full-table scans.")
+    ap.add_argument("--db", type=str, default=None, help="Existing DB to benchmark (opened read-only).")
+    ap.add_argument("--videos", type=int, default=100_000, help="Synthetic videos when --db is not given.")
+    ap.add_argument("--repeat", type=int, default=5, help="Suite runs per mode (median reported).")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--cold", action="store_true",
+                    help="Drop the OS page cache before every suite run (Linux, needs root).")
+    ap.add_argument("--out", type=str, default=None, help="Optional JSON output path.")
+    args = ap.parse_args(argv)
+
+    profile: SqliteReadConfig = load_config().sqlite_read
+    with tempfile.TemporaryDirectory(prefix="bench_read_profile_") as td:
+        if args.db:
+            db_path = Path(args.db)
+        else:
+            db_path = Path(td) / "bench.db"
+            print(f"[build] Synthetic DB with {args.videos:,} videos...")
+            build_synthetic(db_path, args.videos, args.seed)
+        size = db_path.stat().st_size
+        print(f"[info] DB {db_path} ({size / 2**20:.1f} MiB); profile cache={profile.cache_size_mb}MiB "
+              f"mmap={mmap_bytes(db_path, profile) / 2**20:.0f}MiB temp_store={profile.temp_store} "
+              f"query_only={profile.query_only}")
+
+        if args.cold and not drop_os_caches():
+            print("[warn] Cannot drop OS caches (not Linux/root); measuring warm cache only.")
+            args.cold = False
+        bare = run_suite(lambda: _bare(db_path), args.repeat, args.cold)
+        tuned = run_suite(lambda: connect_readonly(db_path, profile), args.repeat, args.cold)
+
+    results = []
+    print(f"\n{'scan':<10} {'rows':>9} {'bare ms':>9} {'profile ms':>11} {'speedup':>8}")
+    for name, _ in SCANS:
+        b, t = bare[name], tuned[name]
+        speedup = b["ms"] / t["ms"] if t["ms"] else None
+        results.append({"scan": name, "rows": t["rows"], "bare_ms": b["ms"], "profile_ms": t["ms"],
+                        "speedup": speedup, "match": b["rows"] == t["rows"]})
+        print(f"{name:<10} {t['rows']:>9,} {b['ms']:>9.1f} {t['ms']:>11.1f} {speedup:>7.2f}x")
+    total_b = sum(r["bare_ms"] for r in results)
+    total_t = sum(r["profile_ms"] for r in results)
+    print(f"{'suite':<10} {'':>9} {total_b:>9.1f} {total_t:>11.1f} {total_b / total_t:>7.2f}x")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps({"params": vars(args), "db_bytes": size, "profile": vars(profile),
+                                   "scans": results}, indent=2), encoding="utf-8")
+        print(f"[ok] Wrote {out}")
+    return 0 if all(r["match"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,421 @@
+"""
+src/setup/query_audit.py
+
+Purpose
+-------
+Query-plan audit for the pipeline's hot queries. verify_database only checks
+that a couple of named indices exist; this module checks that the queries the
+collector and analysis scripts actually run use them:
+
+- HOT_QUERIES: registry of every hot read query in the codebase (source
+  function, SQL, and the columns it filters / sorts / reads on its main table).
+- EXPLAIN QUERY PLAN per query -> flags full table scans, temp B-trees
+  (GROUP BY / ORDER BY sorts) and automatic indexes.
+- Index advisor: for flagged queries, derive a covering index from the
+  declared columns (equality, then sort, then range, then the columns read),
+  skip it if an existing index already has that prefix, and check on an
+  empty schema clone (with the DB's sqlite_stat1, if any) that the planner
+  would actually pick it.
+- Wall-time per query against the real DB (median over `repeat` runs).
+
+Inputs
+------
+- Read-only connection to the project DB (verify_database --audit).
+
+Outputs
+-------
+- audit_queries() -> JSON-serialisable dict; verify_database stores it under
+  "query_audit" in reports/metrics/v0_db_profile.json.
+
+Assumptions
+-----------
+- The registry mirrors the SQL in the listed source functions; keep it in
+  sync when those queries change. Python-side aggregates (00_full_eda's
+  MEDIAN) are left out: they do not change the plan.
+- Whole-table aggregates are full scans by design (scan_ok / sort_ok); they
+  are reported as "expected", not as warnings.
+
+Failure Modes
+-------------
+- Query touches a table this DB does not have yet (e.g. category_leases
+  before the first leased run) -> status "skipped".
+- SQL error -> status "error" with the message; the audit continues.
+
+Complexity
+----------
+- EXPLAIN is O(1); timings run each query `repeat` times (full scans included).
+
+Test Notes
+----------
+- python -m src.setup.verify_database --audit --audit_repeat 3
+"""
+
+from __future__ import annotations
+import re
+import sqlite3
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.collect.database import publish_columns_sql
+from src.utils.lexicon_fts import FTS_TABLE
+
+SMALL_TABLE_ROWS = 1_000   # scans below this are info only
+N_PROBE_IDS = 500
+N_PROBE_TAGS = 20
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    source: str                       # module:function that runs it
+    sql: str                          # named params; {ids} / {tag_marks} / {ym} / {v_day} filled from the probe
+    tables: Tuple[str, ...]           # must exist, else skipped
+    table: Optional[str] = None       # main table the advisor targets
+    eq: Tuple[str, ...] = ()          # equality-filtered columns
+    order: Tuple[str, ...] = ()       # ORDER BY / GROUP BY columns
+    range: Tuple[str, ...] = ()       # range-filtered columns
+    cover: Tuple[str, ...] = ()       # other columns read (covering index)
+    scan_ok: bool = False             # whole-table aggregate by design
+    sort_ok: bool = False             # sort is inherent (expression / aggregate / join order)
+
+
+HOT_QUERIES: List[HotQuery] = [
+    # --- collector ---------------------------------------------------
+    HotQuery("existing_ids_for_category", "collect.collector:get_existing_ids_for_category",
+             "SELECT vc.video_id FROM video_categories vc WHERE vc.category = :category",
+             ("video_category_ids", "categories")),
+    HotQuery("category_watermark_fallback", "collect.collector:get_category_watermark",
+             """SELECT v.publish_date, v.video_id
+                FROM video_categories vc JOIN videos v ON v.video_id = vc.video_id
+                WHERE vc.category = :category
+                ORDER BY v.publish_date DESC, v.video_id DESC LIMIT 1""",
+             ("video_category_ids", "categories", "videos"), sort_ok=True),
+    HotQuery("known_video_ids", "collect.collector:existing_video_ids",
+             "SELECT video_id FROM videos WHERE video_id IN ({ids})", ("videos",)),
+    HotQuery("video_exists", "collect.collector:save_videos_to_db",
+             "SELECT 1 FROM videos WHERE video_id = :vid", ("videos",)),
+    HotQuery("tag_dictionary_lookup", "collect.database:intern_terms",
+             "SELECT tag, tag_id FROM tags WHERE tag IN ({tag_marks})", ("tags",)),
+    HotQuery("category_status", "collect.collector:get_start_page_for_category",
+             "SELECT end_reached, last_page FROM category_status WHERE category = :category",
+             ("category_status",)),
+    HotQuery("quota_day", "collect.quota_ledger:QuotaLedger._used",
+             "SELECT requests_used FROM collection_state WHERE day = :day AND quota_key = 'default'",
+             ("collection_state",)),
+    HotQuery("leases_by_owner", "collect.leases:LeaseManager.renew",
+             "SELECT category FROM category_leases WHERE owner = :owner",
+             ("category_leases",), table="category_leases", eq=("owner",)),
+    HotQuery("refresh_sweeper", "collect.refresh:RefreshPlanner.select",
+             """SELECT video_id, views, retrieved_at FROM videos
+                WHERE retrieved_at < :cutoff AND COALESCE(is_active, 1) = 1
+                ORDER BY retrieved_at LIMIT :limit""",
+             ("videos",), table="videos", order=("retrieved_at",), cover=("is_active", "views")),
+    HotQuery("seen_index_warm", "collect.seen_index:SeenIndex.load",
+             "SELECT video_id FROM videos WHERE video_id > :vid", ("videos",)),
+    HotQuery("seen_index_rows", "collect.seen_index:_rows_upto",
+             "SELECT COUNT(*) FROM videos", ("videos",), scan_ok=True),
+    HotQuery("seen_index_rows_above", "collect.seen_index:_rows_upto",
+             "SELECT COUNT(*) FROM videos WHERE video_id > :vid", ("videos",)),
+    # --- loaders / docs ----------------------------------------------
+    HotQuery("frame_chunk", "collect.database:_frame_chunks",
+             """SELECT video_id, title, duration, views, rating, ratings, publish_date,
+                       category_source, is_active
+                FROM videos WHERE video_id > :vid ORDER BY video_id LIMIT :limit""",
+             ("videos",)),
+    HotQuery("tags_for_range", "collect.database:_tags_for_range",
+             """SELECT video_id, GROUP_CONCAT(tag) FROM video_tags
+                WHERE video_id BETWEEN :vid AND :vid_hi GROUP BY video_id""",
+             ("video_tag_ids", "tags")),
+    HotQuery("missing_video_docs", "utils.video_docs:missing_video_docs",
+             """SELECT COUNT(*) FROM videos v
+                WHERE NOT EXISTS (SELECT 1 FROM main.video_docs d WHERE d.video_id = v.video_id)""",
+             ("videos", "video_docs"), scan_ok=True),
+    # --- analysis ----------------------------------------------------
+    HotQuery("eda_profile", "analysis.00_full_eda:_profile_scan (no agg_* tables)",
+             """SELECT COUNT(*), SUM(is_active=1), AVG(duration), AVG(views), AVG(rating), SUM(ratings)
+                FROM videos""",
+             ("videos",), scan_ok=True),
+    HotQuery("eda_monthly", "analysis.00_full_eda:_monthly_scan (no agg_* tables)",
+             """SELECT printf('%04d-%02d', {ym} / 100, {ym} % 100) AS ym, COUNT(*), AVG(rating), AVG(views)
+                FROM videos
+                WHERE is_active=1 AND {ym} IS NOT NULL
+                GROUP BY {ym} ORDER BY {ym}""",
+             ("videos",), table="videos", eq=("is_active",), order=("publish_ym",),
+             cover=("rating", "views")),
+    HotQuery("eda_top_tags", "analysis.00_full_eda:_top_scan (no agg_* tables)",
+             """SELECT tag AS name, COUNT(*) AS c FROM video_tags
+                GROUP BY tag HAVING c >= 5 ORDER BY c DESC LIMIT 200""",
+             ("video_tag_ids", "tags"), scan_ok=True, sort_ok=True),
+    HotQuery("eda_top_categories", "analysis.00_full_eda:_top_scan (no agg_* tables)",
+             """SELECT category AS name, COUNT(*) AS c FROM video_categories
+                GROUP BY category ORDER BY c DESC LIMIT 200""",
+             ("video_category_ids", "categories"), scan_ok=True, sort_ok=True),
+    HotQuery("eda_agg_top_tags", "utils.eda_aggregates:read_top_tags",
+             """SELECT t.tag AS name, a.n AS c FROM agg_tag_counts a JOIN tags t ON t.tag_id = a.tag_id
+                WHERE a.n >= 5 ORDER BY c DESC LIMIT 200""",
+             ("agg_tag_counts", "tags"), scan_ok=True, sort_ok=True),
+    HotQuery("eda_agg_monthly_views", "utils.eda_aggregates:read_monthly",
+             "SELECT publish_ym, bucket, n FROM agg_monthly_views WHERE n > 0 ORDER BY publish_ym, bucket",
+             ("agg_monthly_views",), scan_ok=True),
+    HotQuery("active_docs_batches", "analysis.00_full_eda:_iter_active_with_tags, 01:iter_video_batches, "
+                                    "modeling.baselines:_fetch_base_df",
+             """SELECT v.video_id, v.title, v.views, v.rating, {v_day} AS publish_day, COALESCE(d.tags_text,'') AS tags
+                FROM videos v
+                LEFT JOIN video_docs d ON d.video_id = v.video_id
+                WHERE v.is_active = 1
+                ORDER BY v.video_id""",
+             ("videos", "video_docs"), table="videos", eq=("is_active",), order=("video_id",)),
+    HotQuery("text_meta_for_ids", "analysis.02_fairness_eval:_fetch_text_and_meta_for_ids (02d/02f same)",
+             """SELECT v.video_id, COALESCE(v.title,'') AS title, COALESCE(d.tags_text,'') AS tags,
+                       COALESCE(v.views,0) AS views, v.rating, COALESCE(v.ratings,0) AS ratings
+                FROM videos v
+                LEFT JOIN video_docs d ON d.video_id = v.video_id
+                WHERE v.video_id IN ({ids})""",
+             ("videos", "video_docs")),
+    HotQuery("labels_for_ids", "modeling.baselines:_labels_for_top_k",
+             "SELECT video_id, category FROM video_categories WHERE video_id IN ({ids})",
+             ("video_category_ids", "categories")),
+    HotQuery("snapshot_fingerprints", "utils.parquet_snapshot:partition_fingerprints",
+             """SELECT CASE WHEN v.publish_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+                            THEN SUBSTR(v.publish_date, 1, 7) ELSE 'unknown' END AS ym,
+                       COUNT(*), TOTAL(v.video_id), MAX(v.retrieved_at), MAX(d.updated_at)
+                FROM videos v LEFT JOIN video_docs d ON d.video_id = v.video_id
+                GROUP BY ym""",
+             ("videos", "video_docs"), scan_ok=True, sort_ok=True),
+    HotQuery("snapshot_partition", "utils.parquet_snapshot:partition_frame",
+             """SELECT v.video_id, v.title, v.views, COALESCE(d.tags_text, '') AS tags_text
+                FROM videos v LEFT JOIN video_docs d ON d.video_id = v.video_id
+                WHERE v.publish_date >= :ym AND v.publish_date < :ym_hi
+                ORDER BY v.video_id""",
+             ("videos", "video_docs"), sort_ok=True),
+]
+
+
+# ---------------------------------------------------------------------
+# Probe parameters (real values from this DB)
+# ---------------------------------------------------------------------
+
+def probe_params(conn: sqlite3.Connection) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, str]]:
+    """Named parameters, SQL fragments and tag parameters drawn from the DB (realistic plans and timings)."""
+    n = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    ids = [r[0] for r in conn.execute(
+        "SELECT video_id FROM videos ORDER BY video_id LIMIT ? OFFSET ?", (N_PROBE_IDS, n // 3))]
+    vid = ids[0] if ids else 0
+    row = conn.execute("SELECT MAX(video_id) FROM (SELECT video_id FROM videos WHERE video_id >= ? "
+                       "ORDER BY video_id LIMIT 1000)", (vid,)).fetchone()
+    category = conn.execute("""
+        SELECT c.category FROM video_category_ids vc JOIN categories c ON c.category_id = vc.category_id
+        GROUP BY vc.category_id ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    tags = [r[0] for r in conn.execute("SELECT tag FROM tags ORDER BY tag_id LIMIT ?", (N_PROBE_TAGS,))]
+    latest = conn.execute("SELECT MAX(publish_date) FROM videos").fetchone()[0] or "1970-01"
+    now = datetime.now(timezone.utc)
+    params: Dict[str, Any] = {
+        "vid": vid,
+        "vid_hi": (row[0] if row and row[0] is not None else vid),
+        "category": category[0] if category else "",
+        "ym": latest[:7],
+        "ym_hi": latest[:7] + "~",
+        "cutoff": (now - timedelta(days=7)).isoformat(timespec="seconds"),
+        "day": now.strftime("%Y-%m-%d"),
+        "owner": "audit",
+        "limit": 1000,
+    }
+    _, ym = publish_columns_sql(conn)
+    fragments = {
+        "ym": ym,
+        "v_day": publish_columns_sql(conn, "v")[0],
+        "ids": ",".join(str(i) for i in ids) or "NULL",
+        "tag_marks": ",".join(f":tag{i}" for i in range(len(tags))) or "NULL",
+    }
+    return params, fragments, {f"tag{i}": t for i, t in enumerate(tags)}
+
+
+# ---------------------------------------------------------------------
+# Plan analysis
+# ---------------------------------------------------------------------
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?")
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Dict[str, Any]) -> List[str]:
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def plan_flags(plan: List[str]) -> List[Dict[str, Any]]:
+    """Full scans, temp B-trees and automatic indexes in an EXPLAIN QUERY PLAN."""
+    flags: List[Dict[str, Any]] = []
+    for detail in plan:
+        m = _SCAN_RE.match(detail)
+        if m and m.group(1) not in ("CONSTANT", "SUBQUERY"):
+            flags.append({"kind": "full_scan", "alias": m.group(1), "index": m.group(3),
+                          "covering": bool(m.group(2)), "detail": detail})
+        elif detail.startswith("USE TEMP B-TREE"):
+            flags.append({"kind": "temp_btree", "detail": detail})
+        elif "AUTOMATIC" in detail:
+            flags.append({"kind": "automatic_index", "detail": detail})
+    return flags
+
+
+def _table_rows(conn: sqlite3.Connection, table: str, cache: Dict[str, int]) -> int:
+    if table not in cache:
+        cache[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return cache[table]
+
+
+def _severity(q: HotQuery, flags: List[Dict[str, Any]], rows: Dict[str, int]) -> str:
+    if not flags:
+        return "ok"
+    small = all(r < SMALL_TABLE_ROWS for r in rows.values())
+    unexpected = [f for f in flags
+                  if not (f["kind"] == "full_scan" and q.scan_ok)
+                  and not (f["kind"] == "temp_btree" and q.sort_ok)]
+    if not unexpected:
+        return "expected"
+    return "info" if small else "warn"
+
+
+# ---------------------------------------------------------------------
+# Index advisor
+# ---------------------------------------------------------------------
+
+def suggest_index(q: HotQuery) -> Optional[Tuple[str, List[str]]]:
+    """(index name, columns): equality, sort, range, then the columns read."""
+    if q.table is None:
+        return None
+    cols: List[str] = []
+    for c in q.eq + q.order + q.range + q.cover:
+        if c not in cols and c != "video_id":
+            cols.append(c)
+    if not cols:
+        return None
+    return f"idx_{q.table}_" + "_".join(cols), cols
+
+
+def _existing_prefixes(conn: sqlite3.Connection, table: str) -> List[List[str]]:
+    out = []
+    for idx in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        out.append([r[2] for r in conn.execute(f"PRAGMA index_info({idx[1]})").fetchall()])
+    return out
+
+
+def schema_clone(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Empty in-memory copy of tables, indexes and views (+ sqlite_stat1) for what-if plans."""
+    clone = sqlite3.connect(":memory:")
+    skip_prefix = (FTS_TABLE, "sqlite_")
+    for typ, name, sql in conn.execute(
+            "SELECT type, name, sql FROM main.sqlite_master WHERE sql IS NOT NULL "
+            "AND type IN ('table','index','view') ORDER BY type='view', type='index'"):
+        if name.startswith(skip_prefix) or sql.upper().startswith("CREATE VIRTUAL"):
+            continue
+        clone.execute(sql)
+    if conn.execute("SELECT 1 FROM main.sqlite_master WHERE name='sqlite_stat1'").fetchone():
+        clone.execute("ANALYZE")
+        clone.execute("DELETE FROM sqlite_stat1")
+        clone.executemany("INSERT INTO sqlite_stat1 VALUES (?,?,?)",
+                          conn.execute("SELECT tbl, idx, stat FROM main.sqlite_stat1").fetchall())
+        clone.execute("ANALYZE sqlite_schema")
+    return clone
+
+
+def advise(conn: sqlite3.Connection, clone: sqlite3.Connection, q: HotQuery, sql: str,
+           params: Dict[str, Any], flags: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    sug = suggest_index(q)
+    if sug is None:
+        return None
+    name, cols = sug
+    have = {r[1] for r in conn.execute(f"PRAGMA table_info({q.table})")}
+    missing = [c for c in cols if c not in have]
+    if missing:
+        # e.g. publish_ym on a DB setup_database() has not migrated yet
+        return {"index": name, "columns": cols, "status": "missing_columns", "missing": missing}
+    if any(p[:len(cols)] == cols for p in _existing_prefixes(conn, q.table)):
+        return {"index": name, "columns": cols, "status": "exists"}
+    ddl = f"CREATE INDEX IF NOT EXISTS {name} ON {q.table}({', '.join(cols)})"
+    try:
+        clone.execute(ddl)
+        plan = explain(clone, sql, params)
+    finally:
+        clone.execute(f"DROP INDEX IF EXISTS {name}")
+    used = any(name in d for d in plan)
+    return {"index": name, "columns": cols, "ddl": ddl, "planner_uses": used,
+            "flags_after": len(plan_flags(plan)), "flags_before": len(flags),
+            "status": "suggested" if used else "not_used_by_planner"}
+
+
+# ---------------------------------------------------------------------
+# Audit
+# ---------------------------------------------------------------------
+
+def time_query(conn: sqlite3.Connection, sql: str, params: Dict[str, Any], repeat: int) -> Tuple[float, int]:
+    times: List[float] = []
+    n = 0
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        n = sum(1 for _ in conn.execute(sql, params))
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, n
+
+
+def audit_queries(conn: sqlite3.Connection, repeat: int = 3, timed: bool = True) -> Dict[str, Any]:
+    """EXPLAIN + flags + advice (+ median wall time) for every HOT_QUERIES entry."""
+    have = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table','view')")}
+    probe, fragments, tag_params = probe_params(conn)
+    params = {**probe, **tag_params}
+    clone = schema_clone(conn)
+    row_cache: Dict[str, int] = {}
+    results: List[Dict[str, Any]] = []
+    for q in HOT_QUERIES:
+        entry: Dict[str, Any] = {"name": q.name, "source": q.source}
+        missing = [t for t in q.tables if t not in have]
+        if missing:
+            entry.update(status="skipped", reason=f"missing tables {missing}")
+            results.append(entry)
+            continue
+        sql = q.sql.format(**fragments)
+        try:
+            plan = explain(conn, sql, params)
+            flags = plan_flags(plan)
+            rows = {t: _table_rows(conn, t, row_cache) for t in q.tables}
+            entry.update(status=_severity(q, flags, rows), plan=plan, flags=flags)
+            if entry["status"] != "ok":
+                advice = advise(conn, clone, q, sql, params, flags)
+                if advice:
+                    entry["advice"] = advice
+            if timed:
+                ms, n = time_query(conn, sql, params, repeat)
+                entry.update(median_ms=round(ms, 3), rows=n)
+        except sqlite3.Error as e:
+            entry.update(status="error", error=str(e))
+        results.append(entry)
+    clone.close()
+
+    summary: Dict[str, int] = {}
+    for r in results:
+        summary[r["status"]] = summary.get(r["status"], 0) + 1
+    return {
+        "params": {**probe, "n_probe_ids": N_PROBE_IDS, "n_probe_tags": len(tag_params)},
+        "repeat": repeat if timed else 0,
+        "summary": summary,
+        "suggested_indexes": sorted({r["advice"]["ddl"] for r in results
+                                     if r.get("advice", {}).get("status") == "suggested"}),
+        "queries": results,
+    }
+
+
+def print_audit(report: Dict[str, Any]) -> None:
+    print(f"\n{'query':<28} {'status':<9} {'ms':>9} {'rows':>9}  flags")
+    for r in report["queries"]:
+        ms = f"{r['median_ms']:.1f}" if "median_ms" in r else "-"
+        rows = f"{r['rows']:,}" if "rows" in r else "-"
+        flags = "; ".join(f["detail"] for f in r.get("flags", [])) or r.get("reason", r.get("error", ""))
+        print(f"{r['name']:<28} {r['status']:<9} {ms:>9} {rows:>9}  {flags}")
+        adv = r.get("advice")
+        if adv and adv["status"] == "suggested":
+            print(f"{'':<28} [advice] {adv['ddl']}")
+        elif adv:
+            print(f"{'':<28} [advice] {adv['index']}: {adv['status']}")
+    print(f"[audit] {report['summary']}")
@@ -7,6 +7,8 @@ Sanity-check and profile the SQLite database used in this project. This produces
 1) JSON profile with table schemas, indices, foreign keys, row counts.
 2) A small CSV sample of videos with aggregated tags (for quick EDA sanity).
 3) Console output summarising key findings.
+4) With --audit: EXPLAIN QUERY PLAN audit of the pipeline's hot queries (full
+   scans, temp B-trees, suggested covering indexes, wall time; src/setup/query_audit.py).
 
 Inputs
 ------
@@ -14,19 +16,20 @@ Inputs
 
 Outputs
 -------
-- reports/metrics/v0_db_profile.json
+- reports/metrics/v0_db_profile.json  ("query_audit" section with --audit)
 - reports/metrics/v0_sample_videos.csv
 
 Assumptions
 -----------
-- Schema includes (at least): videos, video_tags, video_categories, category_status, collection_state, audit_terms.
-- `video_tags` has columns (video_id INTEGER, tag TEXT).
-- No `tags` lookup table is required (we aggregate from `video_tags.tag`).
+- Schema includes (at least): videos, tags, categories, video_tag_ids, video_category_ids,
+  category_status, collection_state, audit_terms.
+- `video_tags` / `video_categories` are compatibility views exposing (video_id, tag) /
+  (video_id, category) over the dictionary-encoded link tables.
 
 Failure Modes
 -------------
 - Missing DB file or unreadable path -> exits with non-zero code.
-- Missing expected tables -> records in "schema_diffs" and prints warnings (continues).
+- Missing expected tables/views -> records in "schema_diffs" and prints warnings (continues).
 - Very large DB: only small samples are materialised to CSV to avoid memory issues.
 
 Complexity
@@ -37,15 +40,17 @@ Test Notes
 ----------
 - Run on a small copied DB; verify both artifacts are created.
 - Check JSON "tables" entries and that row counts look plausible.
+- --audit: no "warn" entries expected on a DB created by setup_database().
 """
 
 from __future__ import annotations
 import argparse
 import json
+import sys
 import sqlite3
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 
 from src.utils.config_loader import (
     load_config as load_project_config,
@@ -53,7 +58,10 @@ from src.utils.config_loader import (
     set_global_seed,
     pick_device,
     print_run_header,
+    SqliteReadConfig,
 )
+from src.utils.sqlite_read import connect_readonly
+from src.setup.query_audit import audit_queries, print_audit
 
 @dataclass
 class ColumnInfo:
@@ -80,13 +88,9 @@ class TableProfile:
     indices: List[IndexInfo]
     foreign_keys: List[Dict[str, Any]]
 
-def connect_sqlite(db_path: Path) -> sqlite3.Connection:
-    if not db_path.exists():
-        raise FileNotFoundError(f"Database not found: {db_path}")
-    # Default connection; WAL etc. not required for read-only profiling
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
+def connect_sqlite(db_path: Path, profile: Optional[SqliteReadConfig] = None) -> sqlite3.Connection:
+    # Profiling only reads: shared read-only profile, safe while the collector runs
+    return connect_readonly(db_path, profile)
 
 
 def list_tables(conn: sqlite3.Connection) -> List[str]:
@@ -94,6 +98,11 @@ def list_tables(conn: sqlite3.Connection) -> List[str]:
     return [r["name"] for r in conn.execute(sql).fetchall()]
 
 
+def list_views(conn: sqlite3.Connection) -> List[str]:
+    sql = "SELECT name FROM sqlite_master WHERE type='view' ORDER BY name"
+    return [r["name"] for r in conn.execute(sql).fetchall()]
+
+
 def pragma_table_info(conn: sqlite3.Connection, table: str) -> List[ColumnInfo]:
     rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
     return [ColumnInfo(r[0], r[1], r[2], r[3], r[4], r[5]) for r in rows]
@@ -115,7 +124,7 @@ def count_rows(conn: sqlite3.Connection, table: str) -> int:
 
 def sample_videos_with_tags(conn: sqlite3.Connection, n: int = 100) -> List[Dict[str, Any]]:
     """
-    Aggregate tags directly from video_tags.tag (no separate tags table exists).
+    Aggregate tags through the video_tags view (tag text joined from the dictionary).
     """
     sql = """
     WITH vt AS (
@@ -150,6 +159,10 @@ def main(argv: List[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Profile SQLite DB for equiTAG-RT.")
     parser.add_argument("--db", type=str, default=None, help="Optional path override to SQLite DB.")
     parser.add_argument("--sample_n", type=int, default=100, help="Rows to sample for CSV.")
+    parser.add_argument("--audit", action="store_true",
+                        help="EXPLAIN QUERY PLAN audit + index advice + timings for the hot queries.")
+    parser.add_argument("--audit_repeat", type=int, default=3,
+                        help="Timed runs per audited query (median reported); 0 = plans only.")
     args = parser.parse_args(argv)
 
     cfg = load_project_config()
@@ -165,7 +178,7 @@ def main(argv: List[str] | None = None) -> int:
     print(f"[info] Using DB: {db_path}")
 
     try:
-        conn = connect_sqlite(db_path)
+        conn = connect_sqlite(db_path, cfg.sqlite_read)
     except FileNotFoundError as e:
         print(f"[error] {e}", file=sys.stderr)
         return 2
@@ -174,10 +187,16 @@ def main(argv: List[str] | None = None) -> int:
     tables = list_tables(conn)
     print(f"[info] Found tables: {', '.join(tables)}")
 
-    expected = {"videos", "video_tags", "video_categories", "category_status", "collection_state", "audit_terms"}
+    expected = {"videos", "tags", "categories", "video_tag_ids", "video_category_ids",
+                "category_status", "collection_state", "audit_terms"}
     missing = sorted(list(expected - set(tables)))
     extras = sorted(list(set(tables) - expected))
-    schema_diffs: Dict[str, Any] = {"missing_tables": missing, "extra_tables": extras}
+    views = list_views(conn)
+    missing_views = sorted({"video_tags", "video_categories"} - set(views))
+    schema_diffs: Dict[str, Any] = {"missing_tables": missing, "extra_tables": extras,
+                                    "missing_views": missing_views}
+    if missing_views:
+        print(f"[warn] Missing compatibility views {missing_views} (legacy DB? setup_database() migrates it)")
 
     # 2) Profile each table
     profile: Dict[str, TableProfile] = {}
@@ -203,13 +222,17 @@ def main(argv: List[str] | None = None) -> int:
     else:
         print("[warn] No sample rows produced (empty videos table?).")
 
-    # 4) JSON profile
+    # 4) JSON profile (+ query-plan audit)
     json_out = metrics_dir / "v0_db_profile.json"
     out_payload = {
         "database": str(db_path),
         "tables": to_json_serialisable(profile),
         "schema_diffs": schema_diffs,
     }
+    if args.audit:
+        audit = audit_queries(conn, repeat=args.audit_repeat, timed=args.audit_repeat > 0)
+        print_audit(audit)
+        out_payload["query_audit"] = audit
     with json_out.open("w", encoding="utf-8") as f:
         json.dump(out_payload, f, indent=2)
     print(f"[ok] Wrote DB profile JSON → {json_out}")
@@ -224,12 +247,12 @@ def main(argv: List[str] | None = None) -> int:
     else:
         print("[ok] Recommended video indices present.")
 
-    #    (b) foreign key from video_tags.video_id -> videos.video_id?
-    fks_tags = profile.get("video_tags")
+    #    (b) foreign keys from video_tag_ids -> videos / tags?
+    fks_tags = profile.get("video_tag_ids")
     if fks_tags and fks_tags.foreign_keys:
-        print("[ok] video_tags has foreign key references configured.")
+        print("[ok] video_tag_ids has foreign key references configured.")
     else:
-        print("[warn] No foreign key references found on video_tags (not critical for reads).")
+        print("[warn] No foreign key references found on video_tag_ids (not critical for reads).")
 
     print("[done] Database verification complete.")
     return 0
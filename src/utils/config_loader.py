@@ -18,6 +18,8 @@ replicability and logging consistent across the project.
 Inputs
 ------
 - config/config.yaml (required): contains project_name, random_seed, and paths.*
+  Optional `sqlite_read` section: read-only connection profile used by the
+  analysis/modeling scripts (see src/utils/sqlite_read.py).
 
 Outputs
 -------
@@ -32,6 +34,7 @@ Failure Modes
 -------------
 - Missing YAML -> raises FileNotFoundError.
 - Malformed YAML -> raises yaml.YAMLError.
+- Invalid sqlite_read.temp_store -> raises ValueError.
 
 Complexity
 ----------
@@ -48,7 +51,7 @@ import argparse
 import os
 import random
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
@@ -87,15 +90,30 @@ class ProjectPaths:
     figures: Path
     metrics: Path
     database: Path
+    snapshot: Path
+    db_snapshots: Path
     config_dir: Path
     config_file: Path
 
 
+@dataclass(frozen=True)
+class SqliteReadConfig:
+    read_only: bool = True
+    query_only: bool = True
+    cache_size_mb: int = 256
+    mmap_size_mb: Optional[int] = None   # None = auto (DB file size, capped at mmap_max_mb)
+    mmap_max_mb: int = 4096
+    temp_store: str = "memory"
+    busy_timeout_ms: int = 5000
+    use_snapshot: bool = False           # analysis reads the LATEST DB snapshot (src/utils/db_snapshot.py)
+
+
 @dataclass(frozen=True)
 class ProjectConfig:
     project_name: str
     random_seed: int
     paths: ProjectPaths
+    sqlite_read: SqliteReadConfig = field(default_factory=SqliteReadConfig)
 
 
 def _read_yaml(path: Path) -> Dict[str, Any]:
@@ -105,6 +123,25 @@ def _read_yaml(path: Path) -> Dict[str, Any]:
         return yaml.safe_load(f)
 
 
+def _sqlite_read_config(raw: Optional[Dict[str, Any]]) -> SqliteReadConfig:
+    raw = raw or {}
+    d = SqliteReadConfig()
+    mmap = raw.get("mmap_size_mb", "auto")
+    temp_store = str(raw.get("temp_store", d.temp_store)).lower()
+    if temp_store not in ("memory", "file", "default"):
+        raise ValueError(f"sqlite_read.temp_store must be memory|file|default, got {temp_store!r}")
+    return SqliteReadConfig(
+        read_only=bool(raw.get("read_only", d.read_only)),
+        query_only=bool(raw.get("query_only", d.query_only)),
+        cache_size_mb=int(raw.get("cache_size_mb", d.cache_size_mb)),
+        mmap_size_mb=None if mmap is None or str(mmap).lower() == "auto" else int(mmap),
+        mmap_max_mb=int(raw.get("mmap_max_mb", d.mmap_max_mb)),
+        temp_store=temp_store,
+        busy_timeout_ms=int(raw.get("busy_timeout_ms", d.busy_timeout_ms)),
+        use_snapshot=bool(raw.get("use_snapshot", d.use_snapshot)),
+    )
+
+
 def load_config(config_path: Optional[Path] = None) -> ProjectConfig:
     """
     Load YAML config and return a typed ProjectConfig.
@@ -134,6 +171,8 @@ def load_config(config_path: Optional[Path] = None) -> ProjectConfig:
     figures = _p("figures", "reports/figures")
     metrics = _p("metrics", "reports/metrics")
     database = _p("database", "data/redtube_videos.db")
+    snapshot = _p("snapshot", "data/snapshot")   # Parquet corpus snapshot (src/utils/parquet_snapshot.py)
+    db_snapshots = _p("db_snapshots", "data/db_snapshots")   # read-only DB copies (src/utils/db_snapshot.py)
     config_dir = DEFAULT_CONFIG_FILE.parent
 
     paths = ProjectPaths(
@@ -143,10 +182,13 @@ def load_config(config_path: Optional[Path] = None) -> ProjectConfig:
         figures=figures,
         metrics=metrics,
         database=database,
+        snapshot=snapshot,
+        db_snapshots=db_snapshots,
         config_dir=config_dir,
         config_file=cfg_path,
     )
-    return ProjectConfig(project_name=project_name, random_seed=seed, paths=paths)
+    return ProjectConfig(project_name=project_name, random_seed=seed, paths=paths,
+                         sqlite_read=_sqlite_read_config(raw.get("sqlite_read")))
 
 
 def ensure_directories(paths: ProjectPaths) -> None:
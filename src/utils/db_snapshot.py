@@ -0,0 +1,315 @@
+"""
+src/utils/db_snapshot.py
+
+Purpose
+-------
+Consistent, compact read-only copies of the live collector DB for analysis.
+Long analysis runs on the live WAL database see rows change mid-run, and
+their read transactions stop WAL checkpoints from completing, so the -wal
+file keeps growing. A snapshot is taken once and analysed as often as needed:
+
+- VACUUM INTO (default) or the online backup API (Connection.backup, then
+  VACUUM on the copy) from a mode=ro connection: one consistent read
+  transaction, never a write lock on the live DB.
+- The copy is finished for read-only use: video_docs backfilled (so
+  ensure_video_docs never needs its TEMP fallback), ANALYZE for the planner,
+  rollback journal (no -wal/-shm next to a read-only file), chmod 0444.
+- Content fingerprint: SHA-256 over the rows of the collected tables
+  (videos, tags, categories and the two link tables) in key order. Derived
+  tables (video_docs, FTS, stats) and collector bookkeeping are excluded, so
+  equal fingerprints mean equal data. An unchanged DB is not snapshotted twice.
+- Layout: <dir>/<db stem>_<UTC stamp>_<fp12>.db + .json manifest, a LATEST
+  pointer (replaced atomically), and the newest `keep` snapshots retained.
+
+Analysis entry points call analysis_db_path(cfg): with sqlite_read.use_snapshot
+they read the LATEST snapshot, otherwise (or when none exists) the live DB.
+
+Inputs
+------
+- config.yaml: paths.database, paths.db_snapshots, sqlite_read.use_snapshot.
+
+Outputs
+-------
+- Snapshot files, manifests and LATEST under paths.db_snapshots.
+
+Assumptions
+-----------
+- Enough free disk for one compacted copy (VACUUM INTO writes no journal).
+
+Failure Modes
+-------------
+- Missing source DB -> FileNotFoundError.
+- Failure mid-copy -> the .partial file is removed; LATEST still points at
+  the previous snapshot.
+- LATEST naming a file that no longer exists -> latest_snapshot() returns None
+  and analysis falls back to the live DB with a warning.
+
+Complexity
+----------
+- Copy: O(DB pages). Fingerprint: one ordered pass over the collected tables.
+
+Test Notes
+----------
+- python -m src.utils.db_snapshot            (take a snapshot)
+- python -m src.utils.db_snapshot --list
+- Set sqlite_read.use_snapshot: true and run 00_full_eda; the header names the snapshot.
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from src.utils.config_loader import ProjectConfig, load_config
+from src.utils.video_docs import backfill_video_docs
+
+LATEST = "LATEST"
+DEFAULT_KEEP = 3
+METHODS = ("vacuum", "backup")
+
+# Collected content, hashed in key order (derived / bookkeeping tables excluded)
+FINGERPRINT_TABLES = [
+    ("videos", "video_id"),
+    ("tags", "tag_id"),
+    ("categories", "category_id"),
+    ("video_tag_ids", "video_id, tag_id"),
+    ("video_category_ids", "video_id, category_id"),
+]
+
+_FETCH = 10_000
+
+
+def _utc_stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _connect_source(db_path: Path) -> sqlite3.Connection:
+    # Plain mode=ro: VACUUM INTO is refused under PRAGMA query_only
+    if not db_path.exists():
+        raise FileNotFoundError(f"Database not found: {db_path}")
+    conn = sqlite3.connect(f"file:{quote(str(db_path.resolve()))}?mode=ro", uri=True)
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def content_fingerprint(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """SHA-256 over the collected tables' rows (key order) plus per-table row counts."""
+    have = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    h = hashlib.sha256()
+    rows: Dict[str, int] = {}
+    for table, key in FINGERPRINT_TABLES:
+        if table not in have:
+            continue
+        h.update(f"\x00{table}\x00".encode())
+        n = 0
+        cur = conn.execute(f"SELECT * FROM {table} ORDER BY {key}")
+        while True:
+            chunk = cur.fetchmany(_FETCH)
+            if not chunk:
+                break
+            h.update(repr(chunk).encode("utf-8", "surrogatepass"))
+            n += len(chunk)
+        rows[table] = n
+    return {"sha256": h.hexdigest(), "rows": rows}
+
+
+# ---------------------------------------------------------------------
+# Snapshot directory
+# ---------------------------------------------------------------------
+
+def read_manifest(snap: Path) -> Dict[str, Any]:
+    p = snap.with_suffix(".json")
+    if not p.exists():
+        return {}
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def list_snapshots(snap_dir: Path) -> List[Path]:
+    """Snapshot files, oldest first (manifest write time; names only resolve to the second)."""
+    if not snap_dir.exists():
+        return []
+    snaps = [p for p in snap_dir.glob("*.db") if p.with_suffix(".json").exists()]
+    return sorted(snaps, key=lambda p: (p.with_suffix(".json").stat().st_mtime_ns, p.name))
+
+
+def latest_snapshot(snap_dir: Path) -> Optional[Path]:
+    ptr = snap_dir / LATEST
+    if not ptr.exists():
+        return None
+    snap = snap_dir / ptr.read_text(encoding="utf-8").strip()
+    return snap if snap.exists() else None
+
+
+def _set_latest(snap_dir: Path, snap: Path) -> None:
+    tmp = snap_dir / f".{LATEST}.tmp"
+    tmp.write_text(snap.name + "\n", encoding="utf-8")
+    os.replace(tmp, snap_dir / LATEST)
+
+
+def prune_snapshots(snap_dir: Path, keep: int) -> List[Path]:
+    """Delete all but the newest `keep` snapshots (never the LATEST one)."""
+    latest = latest_snapshot(snap_dir)
+    snaps = list_snapshots(snap_dir)
+    removed = []
+    for snap in snaps[:max(0, len(snaps) - max(1, keep))]:
+        if snap == latest:
+            continue
+        snap.chmod(0o644)
+        snap.unlink()
+        snap.with_suffix(".json").unlink(missing_ok=True)
+        removed.append(snap)
+    return removed
+
+
+# ---------------------------------------------------------------------
+# Create
+# ---------------------------------------------------------------------
+
+def _copy(src: sqlite3.Connection, dst_path: Path, method: str) -> None:
+    if method == "vacuum":
+        src.execute("VACUUM INTO ?", (str(dst_path),))
+        return
+    dst = sqlite3.connect(str(dst_path))
+    try:
+        src.backup(dst)            # one step: a single consistent read of the source
+        dst.execute("VACUUM")      # page copy keeps free pages / fragmentation
+    finally:
+        dst.close()
+
+
+def _finish(dst_path: Path) -> Dict[str, Any]:
+    """Make the copy self-sufficient for read-only analysis; returns its fingerprint."""
+    conn = sqlite3.connect(str(dst_path))
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        docs = 0
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name='videos'").fetchone():
+            docs = backfill_video_docs(conn)   # creates the table if needed; only missing rows
+        conn.execute("ANALYZE")
+        conn.commit()
+        fp = content_fingerprint(conn)
+        fp["docs_backfilled"] = docs
+        return fp
+    finally:
+        conn.close()
+
+
+def create_snapshot(db_path: Path, snap_dir: Path, method: str = "vacuum", keep: int = DEFAULT_KEEP,
+                    force: bool = False) -> Path:
+    """Snapshot `db_path` into `snap_dir`; returns the new (or unchanged LATEST) snapshot path."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    db_path = Path(db_path)
+    snap_dir.mkdir(parents=True, exist_ok=True)
+    stamp = _utc_stamp()
+    partial = snap_dir / f".{db_path.stem}_{stamp}.partial"
+
+    t0 = time.perf_counter()
+    src = _connect_source(db_path)
+    try:
+        _copy(src, partial, method)
+        fp = _finish(partial)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    finally:
+        src.close()
+    elapsed = time.perf_counter() - t0
+
+    prev = latest_snapshot(snap_dir)
+    if prev is not None and not force and read_manifest(prev).get("fingerprint") == fp["sha256"]:
+        partial.unlink()
+        print(f"[skip] Content unchanged since {prev.name}; LATEST kept")
+        return prev
+
+    snap = snap_dir / f"{db_path.stem}_{stamp}_{fp['sha256'][:12]}.db"
+    if snap.exists():
+        partial.unlink()           # --force within the same second: identical content already there
+    else:
+        os.replace(partial, snap)
+        snap.chmod(0o444)
+    src_bytes = db_path.stat().st_size
+    wal = db_path.with_name(db_path.name + "-wal")
+    manifest = {
+        "snapshot": snap.name,
+        "source": str(db_path.resolve()),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "method": method,
+        "fingerprint": fp["sha256"],
+        "rows": fp["rows"],
+        "docs_backfilled": fp["docs_backfilled"],
+        "bytes": snap.stat().st_size,
+        "source_bytes": src_bytes,
+        "source_wal_bytes": wal.stat().st_size if wal.exists() else 0,
+        "seconds": round(elapsed, 2),
+    }
+    snap.with_suffix(".json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    _set_latest(snap_dir, snap)
+    for old in prune_snapshots(snap_dir, keep):
+        print(f"[prune] Removed {old.name}")
+    print(f"[ok] Snapshot {snap.name}: {manifest['bytes'] / 2**20:.1f} MiB "
+          f"(source {src_bytes / 2**20:.1f} MiB + WAL {manifest['source_wal_bytes'] / 2**20:.1f} MiB) "
+          f"in {elapsed:.1f}s")
+    return snap
+
+
+# ---------------------------------------------------------------------
+# Analysis entry points
+# ---------------------------------------------------------------------
+
+def analysis_db_path(cfg: ProjectConfig) -> Path:
+    """DB the analysis scripts should read: LATEST snapshot if enabled and present, else the live DB."""
+    if not cfg.sqlite_read.use_snapshot:
+        return cfg.paths.database
+    snap = latest_snapshot(cfg.paths.db_snapshots)
+    if snap is None:
+        print(f"[warn] sqlite_read.use_snapshot is set but {cfg.paths.db_snapshots} has no snapshot; "
+              f"reading the live DB (python -m src.utils.db_snapshot)")
+        return cfg.paths.database
+    m = read_manifest(snap)
+    print(f"[snapshot] Reading DB snapshot {snap.name} (created {m.get('created_at', '?')}, "
+          f"fingerprint {str(m.get('fingerprint', '?'))[:12]})")
+    return snap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    cfg = load_config()
+    ap = argparse.ArgumentParser(description="Consistent read-only snapshot of the collector DB for analysis.")
+    ap.add_argument("--db", type=str, default=str(cfg.paths.database), help="Live SQLite DB (opened read-only).")
+    ap.add_argument("--out", type=str, default=str(cfg.paths.db_snapshots), help="Snapshot directory.")
+    ap.add_argument("--method", choices=METHODS, default="vacuum",
+                    help="vacuum = VACUUM INTO; backup = online backup API + VACUUM on the copy.")
+    ap.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="Snapshots to retain.")
+    ap.add_argument("--force", action="store_true", help="Snapshot even if the content fingerprint is unchanged.")
+    ap.add_argument("--list", action="store_true", help="List snapshots and exit.")
+    args = ap.parse_args(argv)
+
+    snap_dir = Path(args.out)
+    if args.list:
+        latest = latest_snapshot(snap_dir)
+        for snap in list_snapshots(snap_dir):
+            m = read_manifest(snap)
+            mark = "*" if snap == latest else " "
+            print(f"{mark} {snap.name}  {m.get('created_at', '?')}  {m.get('bytes', 0) / 2**20:8.1f} MiB  "
+                  f"videos={m.get('rows', {}).get('videos', '?')}  {m.get('method', '?')}")
+        return 0
+    try:
+        create_snapshot(Path(args.db), snap_dir, method=args.method, keep=args.keep, force=args.force)
+    except FileNotFoundError as e:
+        print(f"[error] {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
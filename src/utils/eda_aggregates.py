@@ -0,0 +1,393 @@
+"""
+src/utils/eda_aggregates.py
+
+Purpose
+-------
+Summary tables for the EDA that the write path keeps current, so
+00_full_eda.py no longer runs full-table GROUP BY scans on every run:
+
+    agg_profile(id=1, n_all, n_active, duration/views/rating sums + non-NULL counts, ratings_sum)
+    agg_tag_counts(tag_id PK, n)              -- links per tag (video_tag_ids)
+    agg_category_counts(category_id PK, n)    -- links per category (video_category_ids)
+    agg_monthly(publish_ym PK, n, rating/views sums + non-NULL counts)   -- is_active=1 only
+    agg_monthly_views(publish_ym, bucket, n)  -- views histogram per month (approximate median)
+
+- Maintained by AFTER INSERT/DELETE/UPDATE triggers on videos and the two
+  link tables (counter rows are seeded when a tag/category enters its dictionary), so every writer (collector pages, replay, refresh sweeper,
+  cascade deletes) updates them inside its own transaction. Each trigger adds
+  the NEW row and subtracts the OLD one; no-op UPSERT updates (the collector
+  re-writing an unchanged video) are skipped by the trigger WHEN clause.
+- Views buckets keep two significant digits: values < 100 are exact, larger
+  ones map to digits*100 + leading two digits (e.g. 12345 -> 512, i.e.
+  12000..12999). The median is interpolated inside its bucket: <= ~10% error
+  in the worst bucket (10xxx), ~1% near 99xxx.
+- ensure_eda_aggregates(conn) creates tables + triggers and backfills them in
+  one transaction (create_tables and the collector start-up call it); it is a
+  no-op once built.
+
+Inputs
+------
+- An open sqlite3 connection to the project DB (publish_ym must exist, i.e.
+  after migrate_publish_columns).
+
+Outputs
+-------
+- The agg_* tables above; read_profile / read_top_tags / read_top_categories /
+  read_monthly return rows shaped like the EDA's scan queries.
+
+Assumptions
+-----------
+- views / duration / ratings are integers (column affinity); rating is REAL.
+
+Failure Modes
+-------------
+- DB not migrated or read-only without the tables -> aggregates_ready() is
+  False and the EDA falls back to its scan queries.
+- REAL rating sums are updated by add/subtract and can drift by float
+  rounding over many updates; `--rebuild` recomputes them exactly.
+
+Complexity
+----------
+- Write path: O(1) extra statements per inserted/updated video and per link row
+  (src.collect.bench_ingest --no_aggregates measures the difference).
+- Reads: O(#tags) / O(#categories) / O(#months * buckets), independent of #videos.
+- Backfill: one pass per table (same cost as one EDA scan).
+
+Test Notes
+----------
+- `python -m src.utils.eda_aggregates --db data/redtube_videos.db --check`
+  compares every aggregate with its full scan.
+"""
+
+from __future__ import annotations
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+AGG_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS agg_profile (
+    id            INTEGER PRIMARY KEY CHECK (id = 1),
+    n_all         INTEGER NOT NULL DEFAULT 0,
+    n_active      INTEGER NOT NULL DEFAULT 0,
+    duration_sum  INTEGER NOT NULL DEFAULT 0,
+    duration_n    INTEGER NOT NULL DEFAULT 0,
+    views_sum     INTEGER NOT NULL DEFAULT 0,
+    views_n       INTEGER NOT NULL DEFAULT 0,
+    rating_sum    REAL    NOT NULL DEFAULT 0,
+    rating_n      INTEGER NOT NULL DEFAULT 0,
+    ratings_sum   INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_tag_counts (
+    tag_id  INTEGER PRIMARY KEY,
+    n       INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_category_counts (
+    category_id INTEGER PRIMARY KEY,
+    n           INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_monthly (
+    publish_ym  INTEGER PRIMARY KEY,     -- YYYYMM, active videos only
+    n           INTEGER NOT NULL DEFAULT 0,
+    rating_sum  REAL    NOT NULL DEFAULT 0,
+    rating_n    INTEGER NOT NULL DEFAULT 0,
+    views_sum   INTEGER NOT NULL DEFAULT 0,
+    views_n     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_monthly_views (
+    publish_ym  INTEGER NOT NULL,
+    bucket      INTEGER NOT NULL,        -- see views_bucket_sql
+    n           INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (publish_ym, bucket)
+) WITHOUT ROWID;
+"""
+
+AGG_TABLES = ("agg_profile", "agg_tag_counts", "agg_category_counts", "agg_monthly", "agg_monthly_views")
+
+_VIDEO_COLS = ("duration", "views", "rating", "ratings", "is_active", "publish_ym")
+
+
+def views_bucket_sql(col: str) -> str:
+    """SQL: histogram bucket of an integer views value (exact below 100, else digits*100 + leading 2 digits)."""
+    v = f"CAST({col} AS INTEGER)"
+    return (f"CASE WHEN {v} < 100 THEN {v} "
+            f"ELSE LENGTH(CAST({v} AS TEXT)) * 100 + CAST(SUBSTR(CAST({v} AS TEXT), 1, 2) AS INTEGER) END")
+
+
+def bucket_bounds(bucket: int) -> Tuple[float, float]:
+    """(lowest value, width) of a views bucket; width 0 for the exact buckets."""
+    if bucket < 100:
+        return float(bucket), 0.0
+    digits, lead = divmod(bucket, 100)
+    width = 10.0 ** (digits - 2)
+    return lead * width, width
+
+
+def _video_delta(r: str, sign: str) -> str:
+    """Statements adding (sign '+') or removing (sign '-') video row `r` (NEW/OLD) from the aggregates."""
+    active = f"{r}.is_active IS 1 AND {r}.publish_ym IS NOT NULL"
+    return f"""
+    UPDATE agg_profile SET
+        n_all = n_all {sign} 1,
+        n_active = n_active {sign} ({r}.is_active IS 1),
+        duration_sum = duration_sum {sign} COALESCE({r}.duration, 0),
+        duration_n = duration_n {sign} ({r}.duration IS NOT NULL),
+        views_sum = views_sum {sign} COALESCE({r}.views, 0),
+        views_n = views_n {sign} ({r}.views IS NOT NULL),
+        rating_sum = rating_sum {sign} COALESCE({r}.rating, 0),
+        rating_n = rating_n {sign} ({r}.rating IS NOT NULL),
+        ratings_sum = ratings_sum {sign} COALESCE({r}.ratings, 0)
+    WHERE id = 1;
+    INSERT INTO agg_monthly(publish_ym, n, rating_sum, rating_n, views_sum, views_n)
+        SELECT {r}.publish_ym, {sign}1, {sign}COALESCE({r}.rating, 0), {sign}({r}.rating IS NOT NULL),
+               {sign}COALESCE({r}.views, 0), {sign}({r}.views IS NOT NULL)
+        WHERE {active}
+    ON CONFLICT(publish_ym) DO UPDATE SET
+        n = n + excluded.n,
+        rating_sum = rating_sum + excluded.rating_sum,
+        rating_n = rating_n + excluded.rating_n,
+        views_sum = views_sum + excluded.views_sum,
+        views_n = views_n + excluded.views_n;
+    INSERT INTO agg_monthly_views(publish_ym, bucket, n)
+        SELECT {r}.publish_ym, {views_bucket_sql(f"{r}.views")}, {sign}1
+        WHERE {active} AND {r}.views IS NOT NULL
+    ON CONFLICT(publish_ym, bucket) DO UPDATE SET n = n + excluded.n;"""
+
+
+def _link_delta(table: str, key: str, r: str, sign: str) -> str:
+    # Counter rows are seeded per dictionary entry, so a plain UPDATE suffices
+    # (several times cheaper than an UPSERT on the ~10 links per video)
+    return f"""
+    UPDATE {table} SET n = n {sign} 1 WHERE {key} = {r}.{key};"""
+
+
+_LINKS = (("video_tag_ids", "tags", "agg_tag_counts", "tag_id"),
+          ("video_category_ids", "categories", "agg_category_counts", "category_id"))
+
+
+def _triggers_sql() -> str:
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in _VIDEO_COLS)
+    parts = [
+        f"CREATE TRIGGER IF NOT EXISTS agg_videos_ai AFTER INSERT ON videos BEGIN{_video_delta('NEW', '+')}\nEND;",
+        f"CREATE TRIGGER IF NOT EXISTS agg_videos_ad AFTER DELETE ON videos BEGIN{_video_delta('OLD', '-')}\nEND;",
+        f"CREATE TRIGGER IF NOT EXISTS agg_videos_au AFTER UPDATE OF {', '.join(_VIDEO_COLS)} ON videos\n"
+        f"WHEN {changed} BEGIN{_video_delta('OLD', '-')}{_video_delta('NEW', '+')}\nEND;",
+    ]
+    for link, dictionary, table, key in _LINKS:
+        parts.append(f"CREATE TRIGGER IF NOT EXISTS agg_{dictionary}_ai AFTER INSERT ON {dictionary} BEGIN\n"
+                     f"    INSERT OR IGNORE INTO {table}({key}, n) VALUES (NEW.{key}, 0);\nEND;")
+        parts.append(f"CREATE TRIGGER IF NOT EXISTS agg_{link}_ai AFTER INSERT ON {link} BEGIN"
+                     f"{_link_delta(table, key, 'NEW', '+')}\nEND;")
+        parts.append(f"CREATE TRIGGER IF NOT EXISTS agg_{link}_ad AFTER DELETE ON {link} BEGIN"
+                     f"{_link_delta(table, key, 'OLD', '-')}\nEND;")
+        parts.append(f"CREATE TRIGGER IF NOT EXISTS agg_{link}_au AFTER UPDATE OF {key} ON {link} BEGIN"
+                     f"{_link_delta(table, key, 'OLD', '-')}{_link_delta(table, key, 'NEW', '+')}\nEND;")
+    return "\n".join(parts)
+
+
+AGG_TRIGGERS_SQL = _triggers_sql()
+
+_PROFILE_SCAN_SQL = """
+    SELECT 1, COUNT(*), COALESCE(SUM(is_active IS 1), 0),
+           COALESCE(SUM(duration), 0), COUNT(duration),
+           COALESCE(SUM(views), 0), COUNT(views),
+           TOTAL(rating), COUNT(rating),
+           COALESCE(SUM(ratings), 0)
+    FROM videos
+"""
+
+_BACKFILL_SQL = f"""
+    DELETE FROM agg_profile;
+    DELETE FROM agg_tag_counts;
+    DELETE FROM agg_category_counts;
+    DELETE FROM agg_monthly;
+    DELETE FROM agg_monthly_views;
+    INSERT INTO agg_profile {_PROFILE_SCAN_SQL};
+    INSERT INTO agg_tag_counts(tag_id, n)
+        SELECT t.tag_id, COALESCE(l.n, 0) FROM tags t
+        LEFT JOIN (SELECT tag_id, COUNT(*) AS n FROM video_tag_ids GROUP BY tag_id) l ON l.tag_id = t.tag_id;
+    INSERT INTO agg_category_counts(category_id, n)
+        SELECT c.category_id, COALESCE(l.n, 0) FROM categories c
+        LEFT JOIN (SELECT category_id, COUNT(*) AS n FROM video_category_ids GROUP BY category_id) l
+            ON l.category_id = c.category_id;
+    INSERT INTO agg_monthly(publish_ym, n, rating_sum, rating_n, views_sum, views_n)
+        SELECT publish_ym, COUNT(*), TOTAL(rating), COUNT(rating), COALESCE(SUM(views), 0), COUNT(views)
+        FROM videos WHERE is_active IS 1 AND publish_ym IS NOT NULL
+        GROUP BY publish_ym;
+    INSERT INTO agg_monthly_views(publish_ym, bucket, n)
+        SELECT publish_ym, {views_bucket_sql("views")} AS b, COUNT(*)
+        FROM videos WHERE is_active IS 1 AND publish_ym IS NOT NULL AND views IS NOT NULL
+        GROUP BY publish_ym, b;
+"""
+
+
+def aggregates_ready(conn: sqlite3.Connection) -> bool:
+    """True if the aggregate tables exist and have been backfilled (readable on mode=ro connections)."""
+    names = {r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'agg\\_%' ESCAPE '\\'")}
+    if not set(AGG_TABLES) <= names or "agg_videos_ai" not in names:
+        return False
+    return conn.execute("SELECT 1 FROM agg_profile WHERE id = 1").fetchone() is not None
+
+
+def build_eda_aggregates(conn: sqlite3.Connection) -> None:
+    """Create tables + triggers and (re)compute every aggregate in one write transaction."""
+    try:
+        conn.executescript("BEGIN IMMEDIATE;\n" + AGG_TABLES_SQL + AGG_TRIGGERS_SQL + _BACKFILL_SQL + "\nCOMMIT;")
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+def ensure_eda_aggregates(conn: sqlite3.Connection) -> bool:
+    """
+    One-time backfill: build the aggregates if they are missing. Returns True
+    if a build ran; no-op once built or before migrate_publish_columns.
+    """
+    have = {r[1] for r in conn.execute("PRAGMA table_info(videos)")}
+    if "publish_ym" not in have or aggregates_ready(conn):
+        return False
+    build_eda_aggregates(conn)
+    n = conn.execute("SELECT n_all FROM agg_profile WHERE id = 1").fetchone()[0]
+    print(f"Built EDA aggregate tables over {n:,} videos (trigger-maintained from now on).")
+    return True
+
+
+# ------------------------------ reads ---------------------------------
+
+def read_profile(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Same keys as 00_full_eda.dataset_profile."""
+    r = conn.execute("SELECT * FROM agg_profile WHERE id = 1").fetchone()
+    (_, n_all, n_active, dur_sum, dur_n, v_sum, v_n, r_sum, r_n, ratings_sum) = tuple(r)
+    return {
+        "n_all": int(n_all),
+        "n_active": int(n_active),
+        "duration_mean": float(dur_sum / dur_n) if dur_n else 0.0,
+        "views_mean": float(v_sum / v_n) if v_n else 0.0,
+        "rating_mean": float(r_sum / r_n) if r_n else 0.0,
+        "ratings_votes": int(ratings_sum),
+    }
+
+
+def read_top_tags(conn: sqlite3.Connection, top_k: int, min_count: int) -> List[sqlite3.Row]:
+    return conn.execute("""
+        SELECT t.tag AS name, a.n AS c
+        FROM agg_tag_counts a JOIN tags t ON t.tag_id = a.tag_id
+        WHERE a.n >= MAX(?, 1)
+        ORDER BY c DESC
+        LIMIT ?
+    """, (int(min_count), int(top_k))).fetchall()
+
+
+def read_top_categories(conn: sqlite3.Connection, top_k: int) -> List[sqlite3.Row]:
+    return conn.execute("""
+        SELECT c.category AS name, a.n AS c
+        FROM agg_category_counts a JOIN categories c ON c.category_id = a.category_id
+        WHERE a.n > 0
+        ORDER BY a.n DESC
+        LIMIT ?
+    """, (int(top_k),)).fetchall()
+
+
+def _hist_median(buckets: List[Tuple[int, int]]) -> Optional[float]:
+    """Median of a (bucket, count) histogram sorted by bucket; interpolates inside the bucket."""
+    total = sum(c for _, c in buckets)
+    if total <= 0:
+        return None
+
+    def value_at(rank: int) -> float:
+        seen = 0
+        for b, c in buckets:
+            if c <= 0:
+                continue
+            if rank < seen + c:
+                lo, width = bucket_bounds(b)
+                return lo + width * (rank - seen + 0.5) / c
+            seen += c
+        lo, _ = bucket_bounds(buckets[-1][0])
+        return lo
+
+    return (value_at((total - 1) // 2) + value_at(total // 2)) / 2.0
+
+
+def read_monthly(conn: sqlite3.Connection) -> List[Dict]:
+    """Rows shaped like monthly_trends' scan (ym, n, rating_mean, views_mean, views_median)."""
+    hist: Dict[int, List[Tuple[int, int]]] = {}
+    for ym, b, c in conn.execute("SELECT publish_ym, bucket, n FROM agg_monthly_views WHERE n > 0 ORDER BY publish_ym, bucket"):
+        hist.setdefault(ym, []).append((b, c))
+    out = []
+    for ym, n, r_sum, r_n, v_sum, v_n in conn.execute("""
+        SELECT publish_ym, n, rating_sum, rating_n, views_sum, views_n
+        FROM agg_monthly WHERE n > 0 ORDER BY publish_ym
+    """):
+        out.append({
+            "ym": f"{ym // 100:04d}-{ym % 100:02d}",
+            "n": int(n),
+            "rating_mean": (r_sum / r_n) if r_n else None,
+            "views_mean": (v_sum / v_n) if v_n else None,
+            "views_median": _hist_median(hist.get(ym, [])),
+        })
+    return out
+
+
+# ------------------------------ check / CLI ---------------------------------
+
+def check_aggregates(conn: sqlite3.Connection) -> List[str]:
+    """Compare every aggregate with its full scan; returns mismatch descriptions (empty = consistent)."""
+    problems: List[str] = []
+    expect = conn.execute(_PROFILE_SCAN_SQL).fetchone()
+    got = conn.execute("SELECT * FROM agg_profile WHERE id = 1").fetchone()
+    for name, e, g in zip(("n_all", "n_active", "duration_sum", "duration_n", "views_sum", "views_n",
+                           "rating_sum", "rating_n", "ratings_sum"), tuple(expect)[1:], tuple(got)[1:]):
+        if abs(float(e) - float(g)) > 1e-6 * max(1.0, abs(float(e))):
+            problems.append(f"agg_profile.{name}: {g} != {e}")
+    pairs = [
+        ("agg_tag_counts", "SELECT tag_id, COUNT(*) FROM video_tag_ids GROUP BY tag_id",
+         "SELECT tag_id, n FROM agg_tag_counts WHERE n != 0"),
+        ("agg_category_counts", "SELECT category_id, COUNT(*) FROM video_category_ids GROUP BY category_id",
+         "SELECT category_id, n FROM agg_category_counts WHERE n != 0"),
+        ("agg_monthly", """SELECT publish_ym, COUNT(*), COUNT(rating), COALESCE(SUM(views), 0), COUNT(views)
+                           FROM videos WHERE is_active IS 1 AND publish_ym IS NOT NULL GROUP BY publish_ym""",
+         "SELECT publish_ym, n, rating_n, views_sum, views_n FROM agg_monthly WHERE n != 0"),
+        ("agg_monthly_views", f"""SELECT publish_ym, {views_bucket_sql("views")} AS b, COUNT(*) FROM videos
+                                  WHERE is_active IS 1 AND publish_ym IS NOT NULL AND views IS NOT NULL
+                                  GROUP BY publish_ym, b""",
+         "SELECT publish_ym, bucket, n FROM agg_monthly_views WHERE n != 0"),
+    ]
+    for name, scan, agg in pairs:
+        want = {tuple(r) for r in conn.execute(scan)}
+        have = {tuple(r) for r in conn.execute(agg)}
+        if want != have:
+            problems.append(f"{name}: {len(want - have)} rows missing/stale, {len(have - want)} unexpected")
+    return problems
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Build, rebuild or check the trigger-maintained EDA aggregate tables.")
+    ap.add_argument("--db", type=str, required=True, help="Path to the SQLite DB.")
+    ap.add_argument("--rebuild", action="store_true", help="Recompute every aggregate from the base tables.")
+    ap.add_argument("--check", action="store_true", help="Compare the aggregates with full scans (read-only).")
+    args = ap.parse_args(argv)
+    conn = sqlite3.connect(str(Path(args.db)))
+    try:
+        if args.check:
+            if not aggregates_ready(conn):
+                print("[warn] aggregates not built; run without --check first")
+                return 1
+            problems = check_aggregates(conn)
+            for p in problems:
+                print(f"[drift] {p}")
+            print("[ok] aggregates match full scans" if not problems else f"[fail] {len(problems)} mismatches")
+            return 1 if problems else 0
+        if args.rebuild:
+            build_eda_aggregates(conn)
+            print("[ok] EDA aggregates rebuilt")
+        elif not ensure_eda_aggregates(conn):
+            print("[ok] EDA aggregates already built")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,325 @@
+"""
+src/utils/lexicon_fts.py
+
+Purpose
+-------
+FTS5 prefilter for protected-lexicon matching. Membership used to run every
+compiled pattern against every title and tag string in Python, although most
+videos match nothing in most namespaces. This module:
+
+- Builds `video_docs_fts`, an external-content FTS5 index over
+  video_docs(title, tags_text), kept in sync by triggers on video_docs
+  (so the collector's refresh_video_docs maintains it without code changes).
+- Turns lexicon terms into MATCH expressions (term_to_fts_query):
+    "light skin"  -> "light skin"        (phrase)
+    "japan*"      -> "japan" *           (prefix query)
+    "afro*american" -> "afro" *          (stops at an inner wildcard: it may span tokens)
+  A subgroup's terms are OR-ed; one index lookup yields its candidate videos.
+- LexiconPrefilter maps video_id -> candidate (namespace, subgroup) pairs;
+  iter_groups() hands only those to the exact regex check.
+
+The FTS query is a superset of the regex: unicode61 splits on every
+non-alphanumeric character, and \\b..\\b word-bounded terms always start and
+end on such a split. Groups that cannot be expressed safely (leading
+wildcard, no alphanumeric token, boundary="none" substring matching) are
+checked on every video, as before.
+
+Inputs
+------
+- SQLite DB with video_docs (src/utils/video_docs.py); compiled ProtectedLexicon.
+
+Outputs
+-------
+- video_docs_fts + triggers (build_fts / CLI --build); candidate sets in memory.
+
+Assumptions
+-----------
+- SQLite compiled with FTS5 (CPython's bundled SQLite is). Once built, every
+  writer of video_docs needs FTS5 too (the triggers reference the index).
+
+Failure Modes
+-------------
+- Index missing, or video_docs shadowed by the TEMP fallback (the index would
+  be incomplete) -> LexiconPrefilter.build returns None; callers run the full scan.
+- A MATCH expression FTS5 rejects -> that subgroup falls back to the full scan.
+
+Complexity
+----------
+- One index lookup per subgroup; regex work is O(candidate pairs) instead of
+  O(videos x subgroups).
+
+Test Notes
+----------
+- python -m src.utils.lexicon_fts --db data/redtube_videos.db --build
+- python -m src.utils.lexicon_fts --db data/redtube_videos.db --bench   (regex scan vs prefilter, per namespace)
+"""
+
+from __future__ import annotations
+import argparse
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.utils.lexicon_loader import CompiledGroup, ProtectedLexicon, DEFAULT_LEXICON_REL
+
+FTS_TABLE = "video_docs_fts"
+
+FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS video_docs_fts USING fts5(
+    title, tags_text,
+    content='video_docs', content_rowid='video_id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS video_docs_fts_ai AFTER INSERT ON video_docs BEGIN
+    INSERT INTO video_docs_fts(rowid, title, tags_text) VALUES (new.video_id, new.title, new.tags_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS video_docs_fts_ad AFTER DELETE ON video_docs BEGIN
+    INSERT INTO video_docs_fts(video_docs_fts, rowid, title, tags_text)
+    VALUES ('delete', old.video_id, old.title, old.tags_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS video_docs_fts_au AFTER UPDATE ON video_docs BEGIN
+    INSERT INTO video_docs_fts(video_docs_fts, rowid, title, tags_text)
+    VALUES ('delete', old.video_id, old.title, old.tags_text);
+    INSERT INTO video_docs_fts(rowid, title, tags_text) VALUES (new.video_id, new.title, new.tags_text);
+END;
+"""
+
+# unicode61-style tokens (letters/digits) and lexicon wildcards
+_TOKEN_RE = re.compile(r"[^\W_]+|\*")
+
+
+# ---------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------
+
+def fts_exists(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM main.sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)).fetchone()
+    return row is not None
+
+
+def _docs_shadowed(conn: sqlite3.Connection) -> bool:
+    """True when ensure_video_docs fell back to a TEMP video_docs (main table incomplete)."""
+    row = conn.execute("SELECT 1 FROM sqlite_temp_master WHERE type='table' AND name='video_docs'").fetchone()
+    return row is not None
+
+
+def build_fts(conn: sqlite3.Connection, rebuild: bool = False) -> int:
+    """Create the index + triggers (idempotent); fill it when new or rebuild=True. Returns indexed docs."""
+    created = not fts_exists(conn)
+    conn.executescript(FTS_SQL)
+    if created or rebuild:
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM main.video_docs").fetchone()[0]
+
+
+# ---------------------------------------------------------------------
+# Query builder
+# ---------------------------------------------------------------------
+
+def term_to_fts_query(term: str) -> Optional[str]:
+    """
+    MATCH expression whose hits are a superset of the term's word-bounded regex
+    hits, or None if no safe expression exists (e.g. a leading wildcard).
+    """
+    matches = list(_TOKEN_RE.finditer(term))
+    tokens: List[str] = []
+    prefix = False
+    for i, m in enumerate(matches):
+        if m.group() == "*":
+            prev = matches[i - 1] if i else None
+            # "japan*" -> prefix on the attached token; anything after a wildcard
+            # may span several tokens, so the phrase stops here
+            prefix = bool(tokens) and prev is not None and prev.group() != "*" and prev.end() == m.start()
+            break
+        tokens.append(m.group())
+    if not tokens:
+        return None
+    phrase = '"' + " ".join(tokens) + '"'
+    return phrase + " *" if prefix else phrase
+
+
+def group_query(terms: Iterable[str]) -> Optional[str]:
+    """OR of the terms' expressions; None if any term cannot be prefiltered."""
+    parts: List[str] = []
+    for t in terms:
+        q = term_to_fts_query(t)
+        if q is None:
+            return None
+        parts.append(q)
+    if not parts:
+        return None
+    return " OR ".join(dict.fromkeys(parts))
+
+
+# ---------------------------------------------------------------------
+# Prefilter
+# ---------------------------------------------------------------------
+
+class LexiconPrefilter:
+    """video_id -> candidate subgroups per namespace, from one FTS lookup per subgroup."""
+
+    def __init__(self, lex: ProtectedLexicon):
+        self.lex = lex
+        self.by_video: Dict[int, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
+        self.unfiltered: Dict[str, List[str]] = defaultdict(list)   # checked on every video
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def build(cls, conn: sqlite3.Connection, lex: ProtectedLexicon,
+              namespaces: Optional[Iterable[str]] = None) -> Optional["LexiconPrefilter"]:
+        """Prefilter for `namespaces` (default: all), or None when the index cannot be used."""
+        if lex.boundary == "none":
+            print("[fts] boundary='none' matches substrings; prefilter disabled")
+            return None
+        if not fts_exists(conn):
+            print(f"[fts] {FTS_TABLE} not built; full regex scan "
+                  f"(build once: python -m src.utils.lexicon_fts --build)")
+            return None
+        if _docs_shadowed(conn):
+            print("[fts] video_docs is a TEMP fallback (index may be incomplete); full regex scan")
+            return None
+
+        pre = cls(lex)
+        wanted = list(namespaces) if namespaces is not None else list(lex.compiled)
+        t0 = time.perf_counter()
+        for ns in wanted:
+            cns = lex.compiled.get(ns)
+            if cns is None:
+                continue
+            n_pairs = 0
+            for sg, cg in cns.groups.items():
+                q = group_query(cg.terms)
+                ids: Optional[List[int]] = None
+                if q is not None:
+                    try:
+                        ids = [r[0] for r in conn.execute(
+                            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?", (q,))]
+                    except sqlite3.OperationalError as e:
+                        print(f"[fts] {ns}.{sg}: query rejected ({e}); checking every video")
+                if ids is None:
+                    pre.unfiltered[ns].append(sg)
+                    continue
+                for vid in ids:
+                    pre.by_video[vid][ns].append(sg)
+                n_pairs += len(ids)
+            pre.stats[ns] = {"candidate_pairs": n_pairs, "unfiltered_groups": len(pre.unfiltered.get(ns, []))}
+        total = sum(s["candidate_pairs"] for s in pre.stats.values())
+        print(f"[fts] Prefilter: {len(pre.by_video):,} candidate videos, {total:,} (video, subgroup) pairs "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return pre
+
+    def groups_for(self, vid: int) -> Dict[str, List[str]]:
+        hits = self.by_video.get(vid)
+        if not self.unfiltered:
+            return hits or {}
+        out: Dict[str, List[str]] = {ns: list(sgs) for ns, sgs in self.unfiltered.items()}
+        for ns, sgs in (hits or {}).items():
+            out.setdefault(ns, []).extend(sgs)
+        return out
+
+
+def iter_groups(lex: ProtectedLexicon, prefilter: Optional[LexiconPrefilter], vid: int,
+                namespaces: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str, CompiledGroup]]:
+    """(namespace, subgroup, compiled group) pairs to regex-check for one video."""
+    if prefilter is None:
+        for ns in (namespaces if namespaces is not None else lex.compiled):
+            cns = lex.compiled.get(ns)
+            if cns is None:
+                continue
+            for sg, cg in cns.groups.items():
+                yield ns, sg, cg
+        return
+    wanted = None if namespaces is None else set(namespaces)
+    for ns, sgs in prefilter.groups_for(vid).items():
+        if wanted is not None and ns not in wanted:
+            continue
+        groups = lex.compiled[ns].groups
+        for sg in sgs:
+            yield ns, sg, groups[sg]
+
+
+# ---------------------------------------------------------------------
+# CLI: build + benchmark
+# ---------------------------------------------------------------------
+
+def _membership(rows: List[Tuple[int, str, str]], lex: ProtectedLexicon, pre: Optional[LexiconPrefilter],
+                ns: str) -> Dict[int, Set[str]]:
+    out: Dict[int, Set[str]] = {}
+    for vid, title, tags in rows:
+        hit = {sg for _, sg, cg in iter_groups(lex, pre, vid, [ns])
+               if any(p.search(title) or p.search(tags) for p in cg.patterns)}
+        if hit:
+            out[vid] = hit
+    return out
+
+
+def bench(conn: sqlite3.Connection, lex: ProtectedLexicon) -> bool:
+    """Per namespace: full regex scan vs FTS candidates + regex; results must be identical."""
+    if not fts_exists(conn):
+        print(f"[error] {FTS_TABLE} not built; run with --build first")
+        return False
+    t0 = time.perf_counter()
+    rows = [(r[0], (r[1] or "").lower(), (r[2] or "").lower())
+            for r in conn.execute("SELECT video_id, title, tags_text FROM video_docs")]
+    load_s = time.perf_counter() - t0
+    print(f"[bench] {len(rows):,} docs loaded in {load_s:.2f}s")
+    print(f"\n{'namespace':<18} {'matched':>8} {'cand.pairs':>10} {'regex s':>8} {'fts+regex s':>11} {'speedup':>8} match")
+    ok = True
+    for ns in lex.compiled:
+        t0 = time.perf_counter()
+        full = _membership(rows, lex, None, ns)
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        pre = LexiconPrefilter.build(conn, lex, [ns])
+        cand = [r for r in rows if pre is not None and (pre.by_video.get(r[0]) or pre.unfiltered)]
+        fast = _membership(cand, lex, pre, ns)
+        t_fast = time.perf_counter() - t0
+        same = full == fast
+        ok &= same
+        pairs = pre.stats.get(ns, {}).get("candidate_pairs", 0) if pre else 0
+        print(f"{ns:<18} {len(full):>8,} {pairs:>10,} {t_full:>8.2f} {t_fast:>11.2f} "
+              f"{t_full / t_fast if t_fast else float('inf'):>7.1f}x {'ok' if same else 'DIFF'}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Build the video_docs FTS5 index / benchmark the lexicon prefilter.")
+    ap.add_argument("--db", type=str, default=None, help="SQLite DB (default: config paths.database).")
+    ap.add_argument("--build", action="store_true", help="Create the index + triggers if missing.")
+    ap.add_argument("--rebuild", action="store_true", help="Re-index every video_docs row.")
+    ap.add_argument("--bench", action="store_true", help="Compare full regex scan vs prefilter per namespace.")
+    ap.add_argument("--lexicon", type=str, default=None, help="Path to protected_terms.json (for --bench).")
+    ap.add_argument("--boundary", type=str, default="word", choices=["word", "edge", "none"])
+    args = ap.parse_args(argv)
+
+    from src.utils.config_loader import load_config
+    cfg = load_config()
+    db_path = Path(args.db) if args.db else cfg.paths.database
+    conn = sqlite3.connect(str(db_path))
+    try:
+        if args.build or args.rebuild:
+            t0 = time.perf_counter()
+            n = build_fts(conn, rebuild=args.rebuild)
+            print(f"[ok] {FTS_TABLE}: {n:,} docs indexed in {time.perf_counter() - t0:.1f}s")
+        if args.bench:
+            lex_path = Path(args.lexicon) if args.lexicon else cfg.paths.root / DEFAULT_LEXICON_REL
+            lex = ProtectedLexicon.from_json(lex_path).compile(boundary=args.boundary)
+            return 0 if bench(conn, lex) else 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
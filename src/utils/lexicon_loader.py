@@ -116,6 +116,7 @@ class ProtectedLexicon:
     """Structured and (optionally) compiled lexicon."""
     raw: Dict[str, Dict[str, List[str]]]
     compiled: Dict[str, CompiledNamespace] = field(default_factory=dict)
+    boundary: str = "word"  # strategy of the last compile() (the FTS prefilter needs it)
 
     # ---------- factory & validators ----------
 
@@ -188,6 +189,7 @@ class ProtectedLexicon:
                 cns.groups[sg] = CompiledGroup(subgroup=sg, terms=terms, patterns=pats)
             compiled[ns] = cns
         self.compiled = compiled
+        self.boundary = boundary
         return self
 
     # ---------- utilities ----------
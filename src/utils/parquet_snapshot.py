@@ -0,0 +1,364 @@
+"""
+src/utils/parquet_snapshot.py
+
+Purpose
+-------
+Columnar Parquet snapshot of the corpus for analytical scans, so analysis runs
+do not have to walk SQLite row by row through sqlite3.Row objects:
+
+    <snapshot>/publish_ym=YYYY-MM/part-0.parquet      (hive partitioning)
+    <snapshot>/publish_ym=unknown/part-0.parquet      (NULL / malformed publish_date)
+    <snapshot>/_manifest.json                         (per-partition fingerprints)
+
+One row per video: the `videos` columns (compact dtypes, see
+src.collect.database.VIDEO_DTYPES), `tags_text` (same text as video_docs, i.e.
+what the scripts alias as `tags`), `tag_list` list<string> and `categories`
+list<string> (from video_categories).
+
+Sync is incremental: each month partition is fingerprinted in SQL
+(row count, video_id sum, MAX(retrieved_at), MAX(video_docs.updated_at),
+category link count). Only partitions whose fingerprint differs from the
+manifest are rewritten; partitions that no longer have rows are removed.
+Each partition is written to a dot-file and renamed into place, and the
+manifest is updated after every partition, so an interrupted sync resumes.
+
+Readers (read_snapshot / iter_snapshot_batches) use pyarrow.dataset with
+column pruning and partition filters on publish_ym (months=("2019-01", "2024-12")).
+
+Inputs
+------
+- SQLite DB (read-only connection profile), config paths.snapshot.
+
+Outputs
+-------
+- Parquet dataset + manifest under paths.snapshot.
+
+Assumptions
+-----------
+- pyarrow is installed (optional dependency: only this module needs it).
+- publish_date starts with YYYY-MM when present.
+
+Failure Modes
+-------------
+- pyarrow missing -> ImportError with an install hint.
+- Fingerprint collisions (e.g. a category swapped for another on the same
+  video without any other change) -> use --full to rewrite everything.
+
+Complexity
+----------
+- Fingerprints: one pass over videos (+ video_docs / link PK lookups).
+- Sync: O(rows in changed partitions); month partitions read via idx_videos_publish_date.
+
+Test Notes
+----------
+- python -m src.utils.parquet_snapshot                  # incremental sync to paths.snapshot
+- python -m src.utils.parquet_snapshot --full --dry_run # list partitions that would be written
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # allow direct script run
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from src.utils.config_loader import load_config
+from src.collect.database import VIDEO_DTYPES
+from src.utils.sqlite_read import connect_readonly
+from src.utils.video_docs import ensure_video_docs
+
+PARTITION_COL = "publish_ym"
+UNKNOWN_MONTH = "unknown"      # sorts after every YYYY-MM, so month ranges exclude it
+MANIFEST_NAME = "_manifest.json"
+PART_FILE = "part-0.parquet"
+MANIFEST_VERSION = 1
+
+_MONTH_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]*"
+_MONTH_EXPR = (f"CASE WHEN v.publish_date GLOB '{_MONTH_GLOB}' "
+               f"THEN SUBSTR(v.publish_date, 1, 7) ELSE '{UNKNOWN_MONTH}' END")
+
+VIDEO_COLUMNS = ["video_id", "title", "url", "duration", "views", "rating", "ratings",
+                 "publish_date", "category_source", "is_active", "retrieved_at"]
+
+
+def _arrow():
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.dataset as ds  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as e:
+        raise ImportError("The Parquet snapshot needs pyarrow: pip install pyarrow") from e
+    return pa, ds, pq
+
+
+def snapshot_schema():
+    pa, _, _ = _arrow()
+    return pa.schema([
+        ("video_id", pa.int64()),
+        ("title", pa.string()),
+        ("url", pa.string()),
+        ("duration", pa.int32()),
+        ("views", pa.int64()),
+        ("rating", pa.float32()),
+        ("ratings", pa.int32()),
+        ("publish_date", pa.timestamp("us")),
+        ("category_source", pa.string()),      # Parquet dictionary-encodes it on disk
+        ("is_active", pa.int8()),
+        ("retrieved_at", pa.timestamp("us", tz="UTC")),
+        ("tags_text", pa.string()),
+        ("tag_list", pa.list_(pa.string())),
+        ("categories", pa.list_(pa.string())),
+    ])
+
+
+# ---------------------------------------------------------------------
+# Fingerprints + manifest
+# ---------------------------------------------------------------------
+
+def partition_fingerprints(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """{publish_ym: fingerprint} for every month that currently has videos."""
+    rows = conn.execute(f"""
+        SELECT {_MONTH_EXPR} AS ym,
+               COUNT(*),
+               TOTAL(v.video_id),
+               MAX(v.retrieved_at),
+               MAX(d.updated_at),
+               TOTAL((SELECT COUNT(*) FROM video_categories c WHERE c.video_id = v.video_id))
+        FROM videos v
+        LEFT JOIN video_docs d ON d.video_id = v.video_id
+        GROUP BY ym
+    """).fetchall()
+    return {r[0]: {"rows": int(r[1]), "id_sum": int(r[2]), "max_retrieved_at": r[3],
+                   "docs_updated_at": r[4], "category_links": int(r[5])} for r in rows}
+
+
+def read_manifest(snapshot_dir: Path) -> Dict:
+    path = Path(snapshot_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"version": MANIFEST_VERSION, "partitions": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_manifest(snapshot_dir: Path, manifest: Dict) -> None:
+    path = Path(snapshot_dir) / MANIFEST_NAME
+    tmp = path.with_name(f".{MANIFEST_NAME}.tmp{os.getpid()}")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def plan_sync(conn: sqlite3.Connection, snapshot_dir: Path, full: bool = False) -> Tuple[Dict, List[str], List[str]]:
+    """(current fingerprints, partitions to (re)write, partitions to delete)."""
+    current = partition_fingerprints(conn)
+    old = read_manifest(snapshot_dir).get("partitions", {})
+    if full:
+        changed = sorted(current)
+    else:
+        changed = sorted(ym for ym, fp in current.items()
+                         if old.get(ym, {}).get("fingerprint") != fp
+                         or not (Path(snapshot_dir) / f"{PARTITION_COL}={ym}" / PART_FILE).exists())
+    removed = sorted(set(old) - set(current))
+    return current, changed, removed
+
+
+# ---------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------
+
+def _month_where(ym: str) -> Tuple[str, Tuple]:
+    if ym == UNKNOWN_MONTH:
+        return f"(v.publish_date IS NULL OR v.publish_date NOT GLOB '{_MONTH_GLOB}')", ()
+    # '~' sorts after every character of a date/time suffix -> index range scan
+    return "v.publish_date >= ? AND v.publish_date < ?", (ym, ym + "~")
+
+
+def _lists_by_video(conn: sqlite3.Connection, view: str, col: str, where: str, params: Tuple) -> Dict[int, List[str]]:
+    out: Dict[int, List[str]] = {}
+    sql = f"""
+        SELECT x.video_id, x.{col} FROM {view} x
+        WHERE x.video_id IN (SELECT v.video_id FROM videos v WHERE {where})
+    """
+    for vid, val in conn.execute(sql, params):
+        out.setdefault(vid, []).append(val)
+    return out
+
+
+def partition_frame(conn: sqlite3.Connection, ym: str) -> pd.DataFrame:
+    """All videos of one publish month with tags/categories, in snapshot dtypes."""
+    where, params = _month_where(ym)
+    cols = ", ".join(f"v.{c}" for c in VIDEO_COLUMNS)
+    rows = conn.execute(f"""
+        SELECT {cols}, COALESCE(d.tags_text, '') AS tags_text
+        FROM videos v
+        LEFT JOIN video_docs d ON d.video_id = v.video_id
+        WHERE {where}
+        ORDER BY v.video_id
+    """, params).fetchall()
+    df = pd.DataFrame.from_records([tuple(r) for r in rows], columns=VIDEO_COLUMNS + ["tags_text"])
+    for c, dtype in VIDEO_DTYPES.items():
+        if c in df.columns:   # VIDEO_DTYPES also covers columns the snapshot leaves out
+            df[c] = df[c].astype(dtype)
+    df["publish_date"] = pd.to_datetime(df["publish_date"], errors="coerce", format="ISO8601")
+    df["retrieved_at"] = pd.to_datetime(df["retrieved_at"], errors="coerce", format="ISO8601", utc=True)
+    tags = _lists_by_video(conn, "video_tags", "tag", where, params)
+    cats = _lists_by_video(conn, "video_categories", "category", where, params)
+    ids = df["video_id"].tolist()
+    df["tag_list"] = [sorted(tags.get(v, [])) for v in ids]
+    df["categories"] = [sorted(cats.get(v, [])) for v in ids]
+    return df
+
+
+def _write_partition(snapshot_dir: Path, ym: str, df: pd.DataFrame) -> int:
+    pa, _, pq = _arrow()
+    part_dir = Path(snapshot_dir) / f"{PARTITION_COL}={ym}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, schema=snapshot_schema(), preserve_index=False)
+    tmp = part_dir / f".{PART_FILE}.tmp{os.getpid()}"   # dot-files are ignored by dataset discovery
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, part_dir / PART_FILE)
+    return (part_dir / PART_FILE).stat().st_size
+
+
+def sync_snapshot(db_path: Path, snapshot_dir: Path, full: bool = False, dry_run: bool = False) -> Dict:
+    """Bring the snapshot up to date with the DB; returns a summary dict."""
+    if not dry_run:
+        _arrow()
+    snapshot_dir = Path(snapshot_dir)
+    conn = connect_readonly(db_path)
+    try:
+        ensure_video_docs(conn)
+        current, changed, removed = plan_sync(conn, snapshot_dir, full=full)
+        summary = {"partitions": len(current), "rewritten": changed, "removed": removed,
+                   "rows_written": sum(current[ym]["rows"] for ym in changed), "bytes_written": 0}
+        if dry_run:
+            return summary
+
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        manifest = read_manifest(snapshot_dir)
+        manifest.update({"version": MANIFEST_VERSION, "database": str(Path(db_path).resolve()),
+                         "partition_col": PARTITION_COL})
+        parts = manifest.setdefault("partitions", {})
+        for ym in removed:
+            shutil.rmtree(snapshot_dir / f"{PARTITION_COL}={ym}", ignore_errors=True)
+            parts.pop(ym, None)
+        t0 = time.perf_counter()
+        for i, ym in enumerate(changed, 1):
+            size = _write_partition(snapshot_dir, ym, partition_frame(conn, ym))
+            summary["bytes_written"] += size
+            parts[ym] = {"fingerprint": current[ym], "rows": current[ym]["rows"], "bytes": size,
+                         "written_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+            manifest["synced_at"] = parts[ym]["written_at"]
+            _write_manifest(snapshot_dir, manifest)
+            if i % 12 == 0:
+                print(f"[snapshot] {i}/{len(changed)} partitions written ({time.perf_counter() - t0:.1f}s)")
+        manifest["synced_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        _write_manifest(snapshot_dir, manifest)
+        return summary
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------
+
+def parse_month_range(spec: Optional[str]) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """'2019-01:2024-12' / '2019-01:' / ':2024-12' / '2023-05' -> (start, end); None/'' -> None."""
+    if not spec:
+        return None
+    start, _, end = spec.partition(":") if ":" in spec else (spec, ":", spec)
+    return (start or None, end or None)
+
+
+def open_snapshot(snapshot_dir: Path):
+    pa, ds, _ = _arrow()
+    snapshot_dir = Path(snapshot_dir)
+    if not (snapshot_dir / MANIFEST_NAME).exists():
+        raise FileNotFoundError(f"No Parquet snapshot at {snapshot_dir} (run: python -m src.utils.parquet_snapshot)")
+    part = ds.partitioning(pa.schema([(PARTITION_COL, pa.string())]), flavor="hive")
+    return ds.dataset(str(snapshot_dir), format="parquet", partitioning=part)
+
+
+def snapshot_filter(months: Optional[Tuple[Optional[str], Optional[str]]] = None,
+                    active_only: bool = False, video_ids: Optional[Sequence[int]] = None):
+    """pyarrow.dataset expression: publish_ym range (partition pruning), is_active, video_id set."""
+    _, ds, _ = _arrow()
+    expr = None
+
+    def _and(e):
+        return e if expr is None else expr & e
+
+    if months:
+        start, end = months
+        if start:
+            expr = _and(ds.field(PARTITION_COL) >= start)
+        if end:
+            expr = _and(ds.field(PARTITION_COL) <= end)
+    if active_only:
+        expr = _and(ds.field("is_active") == 1)
+    if video_ids is not None:
+        expr = _and(ds.field("video_id").isin([int(v) for v in video_ids]))
+    return expr
+
+
+def read_snapshot(snapshot_dir: Path, columns: Optional[List[str]] = None,
+                  months: Optional[Tuple[Optional[str], Optional[str]]] = None,
+                  active_only: bool = False, video_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+    """Projected + filtered snapshot as a DataFrame (ordered by video_id)."""
+    dataset = open_snapshot(snapshot_dir)
+    table = dataset.to_table(columns=columns, filter=snapshot_filter(months, active_only, video_ids))
+    df = table.to_pandas()
+    if "video_id" in df.columns:
+        df = df.sort_values("video_id", kind="stable").reset_index(drop=True)
+    return df
+
+
+def iter_snapshot_batches(snapshot_dir: Path, columns: List[str], batch_size: int = 20_000,
+                          months: Optional[Tuple[Optional[str], Optional[str]]] = None,
+                          active_only: bool = False) -> Iterator[List[Dict]]:
+    """Row dicts in batches of up to batch_size (partition order, not video_id order)."""
+    dataset = open_snapshot(snapshot_dir)
+    scanner = dataset.scanner(columns=columns, filter=snapshot_filter(months, active_only),
+                              batch_size=batch_size)
+    pending: List[Dict] = []
+    for batch in scanner.to_batches():
+        pending.extend(batch.to_pylist())
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+
+def snapshot_synced_at(snapshot_dir: Path) -> Optional[str]:
+    return read_manifest(snapshot_dir).get("synced_at")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    cfg = load_config()
+    ap = argparse.ArgumentParser(description="Export/sync the corpus to a month-partitioned Parquet snapshot.")
+    ap.add_argument("--db", type=str, default=str(cfg.paths.database), help="SQLite DB (read-only).")
+    ap.add_argument("--out", type=str, default=str(cfg.paths.snapshot), help="Snapshot directory.")
+    ap.add_argument("--full", action="store_true", help="Rewrite every partition, not just changed ones.")
+    ap.add_argument("--dry_run", action="store_true", help="Only report which partitions would change.")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    s = sync_snapshot(Path(args.db), Path(args.out), full=args.full, dry_run=args.dry_run)
+    verb = "would rewrite" if args.dry_run else "rewrote"
+    print(f"[snapshot] {s['partitions']} partitions; {verb} {len(s['rewritten'])} "
+          f"({s['rows_written']:,} rows, {s['bytes_written'] / 2**20:.1f} MiB), removed {len(s['removed'])} "
+          f"in {time.perf_counter() - t0:.1f}s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
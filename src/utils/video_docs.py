@@ -0,0 +1,187 @@
+"""
+src/utils/video_docs.py
+
+Purpose
+-------
+Persistent per-video text documents, replacing the `temp_vt_agg` GROUP_CONCAT
+rebuild every analysis script used to run at start-up:
+
+    video_docs(video_id PK, title, tags_text, doc_text, updated_at)
+
+- tags_text = GROUP_CONCAT(tag, ' ') over video_tags (same as temp_vt_agg.tags)
+- doc_text  = TRIM(title || ' ' || tags_text)
+- The collector refreshes the rows of every video it writes
+  (refresh_video_docs); updated_at only moves when the text actually changed.
+- Analysis entry points call ensure_video_docs(conn) and then read `video_docs`.
+
+Inputs
+------
+- An open sqlite3 connection to the project DB.
+
+Outputs
+-------
+- Table `video_docs` (backfilled for rows the collector has not written yet).
+- On a read-only DB with missing rows: a TEMP `video_docs` table built like
+  the old temp_vt_agg. It shadows the main table for unqualified names, so
+  callers' queries do not change.
+
+Failure Modes
+-------------
+- Writes rejected (read-only file, mode=ro / query_only connection from
+  src.utils.sqlite_read, locked DB) -> TEMP fallback with a warning; run
+  `python -m src.utils.video_docs --db ...` once to persist the backfill.
+
+Complexity
+----------
+- ensure_video_docs: one anti-join count; backfill is O(missing rows).
+- refresh_video_docs: O(len(video_ids) * tags per video).
+
+Test Notes
+----------
+- `python -m src.utils.video_docs --db data/redtube_videos.db --rebuild` rebuilds every row.
+"""
+
+from __future__ import annotations
+import argparse
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.utils.sqlite_read import temp_writes
+
+VIDEO_DOCS_SQL = """
+CREATE TABLE IF NOT EXISTS video_docs (
+    video_id    INTEGER PRIMARY KEY REFERENCES videos(video_id) ON DELETE CASCADE,
+    title       TEXT NOT NULL DEFAULT '',
+    tags_text   TEXT NOT NULL DEFAULT '',
+    doc_text    TEXT NOT NULL DEFAULT '',
+    updated_at  TEXT NOT NULL
+);
+"""
+
+_MAX_PARAMS = 900
+
+# {where} restricts the videos rebuilt; tags are aggregated only for those ids
+_UPSERT_SQL = """
+    INSERT INTO video_docs(video_id, title, tags_text, doc_text, updated_at)
+    SELECT v.video_id,
+           COALESCE(v.title, ''),
+           COALESCE(t.tags, ''),
+           TRIM(COALESCE(v.title, '') || ' ' || COALESCE(t.tags, '')),
+           ?
+    FROM videos v
+    LEFT JOIN (
+        SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags
+        FROM video_tags
+        WHERE {tag_where}
+        GROUP BY video_id
+    ) t ON t.video_id = v.video_id
+    WHERE {where}
+    ON CONFLICT(video_id) DO UPDATE SET
+        title=excluded.title,
+        tags_text=excluded.tags_text,
+        doc_text=excluded.doc_text,
+        updated_at=excluded.updated_at
+    WHERE video_docs.doc_text IS NOT excluded.doc_text OR video_docs.title IS NOT excluded.title
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def ensure_video_docs_table(conn: sqlite3.Connection) -> None:
+    conn.executescript(VIDEO_DOCS_SQL)
+
+
+def refresh_video_docs(conn: sqlite3.Connection, video_ids: Iterable, now: Optional[str] = None) -> None:
+    """Rebuild the docs of `video_ids` inside the caller's transaction (no commit)."""
+    ids = list({v for v in video_ids if isinstance(v, int)})
+    now = now or _now()
+    for i in range(0, len(ids), _MAX_PARAMS):
+        chunk = ids[i:i + _MAX_PARAMS]
+        marks = ",".join("?" * len(chunk))
+        sql = _UPSERT_SQL.format(tag_where=f"video_id IN ({marks})", where=f"v.video_id IN ({marks})")
+        conn.execute(sql, [now] + chunk + chunk)
+
+
+def missing_video_docs(conn: sqlite3.Connection) -> int:
+    return conn.execute("""
+        SELECT COUNT(*) FROM videos v
+        WHERE NOT EXISTS (SELECT 1 FROM main.video_docs d WHERE d.video_id = v.video_id)
+    """).fetchone()[0]
+
+
+def backfill_video_docs(conn: sqlite3.Connection, rebuild: bool = False) -> int:
+    """Write docs for videos that have none (every video with rebuild=True). Returns rows written."""
+    ensure_video_docs_table(conn)
+    before = conn.total_changes
+    if rebuild:
+        sql = _UPSERT_SQL.format(tag_where="1", where="1")
+    else:
+        sql = _UPSERT_SQL.format(
+            tag_where="video_id NOT IN (SELECT video_id FROM main.video_docs)",
+            where="NOT EXISTS (SELECT 1 FROM main.video_docs d WHERE d.video_id = v.video_id)",
+        )
+    conn.execute(sql, (_now(),))
+    conn.commit()
+    return conn.total_changes - before
+
+
+def _build_temp_docs(conn: sqlite3.Connection) -> None:
+    # query_only also blocks TEMP tables; lift it for this connection-local build
+    with temp_writes(conn):
+        _create_temp_docs(conn)
+
+
+def _create_temp_docs(conn: sqlite3.Connection) -> None:
+    conn.execute("DROP TABLE IF EXISTS temp.video_docs")
+    conn.execute("""
+        CREATE TEMP TABLE video_docs AS
+        SELECT v.video_id AS video_id,
+               COALESCE(v.title, '') AS title,
+               COALESCE(t.tags, '') AS tags_text,
+               TRIM(COALESCE(v.title, '') || ' ' || COALESCE(t.tags, '')) AS doc_text,
+               '' AS updated_at
+        FROM videos v
+        LEFT JOIN (SELECT video_id, GROUP_CONCAT(tag, ' ') AS tags FROM video_tags GROUP BY video_id) t
+            ON t.video_id = v.video_id
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_temp_video_docs_vid ON video_docs(video_id)")
+
+
+def ensure_video_docs(conn: sqlite3.Connection) -> None:
+    """
+    Make `video_docs` complete for this connection: backfill the persistent
+    table if rows are missing, or fall back to a TEMP table if the DB is not
+    writable. Queries can then read `video_docs` unchanged.
+    """
+    try:
+        ensure_video_docs_table(conn)
+        missing = missing_video_docs(conn)
+        if missing:
+            print(f"[docs] Backfilling video_docs for {missing:,} videos (one-off)...")
+            backfill_video_docs(conn)
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"[warn] video_docs not writable ({e}); building TEMP video_docs for this run")
+        _build_temp_docs(conn)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Backfill or rebuild the video_docs table.")
+    ap.add_argument("--db", type=str, required=True, help="Path to the SQLite DB.")
+    ap.add_argument("--rebuild", action="store_true", help="Recompute every row, not just missing ones.")
+    args = ap.parse_args(argv)
+    conn = sqlite3.connect(str(Path(args.db)))
+    try:
+        n = backfill_video_docs(conn, rebuild=args.rebuild)
+        print(f"[ok] video_docs: {n:,} rows written; {missing_video_docs(conn):,} missing")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())